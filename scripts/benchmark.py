@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Suite for ISO 42001 Scoring, Validation and Reporting
+Times the hot paths in src/utils against synthetic assessments and writes
+machine-readable JSON results for comparison between commits
+"""
+
+import os
+import sys
+import json
+import random
+import string
+import argparse
+import platform
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Make the src package importable when run as `python scripts/benchmark.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.models.assessment import Assessment, AssessmentResponse
+from src.utils.scoring import calculate_assessment_scores, calculate_compliance_score, get_control_catalog
+from src.utils.validation import validate_assessment_response, calculate_response_quality
+from src.utils.reporting import generate_compliance_report
+from src.utils.batch_scoring import score_assessments
+
+REPORT_TYPES = ['executive', 'detailed', 'technical']
+
+def parse_int_list(value):
+    """Parse a comma-separated list of positive integers, e.g. '14,140'"""
+    try:
+        values = [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected comma-separated integers, got '{value}'")
+    if not values or any(item <= 0 for item in values):
+        raise argparse.ArgumentTypeError(f"Expected positive integers, got '{value}'")
+    return values
+
+def random_text(rng, length):
+    """Generate pseudo-random words totalling roughly `length` characters"""
+    words = []
+    total = 0
+    while total < length:
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        words.append(word)
+        total += len(word) + 1
+    return ' '.join(words)[:length]
+
+def generate_assessment(rng, response_count, question_length, catalog):
+    """
+    Generate a synthetic assessment with scored responses
+
+    Args:
+        rng: random.Random instance
+        response_count: Number of responses to generate (controls are reused
+            cyclically once every catalog control has a response)
+        question_length: Characters per question answer
+        catalog: Control catalog to draw controls from
+
+    Returns:
+        Tuple of (Assessment, list of AssessmentResponse)
+    """
+    assessment = Assessment(
+        user_id=str(uuid.uuid4()),
+        assessment_name='Benchmark Assessment',
+        organization_name='Benchmark Org',
+        ai_system_description=random_text(rng, 200),
+        industry='technology',
+        risk_level=rng.choice(['low', 'medium', 'high']),
+        regulatory_requirements=['EU AI Act'],
+        catalog_version=catalog.key
+    )
+    assessment.id = str(uuid.uuid4())
+    assessment.created_at = datetime.utcnow() - timedelta(days=30)
+    assessment.updated_at = datetime.utcnow()
+    assessment.completed_at = None
+    assessment.status = 'in_progress'
+    assessment.current_stage = 'gap_assessment'
+    assessment.certificate_generated = False
+
+    control_ids = list(catalog.controls)
+    responses = []
+
+    for index in range(response_count):
+        control_id = control_ids[index % len(control_ids)]
+        control_info = catalog.get(control_id)
+
+        response = AssessmentResponse(
+            assessment_id=assessment.id,
+            control_id=control_id,
+            stage=control_info['stage'],
+            domain=control_info['domain']
+        )
+        response.id = str(uuid.uuid4())
+        response.created_at = assessment.created_at
+        response.updated_at = assessment.updated_at
+        response.is_validated = rng.random() < 0.8
+        response.set_validation_errors([])
+        response.set_responses({
+            'maturityLevel': rng.randint(0, 5),
+            'questions': [
+                {'question': question, 'answer': random_text(rng, question_length), 'type': 'text'}
+                for question in control_info.get('questions', [])
+            ],
+            'comments': random_text(rng, 40)
+        })
+        response.comments = random_text(rng, 40)
+        response.set_evidence_files([str(uuid.uuid4()) for _ in range(rng.randint(0, 4))])
+        response.maturity_level = rng.randint(0, 5)
+        response.evidence_completeness = rng.random()
+        response.response_quality = rng.random()
+        response.calculated_score = calculate_compliance_score(
+            response.maturity_level, response.evidence_completeness, response.response_quality
+        )
+        responses.append(response)
+
+    assessment.set_scores(calculate_assessment_scores(responses, assessment.risk_level, catalog))
+    return assessment, responses
+
+def time_call(func, repeat, calls):
+    """
+    Time a callable
+
+    Args:
+        func: Zero-argument callable performing `calls` operations
+        repeat: Number of timed runs
+        calls: Number of operations per run, for per-call figures
+
+    Returns:
+        Dictionary of timing statistics in seconds and microseconds per call
+    """
+    func()  # warm-up
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return {
+        'calls': calls,
+        'repeat': repeat,
+        'min_s': min(timings),
+        'median_s': median,
+        'mean_s': statistics.mean(timings),
+        'max_s': max(timings),
+        'per_call_us': median / calls * 1e6 if calls else 0.0
+    }
+
+def run_case(response_count, assessment_count, question_length, repeat, seed):
+    """Run every benchmark for one parameter combination"""
+    rng = random.Random(seed)
+    catalog = get_control_catalog()
+
+    dataset = [
+        generate_assessment(rng, response_count, question_length, catalog)
+        for _ in range(assessment_count)
+    ]
+    all_responses = [response for _, responses in dataset for response in responses]
+    parsed_responses = [response.get_responses() for response in all_responses]
+    control_infos = [catalog.get(response.control_id) for response in all_responses]
+
+    def scoring():
+        for assessment, responses in dataset:
+            calculate_assessment_scores(responses, assessment.risk_level, catalog)
+
+    def batch_scoring():
+        score_assessments([assessment for assessment, _ in dataset], all_responses)
+
+    def validation():
+        for response, control_info in zip(all_responses, control_infos):
+            validate_assessment_response(response, control_info)
+
+    def response_quality():
+        for responses_data, control_info in zip(parsed_responses, control_infos):
+            calculate_response_quality(responses_data, control_info)
+
+    benchmarks = [
+        ('calculate_assessment_scores', scoring, assessment_count),
+        ('score_assessments_batch', batch_scoring, assessment_count),
+        ('validate_assessment_response', validation, len(all_responses)),
+        ('calculate_response_quality', response_quality, len(all_responses))
+    ]
+
+    for report_type in REPORT_TYPES:
+        def report(report_type=report_type):
+            for assessment, responses in dataset:
+                generate_compliance_report(assessment, responses, None, report_type)
+        benchmarks.append((f'generate_compliance_report[{report_type}]', report, assessment_count))
+
+    results = []
+    for name, func, calls in benchmarks:
+        result = {
+            'benchmark': name,
+            'responses': response_count,
+            'assessments': assessment_count,
+            'question_length': question_length
+        }
+        result.update(time_call(func, repeat, calls))
+        results.append(result)
+        print(f"  {name:<45} {result['per_call_us']:>12.1f} us/call", file=sys.stderr)
+
+    return results
+
+def git_revision():
+    """Get the current git commit, if available"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scoring, validation and reporting hot paths')
+    parser.add_argument('--responses', type=parse_int_list, default=[14, 140],
+                        help='Responses per assessment, comma-separated (default: 14,140)')
+    parser.add_argument('--assessments', type=parse_int_list, default=[1, 50],
+                        help='Assessments per run, comma-separated (default: 1,50)')
+    parser.add_argument('--question-length', type=parse_int_list, default=[100, 1000],
+                        help='Characters per question answer, comma-separated (default: 100,1000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark (default: 5)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = []
+    for response_count in args.responses:
+        for assessment_count in args.assessments:
+            for question_length in args.question_length:
+                print(
+                    f"📊 responses={response_count} assessments={assessment_count} "
+                    f"question_length={question_length}",
+                    file=sys.stderr
+                )
+                results.extend(run_case(response_count, assessment_count, question_length, args.repeat, args.seed))
+
+    output = {
+        'metadata': {
+            'generated_at': datetime.utcnow().isoformat(),
+            'git_commit': git_revision(),
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {
+                'responses': args.responses,
+                'assessments': args.assessments,
+                'question_length': args.question_length,
+                'repeat': args.repeat,
+                'seed': args.seed
+            }
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"✅ Results written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
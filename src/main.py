@@ -19,6 +19,8 @@ from src.routes.assessment import assessment_bp
 from src.routes.file_management import file_bp
 from src.routes.admin import admin_bp
 from src.routes.certificate import certificate_bp
+from src.utils.malware_scan import get_scan_pool
+from src.utils.search_index import create_search_index
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
@@ -35,12 +37,39 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # File upload configuration
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
+app.config['MAX_RESUMABLE_UPLOAD_SIZE'] = int(os.getenv('MAX_RESUMABLE_UPLOAD_SIZE', 1024 * 1024 * 1024))  # 1GB chunked uploads
+app.config['MAX_BULK_UPLOAD_SIZE'] = int(os.getenv('MAX_BULK_UPLOAD_SIZE', 256 * 1024 * 1024))  # 256MB bulk/ZIP uploads
+
+# Evidence storage quotas in bytes (0 = unlimited)
+app.config['USER_STORAGE_QUOTA'] = int(os.getenv('USER_STORAGE_QUOTA', 0))
+app.config['ORGANIZATION_STORAGE_QUOTA'] = int(os.getenv('ORGANIZATION_STORAGE_QUOTA', 0))
 
 # AWS Configuration (for production deployment)
 app.config['AWS_REGION'] = os.getenv('AWS_REGION', 'us-east-1')
 app.config['AWS_ACCESS_KEY_ID'] = os.getenv('AWS_ACCESS_KEY_ID')
 app.config['AWS_SECRET_ACCESS_KEY'] = os.getenv('AWS_SECRET_ACCESS_KEY')
 
+# Evidence, certificate and preview storage ('local' under UPLOAD_FOLDER, or 's3')
+app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 'local')
+app.config['S3_BUCKET'] = os.getenv('S3_BUCKET')
+app.config['S3_PREFIX'] = os.getenv('S3_PREFIX', '')
+app.config['BLOB_FANOUT_DEPTH'] = int(os.getenv('BLOB_FANOUT_DEPTH', 2))  # levels of 2-hex-digit directories
+app.config['STORAGE_GC_GRACE_PERIOD'] = int(os.getenv('STORAGE_GC_GRACE_PERIOD', 3600))  # seconds before unreferenced objects are collected
+
+# Download delivery: 'none', 'x-accel' (nginx), 'x-sendfile' (Apache) or 'redirect' (presigned S3 URLs)
+app.config['DOWNLOAD_OFFLOAD'] = os.getenv('DOWNLOAD_OFFLOAD', 'none')
+app.config['X_ACCEL_PREFIX'] = os.getenv('X_ACCEL_PREFIX', '/protected/')
+
+# Malware scanning ('clamd' streams to a clamd daemon; 'stub' detects only the EICAR test file and
+# is for development). Unset, every scan records 'error' and evidence is never served as clean.
+app.config['MALWARE_SCANNER'] = os.getenv('MALWARE_SCANNER')
+app.config['CLAMD_HOST'] = os.getenv('CLAMD_HOST', '127.0.0.1')
+app.config['CLAMD_PORT'] = int(os.getenv('CLAMD_PORT', 3310))
+app.config['CLAMD_SOCKET'] = os.getenv('CLAMD_SOCKET')
+app.config['SCAN_WORKERS'] = int(os.getenv('SCAN_WORKERS', 2))  # 0 scans inline (e.g. on Lambda)
+app.config['SCAN_QUEUE_SIZE'] = int(os.getenv('SCAN_QUEUE_SIZE', 100))
+app.config['SCAN_MAX_ATTEMPTS'] = int(os.getenv('SCAN_MAX_ATTEMPTS', 3))
+
 # Initialize extensions
 CORS(app, origins="*", allow_headers=["Content-Type", "Authorization"])
 jwt = JWTManager(app)
@@ -55,9 +84,24 @@ app.register_blueprint(file_bp, url_prefix='/api/files')
 app.register_blueprint(admin_bp, url_prefix='/api/admin')
 app.register_blueprint(certificate_bp, url_prefix='/api/certificates')
 
-# Create database tables
+# Create database tables and the evidence search index
 with app.app_context():
     db.create_all()
+    create_search_index()
+
+def resume_scans():
+    """Queue malware scans interrupted by a restart; errors are logged, never raised"""
+    try:
+        with app.app_context():
+            queued = get_scan_pool().requeue_pending()
+            app.logger.info(f"Requeued {queued} evidence blobs for scanning")
+    except Exception as e:
+        app.logger.error(f"Scan requeue error: {str(e)}")
+
+@app.cli.command('requeue-scans')
+def requeue_scans_command():
+    """Queue evidence blobs still waiting for a malware scan or text extraction"""
+    resume_scans()
 
 # JWT error handlers
 @jwt.expired_token_loader
@@ -123,5 +167,9 @@ if __name__ == '__main__':
     if not os.path.exists(upload_dir):
         os.makedirs(upload_dir)
     
+    # Resume malware scans interrupted by a restart
+    if app.config['SCAN_WORKERS']:
+        resume_scans()
+    
     app.run(host='0.0.0.0', port=5000, debug=True)
 
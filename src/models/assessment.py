@@ -1,9 +1,8 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import uuid
 import json
 
-db = SQLAlchemy()
+from src.models.user import db
 
 class Assessment(db.Model):
     __tablename__ = 'assessments'
@@ -28,6 +27,13 @@ class Assessment(db.Model):
     # Scoring Results (JSON field)
     scores = db.Column(db.Text, nullable=True)
     
+    # Running per-domain score sums for incremental updates (JSON field)
+    score_state = db.Column(db.Text, nullable=True)
+    
+    # Control catalog the assessment is scored against, e.g. 'iso42001:2023.1'
+    # (NULL for assessments created before catalogs were versioned)
+    catalog_version = db.Column(db.String(50), nullable=True)
+    
     # Regulatory Requirements (JSON field)
     regulatory_requirements = db.Column(db.Text, nullable=True, default='[]')
     
@@ -44,9 +50,13 @@ class Assessment(db.Model):
     # Relationships
     responses = db.relationship('AssessmentResponse', backref='assessment', lazy=True, cascade='all, delete-orphan')
     files = db.relationship('AssessmentFile', backref='assessment', lazy=True, cascade='all, delete-orphan')
+    summary = db.relationship('AssessmentScoreSummary', backref='assessment', uselist=False, lazy=True,
+                              cascade='all, delete-orphan')
+    score_history = db.relationship('ScoreHistory', backref='assessment', lazy='dynamic',
+                                    cascade='all, delete-orphan')
 
     def __init__(self, user_id, assessment_name, organization_name, ai_system_description, 
-                 industry, risk_level, regulatory_requirements=None):
+                 industry, risk_level, regulatory_requirements=None, catalog_version=None):
         self.user_id = user_id
         self.assessment_name = assessment_name.strip()
         self.organization_name = organization_name.strip()
@@ -54,6 +64,9 @@ class Assessment(db.Model):
         self.industry = industry.strip()
         self.risk_level = risk_level.lower()
         self.regulatory_requirements = json.dumps(regulatory_requirements or [])
+        self.catalog_version = catalog_version
+        self.status = 'in_progress'
+        self.current_stage = 'requirements_gathering'
         self.progress = json.dumps({
             'overall': 0,
             'stages': {
@@ -64,6 +77,7 @@ class Assessment(db.Model):
                 'internal_audit': 0
             }
         })
+        self.sync_summary()
 
     def get_progress(self):
         """Get progress data as dictionary"""
@@ -97,6 +111,20 @@ class Assessment(db.Model):
     def set_scores(self, scores_data):
         """Set scores data from dictionary"""
         self.scores = json.dumps(scores_data)
+        self.sync_summary(scores_data)
+
+    def get_score_state(self):
+        """Get running score sums as dictionary"""
+        if not self.score_state:
+            return None
+        try:
+            return json.loads(self.score_state)
+        except (json.JSONDecodeError, TypeError):
+            return None
+
+    def set_score_state(self, state):
+        """Set running score sums from dictionary"""
+        self.score_state = json.dumps(state)
 
     def get_regulatory_requirements(self):
         """Get regulatory requirements as list"""
@@ -128,6 +156,7 @@ class Assessment(db.Model):
         progress_data['overall'] = round(overall, 1)
         
         self.set_progress(progress_data)
+        self.sync_summary()
 
     def advance_stage(self):
         """Advance to the next assessment stage"""
@@ -142,6 +171,7 @@ class Assessment(db.Model):
         current_index = stage_order.index(self.current_stage)
         if current_index < len(stage_order) - 1:
             self.current_stage = stage_order[current_index + 1]
+            self.sync_summary()
             return True
         return False
 
@@ -149,6 +179,18 @@ class Assessment(db.Model):
         """Mark assessment as completed"""
         self.status = 'completed'
         self.completed_at = datetime.utcnow()
+        self.sync_summary()
+
+    def sync_summary(self, scores_data=None):
+        """
+        Copy portfolio-relevant fields into the denormalized summary row
+
+        Args:
+            scores_data: Newly set scores (None to keep the summary's score columns)
+        """
+        if self.summary is None:
+            self.summary = AssessmentScoreSummary()
+        self.summary.update_from(self, scores_data)
 
     def to_dict(self, include_responses=False):
         """Convert assessment to dictionary"""
@@ -164,6 +206,7 @@ class Assessment(db.Model):
             'current_stage': self.current_stage,
             'progress': self.get_progress(),
             'scores': self.get_scores(),
+            'catalog_version': self.catalog_version,
             'regulatory_requirements': self.get_regulatory_requirements(),
             'certificate_generated': self.certificate_generated,
             'certificate_id': self.certificate_id,
@@ -184,6 +227,205 @@ class Assessment(db.Model):
         return f'<Assessment {self.assessment_name} for {self.user_id}>'
 
 
+class AssessmentScoreSummary(db.Model):
+    """Denormalized, typed copy of an assessment's scores for SQL aggregation"""
+    __tablename__ = 'assessment_score_summaries'
+    
+    assessment_id = db.Column(db.String(36), db.ForeignKey('assessments.id'), primary_key=True)
+    user_id = db.Column(db.String(36), nullable=False, index=True)
+    organization_name = db.Column(db.String(200), nullable=False, index=True)
+    status = db.Column(db.String(50), nullable=False)
+    current_stage = db.Column(db.String(50), nullable=False)
+    risk_level = db.Column(db.String(20), nullable=False)
+    
+    # Scores (NULL until the assessment has been scored, so AVG skips them)
+    overall_score = db.Column(db.Float, nullable=True)
+    base_score = db.Column(db.Float, nullable=True)
+    impact_assessment_score = db.Column(db.Float, nullable=True)
+    development_score = db.Column(db.Float, nullable=True)
+    operations_score = db.Column(db.Float, nullable=True)
+    governance_score = db.Column(db.Float, nullable=True)
+    resources_score = db.Column(db.Float, nullable=True)
+    stakeholders_score = db.Column(db.Float, nullable=True)
+    documentation_score = db.Column(db.Float, nullable=True)
+    
+    # Maturity level counts over completed responses
+    maturity_0 = db.Column(db.Integer, default=0, nullable=False)
+    maturity_1 = db.Column(db.Integer, default=0, nullable=False)
+    maturity_2 = db.Column(db.Integer, default=0, nullable=False)
+    maturity_3 = db.Column(db.Integer, default=0, nullable=False)
+    maturity_4 = db.Column(db.Integer, default=0, nullable=False)
+    maturity_5 = db.Column(db.Integer, default=0, nullable=False)
+    completed_responses = db.Column(db.Integer, default=0, nullable=False)
+    total_responses = db.Column(db.Integer, default=0, nullable=False)
+    assessment_completeness = db.Column(db.Float, nullable=True)
+    
+    # Controls scoring below the gap threshold
+    gap_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Stage progress (0-100)
+    overall_progress = db.Column(db.Float, default=0, nullable=False)
+    requirements_gathering_progress = db.Column(db.Float, default=0, nullable=False)
+    gap_assessment_progress = db.Column(db.Float, default=0, nullable=False)
+    policy_review_progress = db.Column(db.Float, default=0, nullable=False)
+    implementation_status_progress = db.Column(db.Float, default=0, nullable=False)
+    internal_audit_progress = db.Column(db.Float, default=0, nullable=False)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    DOMAINS = ('impact_assessment', 'development', 'operations', 'governance',
+               'resources', 'stakeholders', 'documentation')
+    STAGES = ('requirements_gathering', 'gap_assessment', 'policy_review',
+              'implementation_status', 'internal_audit')
+    
+    # Control scores below this count as gaps
+    GAP_THRESHOLD = 60
+
+    def update_from(self, assessment, scores_data=None):
+        """
+        Refresh the summary from its assessment
+        
+        Args:
+            assessment: Assessment object
+            scores_data: Newly set scores (None to keep the current score columns)
+        """
+        self.user_id = assessment.user_id
+        self.organization_name = assessment.organization_name
+        self.status = assessment.status
+        self.current_stage = assessment.current_stage
+        self.risk_level = assessment.risk_level
+        
+        progress = assessment.get_progress()
+        self.overall_progress = progress.get('overall', 0)
+        for stage in self.STAGES:
+            setattr(self, f'{stage}_progress', progress.get('stages', {}).get(stage, 0))
+        
+        if scores_data is None:
+            return
+        
+        self.overall_score = scores_data.get('overall_score')
+        self.base_score = scores_data.get('base_score')
+        
+        # Domains without responses stay NULL so they don't drag averages down
+        domain_scores = scores_data.get('domain_scores', {})
+        domain_details = scores_data.get('domain_details', {})
+        for domain in self.DOMAINS:
+            answered = domain_details.get(domain, {}).get('response_count', 1) > 0
+            setattr(self, f'{domain}_score', domain_scores.get(domain) if answered else None)
+        
+        # Exact level counts come from the running score sums; the rounded
+        # percentages in the scores are only a fallback
+        score_state = assessment.get_score_state()
+        level_counts = score_state.get('maturity_counts') if score_state else None
+        distribution = scores_data.get('maturity_distribution', {})
+        completed = distribution.get('total_responses', 0)
+        for level in range(6):
+            if level_counts is not None:
+                count = level_counts.get(str(level), 0)
+            else:
+                percentage = distribution.get('distribution', {}).get(str(level), 0)
+                count = int(round(percentage * completed / 100))
+            setattr(self, f'maturity_{level}', count)
+        
+        self.completed_responses = scores_data.get('completed_responses', completed)
+        self.total_responses = scores_data.get('total_responses', 0)
+        self.assessment_completeness = scores_data.get('assessment_completeness')
+        self.gap_count = len([
+            control for control in scores_data.get('control_scores', {}).values()
+            if control.get('score') is not None and control['score'] < self.GAP_THRESHOLD
+        ])
+
+    def __repr__(self):
+        return f'<AssessmentScoreSummary {self.assessment_id}>'
+
+
+class ScoreHistory(db.Model):
+    """Append-only time series of calculated scores with typed columns"""
+    __tablename__ = 'assessment_score_history'
+    __table_args__ = (
+        db.Index('ix_score_history_assessment_recorded', 'assessment_id', 'recorded_at'),
+        db.Index('ix_score_history_recorded', 'recorded_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    assessment_id = db.Column(db.String(36), db.ForeignKey('assessments.id'), nullable=False)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    source = db.Column(db.String(20), nullable=False, default='calculate')  # calculate, rescore
+    risk_level = db.Column(db.String(20), nullable=False)
+    
+    # Scores
+    overall_score = db.Column(db.Float, nullable=False)
+    base_score = db.Column(db.Float, nullable=False)
+    impact_assessment_score = db.Column(db.Float, nullable=False, default=0)
+    development_score = db.Column(db.Float, nullable=False, default=0)
+    operations_score = db.Column(db.Float, nullable=False, default=0)
+    governance_score = db.Column(db.Float, nullable=False, default=0)
+    resources_score = db.Column(db.Float, nullable=False, default=0)
+    stakeholders_score = db.Column(db.Float, nullable=False, default=0)
+    documentation_score = db.Column(db.Float, nullable=False, default=0)
+    
+    # Confidence
+    confidence = db.Column(db.Float, nullable=True)
+    lower_bound = db.Column(db.Float, nullable=True)
+    upper_bound = db.Column(db.Float, nullable=True)
+    assessment_completeness = db.Column(db.Float, nullable=True)
+    completed_responses = db.Column(db.Integer, nullable=False, default=0)
+    
+    DOMAINS = AssessmentScoreSummary.DOMAINS
+
+    @classmethod
+    def from_scores(cls, assessment, scores_data, source='calculate'):
+        """
+        Build a history entry from a scoring result
+        
+        Args:
+            assessment: Assessment the scores belong to
+            scores_data: Result of calculate_assessment_scores
+            source: What triggered the calculation ('calculate', 'rescore')
+        
+        Returns:
+            New ScoreHistory object (not yet added to the session)
+        """
+        entry = cls()
+        entry.assessment_id = assessment.id
+        entry.recorded_at = datetime.utcnow()
+        entry.source = source
+        entry.risk_level = assessment.risk_level
+        entry.overall_score = scores_data.get('overall_score', 0.0)
+        entry.base_score = scores_data.get('base_score', 0.0)
+        
+        domain_scores = scores_data.get('domain_scores', {})
+        for domain in cls.DOMAINS:
+            setattr(entry, f'{domain}_score', domain_scores.get(domain, 0.0))
+        
+        confidence_interval = scores_data.get('confidence_interval', {})
+        entry.confidence = confidence_interval.get('confidence')
+        entry.lower_bound = confidence_interval.get('lower_bound')
+        entry.upper_bound = confidence_interval.get('upper_bound')
+        entry.assessment_completeness = scores_data.get('assessment_completeness')
+        entry.completed_responses = scores_data.get('completed_responses', 0)
+        return entry
+
+    def to_dict(self):
+        """Convert history entry to dictionary"""
+        return {
+            'recorded_at': self.recorded_at.isoformat(),
+            'source': self.source,
+            'risk_level': self.risk_level,
+            'overall_score': self.overall_score,
+            'base_score': self.base_score,
+            'domain_scores': {domain: getattr(self, f'{domain}_score') for domain in self.DOMAINS},
+            'confidence': self.confidence,
+            'lower_bound': self.lower_bound,
+            'upper_bound': self.upper_bound,
+            'assessment_completeness': self.assessment_completeness,
+            'completed_responses': self.completed_responses
+        }
+
+    def __repr__(self):
+        return f'<ScoreHistory {self.assessment_id} at {self.recorded_at}>'
+
+
 class AssessmentResponse(db.Model):
     __tablename__ = 'assessment_responses'
     
@@ -318,17 +560,21 @@ class AssessmentFile(db.Model):
     # File Information
     original_filename = db.Column(db.String(255), nullable=False)
     stored_filename = db.Column(db.String(255), nullable=False)
-    file_path = db.Column(db.String(500), nullable=False)
+    file_path = db.Column(db.String(500), nullable=False)  # storage key (absolute path for legacy local files)
     file_size = db.Column(db.Integer, nullable=False)
     file_type = db.Column(db.String(100), nullable=False)
     mime_type = db.Column(db.String(100), nullable=False)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('evidence_blobs.sha256'), nullable=True, index=True)
+    
+    # Organization storage counter charged at upload (normalized assessment organization name)
+    organization_key = db.Column(db.String(200), nullable=True, index=True)
     
     # Control Association
     control_id = db.Column(db.String(20), nullable=True)
     stage = db.Column(db.String(50), nullable=True)
     
     # File Status
-    scan_status = db.Column(db.String(20), default='pending', nullable=False)  # pending, clean, infected
+    scan_status = db.Column(db.String(20), default='pending', nullable=False)  # pending, clean, infected, error
     is_processed = db.Column(db.Boolean, default=False, nullable=False)
     
     # Metadata
@@ -387,6 +633,7 @@ class AssessmentFile(db.Model):
             'file_size': self.file_size,
             'file_type': self.file_type,
             'mime_type': self.mime_type,
+            'sha256': self.blob_sha256,
             'control_id': self.control_id,
             'stage': self.stage,
             'scan_status': self.scan_status,
@@ -400,3 +647,291 @@ class AssessmentFile(db.Model):
     def __repr__(self):
         return f'<AssessmentFile {self.original_filename} for {self.assessment_id}>'
 
+
+class EvidenceBlob(db.Model):
+    """Stored file content, keyed by SHA-256 and shared by every AssessmentFile with the same bytes"""
+    __tablename__ = 'evidence_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    file_size = db.Column(db.BigInteger, nullable=False)
+    storage_key = db.Column(db.String(500), nullable=False)
+    ref_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Malware Scan
+    scan_status = db.Column(db.String(20), default='pending', nullable=False, index=True)  # pending, clean, infected, error
+    scan_signature = db.Column(db.String(200), nullable=True)
+    scan_attempts = db.Column(db.Integer, default=0, nullable=False)
+    scanned_at = db.Column(db.DateTime, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_referenced_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    files = db.relationship('AssessmentFile', backref='blob', lazy='dynamic')
+
+    def __init__(self, sha256, file_size, storage_key):
+        self.sha256 = sha256
+        self.file_size = file_size
+        self.storage_key = storage_key
+        self.ref_count = 0
+        self.scan_status = 'pending'
+        self.scan_attempts = 0
+
+    def to_dict(self):
+        """Convert blob to dictionary"""
+        return {
+            'sha256': self.sha256,
+            'file_size': self.file_size,
+            'ref_count': self.ref_count,
+            'scan_status': self.scan_status,
+            'scan_signature': self.scan_signature,
+            'scanned_at': self.scanned_at.isoformat() if self.scanned_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_referenced_at': self.last_referenced_at.isoformat() if self.last_referenced_at else None
+        }
+
+    def __repr__(self):
+        return f'<EvidenceBlob {self.sha256} refs={self.ref_count}>'
+
+class EvidenceText(db.Model):
+    """Text extracted from one blob's content, the source of the evidence search index"""
+    __tablename__ = 'evidence_texts'
+    
+    # Integer key doubles as the full-text index rowid
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    sha256 = db.Column(db.String(64), db.ForeignKey('evidence_blobs.sha256'), nullable=False, unique=True)
+    
+    # Extraction
+    status = db.Column(db.String(20), nullable=False)  # indexed, empty, unsupported, failed
+    extractor = db.Column(db.String(20), nullable=True)  # text, docx, pdf
+    content = db.Column(db.Text, nullable=True)
+    char_count = db.Column(db.Integer, default=0, nullable=False)
+    truncated = db.Column(db.Boolean, default=False, nullable=False)
+    error = db.Column(db.String(500), nullable=True)
+    extracted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __init__(self, sha256, status, extractor=None, content=None, truncated=False, error=None):
+        self.sha256 = sha256
+        self.status = status
+        self.extractor = extractor
+        self.content = content
+        self.char_count = len(content) if content else 0
+        self.truncated = truncated
+        self.error = error
+    
+    def to_dict(self):
+        """Convert extracted text metadata to dictionary (without the content)"""
+        return {
+            'sha256': self.sha256,
+            'status': self.status,
+            'extractor': self.extractor,
+            'char_count': self.char_count,
+            'truncated': self.truncated,
+            'error': self.error,
+            'extracted_at': self.extracted_at.isoformat() if self.extracted_at else None
+        }
+    
+    def __repr__(self):
+        return f'<EvidenceText {self.sha256} {self.status}>'
+
+class EvidenceTerm(db.Model):
+    """Inverted index posting (term -> extracted text) used where SQLite FTS5 is unavailable"""
+    __tablename__ = 'evidence_terms'
+    
+    term = db.Column(db.String(100), primary_key=True)
+    text_id = db.Column(db.Integer, db.ForeignKey('evidence_texts.id'), primary_key=True, index=True)
+    frequency = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<EvidenceTerm {self.term} text={self.text_id} x{self.frequency}>'
+
+class StorageUsage(db.Model):
+    """Running evidence storage totals for one user, organization or the whole system"""
+    __tablename__ = 'storage_usage'
+    
+    scope = db.Column(db.String(20), primary_key=True)  # user, organization, global
+    scope_id = db.Column(db.String(200), primary_key=True)  # user ID, normalized organization name, 'all'
+    file_count = db.Column(db.Integer, default=0, nullable=False)
+    total_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __init__(self, scope, scope_id, file_count=0, total_bytes=0):
+        self.scope = scope
+        self.scope_id = scope_id
+        self.file_count = file_count
+        self.total_bytes = total_bytes
+    
+    def to_dict(self):
+        """Convert usage counters to dictionary"""
+        return {
+            'scope': self.scope,
+            'scope_id': self.scope_id,
+            'file_count': self.file_count,
+            'total_bytes': self.total_bytes,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<StorageUsage {self.scope}:{self.scope_id} {self.total_bytes}B>'
+
+class StorageMigration(db.Model):
+    """Progress of a resumable background migration of stored evidence into the current layout"""
+    __tablename__ = 'storage_migrations'
+    
+    id = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), default='idle', nullable=False)  # idle, running, completed, failed
+    phase = db.Column(db.String(20), default='files', nullable=False)  # files, blobs, done
+    cursor = db.Column(db.String(64), default='', nullable=False)  # last file ID or blob digest processed
+    fanout_depth = db.Column(db.Integer, nullable=False)
+    
+    # Counters
+    migrated = db.Column(db.Integer, default=0, nullable=False)
+    skipped = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.String(500), nullable=True)
+    
+    # Timestamps
+    started_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __init__(self, id, fanout_depth):
+        self.id = id
+        self.fanout_depth = fanout_depth
+        self.reset()
+    
+    def reset(self):
+        """Start over from the first file"""
+        self.status = 'idle'
+        self.phase = 'files'
+        self.cursor = ''
+        self.migrated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.last_error = None
+        self.started_at = None
+        self.completed_at = None
+    
+    def to_dict(self):
+        """Convert migration progress to dictionary"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'phase': self.phase,
+            'cursor': self.cursor,
+            'fanout_depth': self.fanout_depth,
+            'migrated': self.migrated,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'last_error': self.last_error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<StorageMigration {self.id} {self.status} {self.phase}>'
+
+class UploadSession(db.Model):
+    """Resumable chunked upload of one evidence file, committed into an AssessmentFile"""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    assessment_id = db.Column(db.String(36), db.ForeignKey('assessments.id'), nullable=False, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
+    
+    # Target file
+    original_filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    mime_type = db.Column(db.String(100), nullable=True)
+    control_id = db.Column(db.String(20), nullable=True)
+    stage = db.Column(db.String(50), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+    
+    # Transfer state
+    partial_path = db.Column(db.String(500), nullable=False)
+    received_ranges = db.Column(db.Text, nullable=False, default='[]')  # JSON list of merged [start, end) ranges
+    received_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+    status = db.Column(db.String(20), default='active', nullable=False)  # active, committed, aborted
+    file_id = db.Column(db.String(36), db.ForeignKey('assessment_files.id'), nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __init__(self, assessment_id, user_id, original_filename, total_size, partial_path, expires_at,
+                 mime_type=None, control_id=None, stage=None, description=None):
+        self.assessment_id = assessment_id
+        self.user_id = user_id
+        self.original_filename = original_filename
+        self.total_size = total_size
+        self.partial_path = partial_path
+        self.expires_at = expires_at
+        self.mime_type = mime_type
+        self.control_id = control_id
+        self.stage = stage
+        self.description = description
+        self.received_ranges = '[]'
+        self.received_bytes = 0
+        self.status = 'active'
+
+    def get_received_ranges(self):
+        """Get received byte ranges as a list of [start, end) pairs"""
+        try:
+            return json.loads(self.received_ranges)
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    def add_received_range(self, start, end):
+        """Record a received byte range, merging it with overlapping or adjacent ranges"""
+        merged = []
+        for range_start, range_end in sorted(self.get_received_ranges() + [[start, end]]):
+            if merged and range_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+        
+        self.received_ranges = json.dumps(merged)
+        self.received_bytes = sum(range_end - range_start for range_start, range_end in merged)
+
+    def get_missing_ranges(self):
+        """Get the byte ranges not yet received as [start, end) pairs"""
+        missing = []
+        position = 0
+        for range_start, range_end in self.get_received_ranges():
+            if range_start > position:
+                missing.append([position, range_start])
+            position = max(position, range_end)
+        if position < self.total_size:
+            missing.append([position, self.total_size])
+        return missing
+
+    def is_complete(self):
+        """Check if every byte of the file has been received"""
+        return self.received_bytes >= self.total_size
+
+    def is_expired(self):
+        """Check if the session has passed its expiry time"""
+        return datetime.utcnow() > self.expires_at
+
+    def to_dict(self):
+        """Convert upload session to dictionary"""
+        return {
+            'id': self.id,
+            'assessment_id': self.assessment_id,
+            'original_filename': self.original_filename,
+            'total_size': self.total_size,
+            'received_bytes': self.received_bytes,
+            'received_ranges': self.get_received_ranges(),
+            'missing_ranges': self.get_missing_ranges(),
+            'status': self.status,
+            'file_id': self.file_id,
+            'control_id': self.control_id,
+            'stage': self.stage,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat()
+        }
+
+    def __repr__(self):
+        return f'<UploadSession {self.original_filename} for {self.assessment_id}>'
@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, case
 
 from src.models.user import User, db
-from src.models.assessment import Assessment, AssessmentResponse, AssessmentFile
+from src.models.assessment import (
+    Assessment, AssessmentResponse, AssessmentFile, AssessmentScoreSummary, ScoreHistory, EvidenceBlob,
+    StorageUsage
+)
+from src.utils.score_cache import score_cache
+from src.utils.evidence_gc import get_evidence_collector, DEFAULT_BATCH_SIZE as GC_BATCH_SIZE
+from src.utils.malware_scan import get_scan_pool
+from src.utils.storage_layout import (
+    get_layout_migrator, get_migration_state, reset_migration, run_migration_batch, DEFAULT_BATCH_SIZE
+)
+from src.utils.storage_quota import get_usage, rebuild_storage_usage, storage_quota, GLOBAL_SCOPE_ID
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -53,11 +63,10 @@ def get_dashboard_stats():
             Assessment.created_at >= thirty_days_ago
         ).count()
         
-        # File statistics
-        total_files = AssessmentFile.query.count()
-        total_file_size = db.session.query(
-            func.sum(AssessmentFile.file_size)
-        ).scalar() or 0
+        # File statistics, from the running storage counters
+        storage_usage = get_usage('global', GLOBAL_SCOPE_ID)
+        total_files = storage_usage.file_count
+        total_file_size = storage_usage.total_bytes
         
         # Industry distribution
         industry_stats = db.session.query(
@@ -77,6 +86,9 @@ def get_dashboard_stats():
             func.count(Assessment.id).label('count')
         ).group_by(Assessment.current_stage).all()
         
+        # Keeps the global counter if this request seeded it
+        db.session.commit()
+        
         return jsonify({
             'users': {
                 'total': total_users,
@@ -106,6 +118,7 @@ def get_dashboard_stats():
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Dashboard stats error: {str(e)}")
         return jsonify({
             'error': 'internal_error',
@@ -335,70 +348,95 @@ def get_compliance_trends():
         days = request.args.get('days', 30, type=int)
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get completed assessments with scores
-        completed_assessments = Assessment.query.filter(
+        summary = AssessmentScoreSummary
+        
+        # Assessments created before the summary table existed get their row once
+        missing = Assessment.query.outerjoin(summary).filter(
+            summary.assessment_id.is_(None),
             Assessment.status == 'completed',
-            Assessment.completed_at >= start_date,
-            Assessment.scores.isnot(None)
+            Assessment.completed_at >= start_date
         ).all()
+        if missing:
+            for assessment in missing:
+                assessment.sync_summary(assessment.get_scores())
+            db.session.commit()
+        
+        # Completed assessments in the period with their current typed scores;
+        # the summary is updated on every scores write, history only on calculation
+        completed_latest = db.session.query(
+            Assessment.completed_at,
+            summary.overall_score.label('score'),
+            Assessment.risk_level,
+            Assessment.industry
+        ).join(summary, summary.assessment_id == Assessment.id).filter(
+            Assessment.status == 'completed',
+            Assessment.completed_at >= start_date,
+            summary.overall_score.isnot(None)
+        )
         
-        # Calculate trends
-        trends = []
-        score_data = []
-        
-        for assessment in completed_assessments:
-            scores = assessment.get_scores()
-            if scores and 'overall_score' in scores:
-                score_data.append({
-                    'date': assessment.completed_at.isoformat(),
-                    'score': scores['overall_score'],
-                    'risk_level': assessment.risk_level,
-                    'industry': assessment.industry
-                })
-        
-        # Calculate average scores by industry
-        industry_scores = {}
-        for data in score_data:
-            industry = data['industry']
-            if industry not in industry_scores:
-                industry_scores[industry] = []
-            industry_scores[industry].append(data['score'])
+        score_data = [{
+            'date': completed_at.isoformat(),
+            'score': score,
+            'risk_level': risk_level,
+            'industry': industry
+        } for completed_at, score, risk_level, industry in completed_latest.order_by(Assessment.completed_at).all()]
         
+        completed_subquery = completed_latest.subquery()
+        
+        # Calculate average scores by industry and risk level
         industry_averages = {
-            industry: round(sum(scores) / len(scores), 1)
-            for industry, scores in industry_scores.items()
+            industry: round(average, 1)
+            for industry, average in db.session.query(
+                completed_subquery.c.industry, func.avg(completed_subquery.c.score)
+            ).group_by(completed_subquery.c.industry).all()
         }
         
-        # Calculate average scores by risk level
-        risk_scores = {}
-        for data in score_data:
-            risk_level = data['risk_level']
-            if risk_level not in risk_scores:
-                risk_scores[risk_level] = []
-            risk_scores[risk_level].append(data['score'])
-        
         risk_averages = {
-            risk_level: round(sum(scores) / len(scores), 1)
-            for risk_level, scores in risk_scores.items()
+            risk_level: round(average, 1)
+            for risk_level, average in db.session.query(
+                completed_subquery.c.risk_level, func.avg(completed_subquery.c.score)
+            ).group_by(completed_subquery.c.risk_level).all()
         }
         
         # Overall statistics
-        all_scores = [data['score'] for data in score_data]
+        score = completed_subquery.c.score
+        stats = db.session.query(
+            func.count(score),
+            func.avg(score),
+            func.min(score),
+            func.max(score),
+            func.sum(case((score >= 90, 1), else_=0)),
+            func.sum(case(((score >= 70) & (score < 90), 1), else_=0)),
+            func.sum(case(((score >= 50) & (score < 70), 1), else_=0)),
+            func.sum(case((score < 50, 1), else_=0))
+        ).one()
+        
         overall_stats = {
-            'total_assessments': len(completed_assessments),
-            'average_score': round(sum(all_scores) / len(all_scores), 1) if all_scores else 0,
-            'min_score': min(all_scores) if all_scores else 0,
-            'max_score': max(all_scores) if all_scores else 0,
+            'total_assessments': stats[0],
+            'average_score': round(stats[1], 1) if stats[1] is not None else 0,
+            'min_score': stats[2] if stats[2] is not None else 0,
+            'max_score': stats[3] if stats[3] is not None else 0,
             'score_distribution': {
-                'excellent': len([s for s in all_scores if s >= 90]),
-                'good': len([s for s in all_scores if 70 <= s < 90]),
-                'fair': len([s for s in all_scores if 50 <= s < 70]),
-                'poor': len([s for s in all_scores if s < 50])
+                'excellent': int(stats[4] or 0),
+                'good': int(stats[5] or 0),
+                'fair': int(stats[6] or 0),
+                'poor': int(stats[7] or 0)
             }
         }
         
+        # Daily average of every score calculated in the period
+        day = func.date(ScoreHistory.recorded_at)
+        daily_averages = [{
+            'date': str(date),
+            'average_score': round(average, 1),
+            'calculations': count
+        } for date, average, count in db.session.query(
+            day, func.avg(ScoreHistory.overall_score), func.count(ScoreHistory.id)
+        ).filter(ScoreHistory.recorded_at >= start_date).group_by(day).order_by(day).all()]
+        
         return jsonify({
             'trends': score_data,
+            'daily_averages': daily_averages,
             'industry_averages': industry_averages,
             'risk_level_averages': risk_averages,
             'overall_stats': overall_stats,
@@ -407,12 +445,388 @@ def get_compliance_trends():
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Get compliance trends error: {str(e)}")
         return jsonify({
             'error': 'internal_error',
             'message': 'An error occurred while fetching compliance trends'
         }), 500
 
+@admin_bp.route('/assessments/rescore', methods=['POST'])
+@jwt_required()
+@require_admin()
+def rescore_assessments():
+    """Recalculate stored scores for all assessments using the batch engine"""
+    try:
+        from src.utils.batch_scoring import score_assessments_with_states
+
+        data = request.get_json(silent=True) or {}
+        status = data.get('status')
+        batch_size = data.get('batch_size', 500)
+
+        if isinstance(batch_size, bool) or not isinstance(batch_size, int) or not 1 <= batch_size <= 5000:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'batch_size must be an integer between 1 and 5000'
+            }), 400
+
+        query = Assessment.query
+        if status:
+            query = query.filter(Assessment.status == status)
+
+        rescored = 0
+        last_id = None
+
+        # Page through by primary key so only one chunk is held at a time
+        while True:
+            page = query
+            if last_id is not None:
+                page = page.filter(Assessment.id > last_id)
+            chunk = page.order_by(Assessment.id).limit(batch_size).all()
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            # Load responses for the whole chunk in a single query
+            responses = AssessmentResponse.query.filter(
+                AssessmentResponse.assessment_id.in_([a.id for a in chunk])
+            ).all()
+
+            results = score_assessments_with_states(chunk, responses)
+            for assessment in chunk:
+                scores, score_state = results[assessment.id]
+                # Reseed the running sums so later incremental updates start from these scores
+                assessment.set_score_state(score_state)
+                assessment.set_scores(scores)
+                db.session.add(ScoreHistory.from_scores(assessment, scores, source='rescore'))
+
+            db.session.commit()
+            rescored += len(chunk)
+
+            # Drop the committed chunk from the identity map before loading the next
+            db.session.expunge_all()
+
+        return jsonify({
+            'message': 'Assessments rescored successfully',
+            'rescored': rescored,
+            'generated_at': datetime.utcnow().isoformat()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Rescore assessments error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while rescoring assessments'
+        }), 500
+
+@admin_bp.route('/files/scans', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_scan_status():
+    """Get malware scan counts by status and the quarantined blobs"""
+    try:
+        counts = dict(
+            db.session.query(EvidenceBlob.scan_status, func.count(EvidenceBlob.sha256))
+            .group_by(EvidenceBlob.scan_status).all()
+        )
+        
+        quarantined = EvidenceBlob.query.filter(
+            EvidenceBlob.scan_status.in_(['infected', 'error'])
+        ).order_by(desc(EvidenceBlob.scanned_at)).limit(100).all()
+        
+        return jsonify({
+            'counts': {status: counts.get(status, 0) for status in ('pending', 'clean', 'infected', 'error')},
+            'quarantined': [blob.to_dict() for blob in quarantined],
+            'pool': get_scan_pool().stats()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get scan status error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while fetching scan status'
+        }), 500
+
+@admin_bp.route('/files/rescan', methods=['POST'])
+@jwt_required()
+@require_admin()
+def rescan_pending_files():
+    """Queue every blob still pending (or whose scan failed) for another scan"""
+    try:
+        # Failed blobs get a fresh set of attempts
+        EvidenceBlob.query.filter_by(scan_status='error').update(
+            {'scan_status': 'pending', 'scan_attempts': 0}, synchronize_session=False
+        )
+        AssessmentFile.query.filter_by(scan_status='error').update(
+            {'scan_status': 'pending'}, synchronize_session=False
+        )
+        db.session.commit()
+        
+        queued = get_scan_pool().requeue_pending()
+        
+        return jsonify({
+            'message': 'Pending files queued for scanning',
+            'queued': queued
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Rescan files error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while queueing scans'
+        }), 500
+
+@admin_bp.route('/storage/usage', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_storage_usage():
+    """Get the largest users and organizations by evidence storage, with quotas"""
+    try:
+        scope = request.args.get('scope', 'organization')
+        if scope not in ('user', 'organization'):
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'scope must be user or organization'
+            }), 400
+        
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        usages = StorageUsage.query.filter_by(scope=scope).order_by(
+            desc(StorageUsage.total_bytes)
+        ).limit(limit).all()
+        
+        quota = storage_quota(scope)
+        global_usage = get_usage('global', GLOBAL_SCOPE_ID)
+        db.session.commit()
+        
+        return jsonify({
+            'scope': scope,
+            'quotaBytes': quota or None,
+            'global': global_usage.to_dict(),
+            'usage': [
+                dict(usage.to_dict(), used_percent=round(usage.total_bytes / quota * 100, 1) if quota else None)
+                for usage in usages
+            ]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Get storage usage error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while fetching storage usage'
+        }), 500
+
+@admin_bp.route('/storage/usage/rebuild', methods=['POST'])
+@jwt_required()
+@require_admin()
+def rebuild_usage():
+    """Recompute every storage counter from the file table"""
+    try:
+        counters = rebuild_storage_usage()
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Storage usage counters rebuilt',
+            'counters': counters
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Rebuild storage usage error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while rebuilding storage usage'
+        }), 500
+
+@admin_bp.route('/storage/migration', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_storage_migration():
+    """Get progress of the evidence storage layout migration"""
+    try:
+        state = get_migration_state()
+        db.session.commit()
+        
+        return jsonify({
+            'migration': state.to_dict(),
+            'running': get_layout_migrator().running,
+            'legacyFiles': AssessmentFile.query.filter(AssessmentFile.blob_sha256.is_(None)).count()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Get storage migration error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while fetching migration progress'
+        }), 500
+
+@admin_bp.route('/storage/migration', methods=['POST'])
+@jwt_required()
+@require_admin()
+def control_storage_migration():
+    """
+    Start, step or stop the evidence storage layout migration
+    
+    Body: {"action": "start" | "step" | "stop", "reset": bool, "batchSize": int}.
+    'step' runs a single batch within the request, for deployments without
+    background threads.
+    """
+    try:
+        data = request.get_json() or {}
+        action = data.get('action', 'start')
+        batch_size = data.get('batchSize', DEFAULT_BATCH_SIZE)
+        
+        if action not in ('start', 'step', 'stop'):
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'action must be start, step or stop'
+            }), 400
+        
+        if isinstance(batch_size, bool) or not isinstance(batch_size, int) or not 1 <= batch_size <= 1000:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'batchSize must be an integer between 1 and 1000'
+            }), 400
+        
+        migrator = get_layout_migrator()
+        
+        if action == 'stop':
+            migrator.stop()
+            return jsonify({
+                'message': 'Migration will stop after the current batch',
+                'running': migrator.running
+            }), 200
+        
+        if migrator.running:
+            return jsonify({
+                'error': 'migration_running',
+                'message': 'Migration is already running'
+            }), 409
+        
+        if get_evidence_collector().running:
+            return jsonify({
+                'error': 'gc_running',
+                'message': 'Wait for garbage collection to finish'
+            }), 409
+        
+        if data.get('reset'):
+            reset_migration()
+            db.session.commit()
+        
+        if action == 'step':
+            progress = run_migration_batch(batch_size)
+            return jsonify({
+                'message': 'Migration batch completed',
+                'migration': progress
+            }), 200
+        
+        migrator.start(batch_size)
+        return jsonify({
+            'message': 'Migration started',
+            'migration': get_migration_state().to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Storage migration error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while running the migration'
+        }), 500
+
+@admin_bp.route('/storage/gc', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_storage_gc():
+    """Get the report of the last evidence garbage collection"""
+    collector = get_evidence_collector()
+    return jsonify({
+        'running': collector.running,
+        'report': collector.last_report
+    }), 200
+
+@admin_bp.route('/storage/gc', methods=['POST'])
+@jwt_required()
+@require_admin()
+def control_storage_gc():
+    """
+    Start, run or stop evidence garbage collection
+    
+    Body: {"action": "start" | "run" | "stop", "dryRun": bool, "batchSize": int}.
+    dryRun defaults to true, so nothing is deleted unless asked for. 'run'
+    collects within the request and returns the report, for deployments
+    without background threads.
+    """
+    try:
+        data = request.get_json() or {}
+        action = data.get('action', 'start')
+        dry_run = data.get('dryRun', True)
+        batch_size = data.get('batchSize', GC_BATCH_SIZE)
+        
+        if action not in ('start', 'run', 'stop'):
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'action must be start, run or stop'
+            }), 400
+        
+        if not isinstance(dry_run, bool):
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'dryRun must be a boolean'
+            }), 400
+        
+        if isinstance(batch_size, bool) or not isinstance(batch_size, int) or not 1 <= batch_size <= 1000:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'batchSize must be an integer between 1 and 1000'
+            }), 400
+        
+        collector = get_evidence_collector()
+        
+        if action == 'stop':
+            collector.stop()
+            return jsonify({
+                'message': 'Garbage collection will stop after the current batch',
+                'running': collector.running
+            }), 200
+        
+        if collector.running:
+            return jsonify({
+                'error': 'gc_running',
+                'message': 'Garbage collection is already running'
+            }), 409
+        
+        # Keys move while the layout migration runs; collect once it is done
+        if get_layout_migrator().running:
+            return jsonify({
+                'error': 'migration_running',
+                'message': 'Wait for the storage layout migration to finish'
+            }), 409
+        
+        if action == 'run':
+            report = collector.run(dry_run, batch_size)
+            return jsonify({
+                'message': 'Garbage collection completed',
+                'report': report
+            }), 200
+        
+        collector.start(dry_run, batch_size)
+        return jsonify({
+            'message': 'Garbage collection started',
+            'dryRun': dry_run
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Storage garbage collection error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while collecting garbage'
+        }), 500
+
 @admin_bp.route('/system/health', methods=['GET'])
 @jwt_required()
 @require_admin()
@@ -451,7 +865,9 @@ def get_system_health():
         app_metrics = {
             'uptime': 'N/A',  # Would need to track application start time
             'memory_usage': 'N/A',  # Would need process monitoring
-            'active_connections': 'N/A'  # Would need connection tracking
+            'active_connections': 'N/A',  # Would need connection tracking
+            'score_cache': score_cache.stats(),
+            'malware_scan': get_scan_pool().stats()
         }
         
         return jsonify({
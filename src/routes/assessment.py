@@ -1,15 +1,36 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import func, case, desc
 import json
 
 from src.models.user import User, db
-from src.models.assessment import Assessment, AssessmentResponse, AssessmentFile
-from src.utils.scoring import calculate_compliance_score, get_iso42001_controls
-from src.utils.validation import validate_assessment_response
+from src.models.assessment import (
+    Assessment, AssessmentResponse, AssessmentFile, AssessmentScoreSummary, ScoreHistory
+)
+from src.utils.scoring import (
+    calculate_compliance_score, get_control_catalog, snapshot_response,
+    build_score_state, apply_response_change, calculate_scores_from_state,
+    score_state_needs_rebuild
+)
+from src.utils.catalog import CatalogError, DEFAULT_FRAMEWORK, DEFAULT_VERSION, list_catalogs, make_catalog_key
+from src.utils.score_cache import score_cache, score_cache_key
+from src.utils.validation import validate_assessment_response, get_validation_schema, get_declared_type_schema
 
 assessment_bp = Blueprint('assessment', __name__)
 
+# Upper bound on what-if scenarios scored in one simulate request
+MAX_SIMULATION_SCENARIOS = 5000
+
+# Number of highest-gap assessments listed in the portfolio rollup
+PORTFOLIO_TOP_GAPS = 5
+
+# Maximum score history entries returned per request
+MAX_SCORE_HISTORY_POINTS = 500
+
+# Maximum control responses accepted by one batch submission
+MAX_BATCH_RESPONSES = 500
+
 @assessment_bp.route('', methods=['POST'])
 @jwt_required()
 def create_assessment():
@@ -36,6 +57,15 @@ def create_assessment():
                 'message': 'Risk level must be low, medium, or high'
             }), 400
         
+        # Resolve the control catalog the assessment will be scored against
+        try:
+            catalog = get_control_catalog(data.get('catalogVersion'))
+        except CatalogError as e:
+            return jsonify({
+                'error': 'invalid_catalog',
+                'message': str(e)
+            }), 400
+        
         # Create assessment
         assessment = Assessment(
             user_id=current_user_id,
@@ -44,7 +74,8 @@ def create_assessment():
             ai_system_description=data['aiSystemDescription'],
             industry=data['industry'],
             risk_level=data['riskLevel'],
-            regulatory_requirements=data.get('regulatoryRequirements', [])
+            regulatory_requirements=data.get('regulatoryRequirements', []),
+            catalog_version=catalog.key
         )
         
         db.session.add(assessment)
@@ -158,6 +189,15 @@ def update_assessment(assessment_id):
         if 'regulatoryRequirements' in data:
             assessment.set_regulatory_requirements(data['regulatoryRequirements'])
         
+        assessment.sync_summary()
+        
+        # Risk level feeds the risk adjustment, so refresh scores from the running sums
+        if 'risk_level' in data:
+            score_state = assessment.get_score_state()
+            if score_state is not None:
+                catalog = get_control_catalog(assessment.catalog_version)
+                assessment.set_scores(calculate_scores_from_state(score_state, assessment.risk_level, catalog))
+        
         assessment.updated_at = datetime.utcnow()
         db.session.commit()
         
@@ -171,6 +211,54 @@ def update_assessment(assessment_id):
             'message': 'An error occurred while updating the assessment'
         }), 500
 
+def _missing_response_fields(data):
+    """Get the required response submission fields missing from request data"""
+    required_fields = ['stage', 'controlId', 'responses']
+    return [field for field in required_fields if not data.get(field)]
+
+def _apply_response_data(response, data, control_info):
+    """
+    Update a response from submitted data, validate it and recalculate its score
+    
+    Args:
+        response: AssessmentResponse to update
+        data: Submitted response data (responses, comments, evidenceFiles)
+        control_info: Control definition from the assessment's catalog
+    
+    Returns:
+        Validation results for the response
+    """
+    # Update response data
+    response.set_responses(data['responses'])
+    response.maturity_level = data['responses'].get('maturityLevel')
+    response.comments = data.get('comments')
+    
+    if 'evidenceFiles' in data:
+        response.set_evidence_files(data['evidenceFiles'])
+    
+    # Validate response
+    validation_result = validate_assessment_response(response, control_info)
+    response.evidence_completeness = validation_result.get('evidence_completeness', 0.5)
+    response.response_quality = validation_result.get('response_quality', 0.5)
+    
+    # Calculate score for this control
+    if response.maturity_level is not None:
+        response.calculated_score = calculate_compliance_score(
+            response.maturity_level,
+            response.evidence_completeness,
+            response.response_quality
+        )
+    
+    response.updated_at = datetime.utcnow()
+    
+    return validation_result
+
+def _stage_progress(catalog, stage, stage_responses):
+    """Calculate stage progress based on completed responses"""
+    stage_control_count = catalog.stage_control_count(stage)
+    completed_responses = len([r for r in stage_responses if r.maturity_level is not None])
+    return (completed_responses / stage_control_count) * 100 if stage_control_count else 0
+
 @assessment_bp.route('/<assessment_id>/responses', methods=['PUT'])
 @jwt_required()
 def submit_response(assessment_id):
@@ -178,10 +266,12 @@ def submit_response(assessment_id):
     try:
         current_user_id = get_jwt_identity()
         
+        # Lock the row so concurrent submissions apply their deltas to the
+        # score state one after another instead of overwriting each other
         assessment = Assessment.query.filter_by(
             id=assessment_id,
             user_id=current_user_id
-        ).first()
+        ).with_for_update().first()
         
         if not assessment:
             return jsonify({
@@ -192,8 +282,7 @@ def submit_response(assessment_id):
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['stage', 'controlId', 'responses']
-        missing_fields = [field for field in required_fields if not data.get(field)]
+        missing_fields = _missing_response_fields(data)
         
         if missing_fields:
             return jsonify({
@@ -205,9 +294,9 @@ def submit_response(assessment_id):
         control_id = data['controlId']
         stage = data['stage']
         
-        # Get control information
-        controls = get_iso42001_controls()
-        control_info = controls.get(control_id)
+        # Get control information from the assessment's catalog version
+        catalog = get_control_catalog(assessment.catalog_version)
+        control_info = catalog.get(control_id)
         
         if not control_info:
             return jsonify({
@@ -221,6 +310,17 @@ def submit_response(assessment_id):
             control_id=control_id
         ).first()
         
+        # Running score sums; assessments created before they existed are
+        # seeded once from their stored responses
+        score_state = assessment.get_score_state()
+        if score_state is None:
+            score_state = build_score_state(
+                AssessmentResponse.query.filter_by(assessment_id=assessment_id).all(),
+                catalog
+            )
+        
+        previous_snapshot = snapshot_response(response) if response else None
+        
         if not response:
             response = AssessmentResponse(
                 assessment_id=assessment_id,
@@ -230,28 +330,19 @@ def submit_response(assessment_id):
             )
             db.session.add(response)
         
-        # Update response data
-        response.set_responses(data['responses'])
-        response.maturity_level = data['responses'].get('maturityLevel')
-        response.comments = data.get('comments')
-        
-        if 'evidenceFiles' in data:
-            response.set_evidence_files(data['evidenceFiles'])
-        
-        # Validate response
-        validation_result = validate_assessment_response(response, control_info)
-        response.evidence_completeness = validation_result.get('evidence_completeness', 0.5)
-        response.response_quality = validation_result.get('response_quality', 0.5)
-        
-        # Calculate score for this control
-        if response.maturity_level is not None:
-            response.calculated_score = calculate_compliance_score(
-                response.maturity_level,
-                response.evidence_completeness,
-                response.response_quality
-            )
+        validation_result = _apply_response_data(response, data, control_info)
         
-        response.updated_at = datetime.utcnow()
+        # Update running scores in O(1) instead of rescoring every response,
+        # rebuilding them from the stored responses once they drift
+        apply_response_change(score_state, previous_snapshot, snapshot_response(response), catalog)
+        if score_state_needs_rebuild(score_state):
+            score_state = build_score_state(
+                AssessmentResponse.query.filter_by(assessment_id=assessment_id).all(),
+                catalog
+            )
+        scores = calculate_scores_from_state(score_state, assessment.risk_level, catalog)
+        assessment.set_score_state(score_state)
+        assessment.set_scores(scores)
         
         # Update assessment progress
         stage_responses = AssessmentResponse.query.filter_by(
@@ -259,20 +350,18 @@ def submit_response(assessment_id):
             stage=stage
         ).all()
         
-        # Calculate stage progress based on completed responses
-        stage_controls = [c for c in controls.values() if c['stage'] == stage]
-        completed_responses = len([r for r in stage_responses if r.maturity_level is not None])
-        stage_progress = (completed_responses / len(stage_controls)) * 100 if stage_controls else 0
-        
-        assessment.update_stage_progress(stage, stage_progress)
+        assessment.update_stage_progress(stage, _stage_progress(catalog, stage, stage_responses))
         
         db.session.commit()
+        score_cache.invalidate(assessment_id)
         
         return jsonify({
             'assessmentId': assessment_id,
             'controlId': control_id,
             'stage': stage,
             'progress': assessment.get_progress(),
+            'overallScore': scores['overall_score'],
+            'domainScores': scores['domain_scores'],
             'validationResults': validation_result,
             'response': response.to_dict()
         }), 200
@@ -285,6 +374,154 @@ def submit_response(assessment_id):
             'message': 'An error occurred while submitting the response'
         }), 500
 
+@assessment_bp.route('/<assessment_id>/responses/batch', methods=['PUT'])
+@jwt_required()
+def submit_responses_batch(assessment_id):
+    """Submit or update many assessment responses in one transaction"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Lock the row so concurrent submissions apply their deltas to the
+        # score state one after another instead of overwriting each other
+        assessment = Assessment.query.filter_by(
+            id=assessment_id,
+            user_id=current_user_id
+        ).with_for_update().first()
+        
+        if not assessment:
+            return jsonify({
+                'error': 'assessment_not_found',
+                'message': 'Assessment not found or access denied'
+            }), 404
+        
+        data = request.get_json() or {}
+        items = data.get('responses')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'responses must be a non-empty list'
+            }), 400
+        
+        if len(items) > MAX_BATCH_RESPONSES:
+            return jsonify({
+                'error': 'validation_error',
+                'message': f'At most {MAX_BATCH_RESPONSES} responses can be submitted per request'
+            }), 400
+        
+        catalog = get_control_catalog(assessment.catalog_version)
+        
+        # Validate every item before writing anything
+        errors = []
+        seen_controls = set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'message': 'Response must be an object'})
+                continue
+            
+            missing_fields = _missing_response_fields(item)
+            if missing_fields:
+                errors.append({
+                    'index': index,
+                    'controlId': item.get('controlId'),
+                    'message': ', '.join(f'{field} is required' for field in missing_fields)
+                })
+            elif item['controlId'] not in catalog:
+                errors.append({
+                    'index': index,
+                    'controlId': item['controlId'],
+                    'message': f"Invalid control ID: {item['controlId']}"
+                })
+            elif item['controlId'] in seen_controls:
+                errors.append({
+                    'index': index,
+                    'controlId': item['controlId'],
+                    'message': 'Duplicate control ID in batch'
+                })
+            else:
+                seen_controls.add(item['controlId'])
+        
+        if errors:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'Invalid responses',
+                'details': errors
+            }), 400
+        
+        # One query for every existing response; also seeds the running sums
+        existing = AssessmentResponse.query.filter_by(assessment_id=assessment_id).all()
+        responses_by_control = {response.control_id: response for response in existing}
+        
+        score_state = assessment.get_score_state()
+        if score_state is None:
+            score_state = build_score_state(existing, catalog)
+        
+        results = []
+        affected_stages = set()
+        
+        for item in items:
+            control_id = item['controlId']
+            control_info = catalog.get(control_id)
+            
+            response = responses_by_control.get(control_id)
+            previous_snapshot = snapshot_response(response) if response else None
+            
+            if not response:
+                response = AssessmentResponse(
+                    assessment_id=assessment_id,
+                    control_id=control_id,
+                    stage=item['stage'],
+                    domain=control_info['domain']
+                )
+                db.session.add(response)
+                responses_by_control[control_id] = response
+            
+            validation_result = _apply_response_data(response, item, control_info)
+            apply_response_change(score_state, previous_snapshot, snapshot_response(response), catalog)
+            
+            affected_stages.add(item['stage'])
+            results.append((item['stage'], response, validation_result))
+        
+        if score_state_needs_rebuild(score_state):
+            score_state = build_score_state(list(responses_by_control.values()), catalog)
+        
+        scores = calculate_scores_from_state(score_state, assessment.risk_level, catalog)
+        assessment.set_score_state(score_state)
+        assessment.set_scores(scores)
+        
+        # Recompute progress once per affected stage from the in-memory responses
+        for stage in affected_stages:
+            stage_responses = [r for r in responses_by_control.values() if r.stage == stage]
+            assessment.update_stage_progress(stage, _stage_progress(catalog, stage, stage_responses))
+        
+        db.session.commit()
+        score_cache.invalidate(assessment_id)
+        
+        return jsonify({
+            'assessmentId': assessment_id,
+            'progress': assessment.get_progress(),
+            'overallScore': scores['overall_score'],
+            'domainScores': scores['domain_scores'],
+            'results': [
+                {
+                    'controlId': response.control_id,
+                    'stage': stage,
+                    'validationResults': validation_result,
+                    'response': response.to_dict()
+                }
+                for stage, response, validation_result in results
+            ],
+            'total': len(results)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Submit responses batch error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while submitting the responses'
+        }), 500
+
 @assessment_bp.route('/<assessment_id>/responses', methods=['GET'])
 @jwt_required()
 def get_responses(assessment_id):
@@ -357,24 +594,33 @@ def calculate_score(assessment_id):
                 'message': 'No responses found for this assessment'
             }), 400
         
-        # Calculate scores using the scoring algorithm
-        from src.utils.scoring import calculate_assessment_scores
+        catalog = get_control_catalog(assessment.catalog_version)
         
-        scores = calculate_assessment_scores(responses, assessment.risk_level)
+        # Unchanged responses, risk level and configuration give the same
+        # scores, which are already stored on the assessment
+        cache_key = score_cache_key(responses, assessment.risk_level, catalog.key)
+        scores = score_cache.get(cache_key)
         
-        # Save scores to assessment
-        assessment.set_scores(scores)
-        assessment.updated_at = datetime.utcnow()
+        if scores is None:
+            # Calculate scores using the scoring algorithm, reseeding the running sums
+            score_state = build_score_state(responses, catalog)
+            scores = calculate_scores_from_state(score_state, assessment.risk_level, catalog)
+            
+            # Save scores to assessment and append them to the history
+            assessment.set_score_state(score_state)
+            assessment.set_scores(scores)
+            assessment.updated_at = datetime.utcnow()
+            db.session.add(ScoreHistory.from_scores(assessment, scores))
         
         # Check if assessment is complete
-        controls = get_iso42001_controls()
-        total_controls = len(controls)
+        total_controls = catalog.total_controls
         completed_responses = len([r for r in responses if r.maturity_level is not None])
         
         if completed_responses >= total_controls * 0.8:  # 80% completion threshold
             assessment.complete_assessment()
         
         db.session.commit()
+        score_cache.put(cache_key, scores, assessment_id)
         
         return jsonify({
             'assessmentId': assessment_id,
@@ -395,6 +641,211 @@ def calculate_score(assessment_id):
             'message': 'An error occurred while calculating scores'
         }), 500
 
+@assessment_bp.route('/<assessment_id>/score-history', methods=['GET'])
+@jwt_required()
+def get_score_history(assessment_id):
+    """Get the score time series of an assessment with sparkline and deltas"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        assessment = Assessment.query.filter_by(
+            id=assessment_id,
+            user_id=current_user_id
+        ).first()
+        
+        if not assessment:
+            return jsonify({
+                'error': 'assessment_not_found',
+                'message': 'Assessment not found or access denied'
+            }), 404
+        
+        limit = min(request.args.get('limit', 50, type=int), MAX_SCORE_HISTORY_POINTS)
+        days = request.args.get('days', type=int)
+        
+        # Newest entries first via the (assessment_id, recorded_at) index
+        query = ScoreHistory.query.filter(ScoreHistory.assessment_id == assessment_id)
+        if days:
+            query = query.filter(ScoreHistory.recorded_at >= datetime.utcnow() - timedelta(days=days))
+        entries = query.order_by(desc(ScoreHistory.recorded_at), desc(ScoreHistory.id)).limit(limit).all()
+        entries.reverse()
+        
+        sparkline = [entry.overall_score for entry in entries]
+        
+        return jsonify({
+            'assessmentId': assessment_id,
+            'history': [entry.to_dict() for entry in entries],
+            'sparkline': sparkline,
+            'latestScore': sparkline[-1] if sparkline else None,
+            'delta': round(sparkline[-1] - sparkline[-2], 2) if len(sparkline) > 1 else None,
+            'periodDelta': round(sparkline[-1] - sparkline[0], 2) if len(sparkline) > 1 else None,
+            'minScore': min(sparkline) if sparkline else None,
+            'maxScore': max(sparkline) if sparkline else None,
+            'total': len(entries)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get score history error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while fetching score history'
+        }), 500
+
+@assessment_bp.route('/<assessment_id>/simulate', methods=['POST'])
+@jwt_required()
+def simulate_scores(assessment_id):
+    """Score hypothetical maturity and evidence changes without saving them"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        assessment = Assessment.query.filter_by(
+            id=assessment_id,
+            user_id=current_user_id
+        ).first()
+        
+        if not assessment:
+            return jsonify({
+                'error': 'assessment_not_found',
+                'message': 'Assessment not found or access denied'
+            }), 404
+        
+        data = request.get_json() or {}
+        scenarios = data.get('scenarios')
+        
+        if not isinstance(scenarios, list) or not scenarios:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'scenarios must be a non-empty list'
+            }), 400
+        
+        if len(scenarios) > MAX_SIMULATION_SCENARIOS:
+            return jsonify({
+                'error': 'validation_error',
+                'message': f'At most {MAX_SIMULATION_SCENARIOS} scenarios can be simulated per request'
+            }), 400
+        
+        # Translate request changes into scoring fields
+        errors = []
+        scenario_changes = []
+        for index, scenario in enumerate(scenarios):
+            changes = scenario.get('changes') if isinstance(scenario, dict) else None
+            if not isinstance(changes, list):
+                errors.append(f'Scenario {index}: changes must be a list')
+                continue
+            
+            parsed = []
+            for change in changes:
+                if not isinstance(change, dict) or not change.get('controlId'):
+                    errors.append(f'Scenario {index}: controlId is required for every change')
+                    continue
+                
+                fields = {'control_id': change['controlId']}
+                if 'maturityLevel' in change:
+                    level = change['maturityLevel']
+                    if isinstance(level, bool) or not isinstance(level, int) or not 0 <= level <= 5:
+                        errors.append(f'Scenario {index}: maturityLevel must be an integer from 0 to 5')
+                        continue
+                    fields['maturity_level'] = level
+                for key, field in (('evidenceCompleteness', 'evidence_completeness'),
+                                   ('responseQuality', 'response_quality')):
+                    if key in change:
+                        value = change[key]
+                        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+                            errors.append(f'Scenario {index}: {key} must be a number from 0 to 1')
+                            break
+                        fields[field] = float(value)
+                else:
+                    parsed.append(fields)
+            scenario_changes.append(parsed)
+        
+        if errors:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'Invalid scenarios',
+                'details': errors[:50]
+            }), 400
+        
+        from src.utils.batch_scoring import simulate_scenarios
+        
+        responses = AssessmentResponse.query.filter_by(assessment_id=assessment_id).all()
+        
+        try:
+            results = simulate_scenarios(
+                responses,
+                scenario_changes,
+                assessment.risk_level,
+                get_control_catalog(assessment.catalog_version)
+            )
+        except ValueError as e:
+            return jsonify({
+                'error': 'validation_error',
+                'message': str(e)
+            }), 400
+        
+        return jsonify({
+            'assessmentId': assessment_id,
+            'riskLevel': assessment.risk_level,
+            'catalogVersion': results['catalog_version'],
+            'baseline': {
+                'overallScore': results['baseline']['overall_score'],
+                'domainScores': results['baseline']['domain_scores']
+            },
+            'scenarios': [
+                {
+                    'name': scenario.get('name') if isinstance(scenario, dict) else None,
+                    'overallScore': result['overall_score'],
+                    'scoreDelta': result['score_delta'],
+                    'domainScores': result['domain_scores'],
+                    'changedControls': result['changed_controls']
+                }
+                for scenario, result in zip(scenarios, results['scenarios'])
+            ],
+            'simulatedAt': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Simulate scores error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while simulating scores'
+        }), 500
+
+@assessment_bp.route('/<assessment_id>/framework-coverage', methods=['GET'])
+@jwt_required()
+def get_framework_coverage(assessment_id):
+    """Get coverage of mapped frameworks (EU AI Act, NIST AI RMF) for an assessment"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        assessment = Assessment.query.filter_by(
+            id=assessment_id,
+            user_id=current_user_id
+        ).first()
+        
+        if not assessment:
+            return jsonify({
+                'error': 'assessment_not_found',
+                'message': 'Assessment not found or access denied'
+            }), 404
+        
+        from src.utils.framework_mapping import calculate_framework_coverage
+        
+        responses = AssessmentResponse.query.filter_by(assessment_id=assessment_id).all()
+        coverage = calculate_framework_coverage([responses], assessment.catalog_version)[0]
+        
+        return jsonify({
+            'assessmentId': assessment_id,
+            'catalogVersion': get_control_catalog(assessment.catalog_version).key,
+            'frameworks': coverage,
+            'calculatedAt': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Framework coverage error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while calculating framework coverage'
+        }), 500
+
 @assessment_bp.route('/<assessment_id>/advance-stage', methods=['POST'])
 @jwt_required()
 def advance_stage(assessment_id):
@@ -506,20 +957,229 @@ def generate_report(assessment_id):
             'message': 'An error occurred while generating the report'
         }), 500
 
+@assessment_bp.route('/framework-coverage', methods=['GET'])
+@jwt_required()
+def get_portfolio_framework_coverage():
+    """Get mapped framework scores for all of the current user's assessments"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        from src.utils.framework_mapping import calculate_framework_coverage
+        
+        assessments = Assessment.query.filter_by(user_id=current_user_id).all()
+        
+        # Load responses for every assessment in a single query
+        responses_by_assessment = {assessment.id: [] for assessment in assessments}
+        if assessments:
+            for response in AssessmentResponse.query.filter(
+                AssessmentResponse.assessment_id.in_(list(responses_by_assessment))
+            ).all():
+                responses_by_assessment[response.assessment_id].append(response)
+        
+        # Score each catalog version's assessments together
+        by_catalog = {}
+        for assessment in assessments:
+            by_catalog.setdefault(assessment.catalog_version, []).append(assessment)
+        
+        results = []
+        for catalog_version, members in by_catalog.items():
+            coverage = calculate_framework_coverage(
+                [responses_by_assessment[assessment.id] for assessment in members],
+                catalog_version
+            )
+            for assessment, frameworks in zip(members, coverage):
+                results.append({
+                    'assessmentId': assessment.id,
+                    'assessmentName': assessment.assessment_name,
+                    'aiSystemDescription': assessment.ai_system_description,
+                    'frameworks': {
+                        framework_id: {
+                            'name': framework['name'],
+                            'score': framework['score'],
+                            'requirementsMet': framework['requirements_met'],
+                            'requirementsPartial': framework['requirements_partial'],
+                            'requirementsGap': framework['requirements_gap']
+                        }
+                        for framework_id, framework in frameworks.items()
+                    }
+                })
+        
+        return jsonify({
+            'assessments': results,
+            'total': len(results),
+            'calculatedAt': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Portfolio framework coverage error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while calculating framework coverage'
+        }), 500
+
+@assessment_bp.route('/portfolio', methods=['GET'])
+@jwt_required()
+def get_portfolio():
+    """Aggregate scores, maturity, gaps and progress across many assessments"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        is_admin = user is not None and user.user_role == 'admin'
+        
+        organization = request.args.get('organization')
+        user_id = request.args.get('user_id') if is_admin else current_user_id
+        
+        if not organization and not user_id:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'organization or user_id is required'
+            }), 400
+        
+        summary = AssessmentScoreSummary
+        filters = []
+        if organization:
+            filters.append(summary.organization_name == organization)
+        if user_id:
+            filters.append(summary.user_id == user_id)
+        
+        # Assessments created before the summary table existed get their row once
+        missing_query = Assessment.query.outerjoin(summary).filter(summary.assessment_id.is_(None))
+        if organization:
+            missing_query = missing_query.filter(Assessment.organization_name == organization)
+        if user_id:
+            missing_query = missing_query.filter(Assessment.user_id == user_id)
+        missing = missing_query.all()
+        if missing:
+            for assessment in missing:
+                assessment.sync_summary(assessment.get_scores())
+            db.session.commit()
+        
+        domain_columns = [getattr(summary, f'{domain}_score') for domain in summary.DOMAINS]
+        maturity_columns = [getattr(summary, f'maturity_{level}') for level in range(6)]
+        stage_columns = [getattr(summary, f'{stage}_progress') for stage in summary.STAGES]
+        
+        # Single aggregate row computed by the database
+        totals = db.session.query(
+            func.count(summary.assessment_id),
+            func.count(summary.overall_score),
+            func.avg(summary.overall_score),
+            func.min(summary.overall_score),
+            func.max(summary.overall_score),
+            func.sum(case((summary.status == 'completed', 1), else_=0)),
+            func.coalesce(func.sum(summary.completed_responses), 0),
+            func.coalesce(func.sum(summary.gap_count), 0),
+            func.sum(case((summary.gap_count > 0, 1), else_=0)),
+            func.avg(summary.overall_progress),
+            *[func.avg(column) for column in domain_columns],
+            *[func.coalesce(func.sum(column), 0) for column in maturity_columns],
+            *[func.avg(column) for column in stage_columns]
+        ).filter(*filters).one()
+        
+        (assessment_count, scored_count, average_score, min_score, max_score, completed_count,
+         completed_responses, total_gaps, assessments_with_gaps, average_progress) = totals[:10]
+        domain_averages = totals[10:10 + len(domain_columns)]
+        maturity_counts = totals[10 + len(domain_columns):16 + len(domain_columns)]
+        stage_averages = totals[16 + len(domain_columns):]
+        
+        # Small grouped breakdowns
+        by_stage = db.session.query(
+            summary.current_stage, func.count(summary.assessment_id)
+        ).filter(*filters).group_by(summary.current_stage).all()
+        
+        by_risk = db.session.query(
+            summary.risk_level, func.count(summary.assessment_id), func.avg(summary.overall_score)
+        ).filter(*filters).group_by(summary.risk_level).all()
+        
+        # Assessments with the most gaps
+        top_gaps = db.session.query(
+            summary.assessment_id, Assessment.assessment_name, summary.gap_count, summary.overall_score
+        ).join(Assessment, Assessment.id == summary.assessment_id).filter(
+            *filters, summary.gap_count > 0
+        ).order_by(desc(summary.gap_count), summary.overall_score).limit(PORTFOLIO_TOP_GAPS).all()
+        
+        def rounded(value, digits=2):
+            return round(float(value), digits) if value is not None else None
+        
+        return jsonify({
+            'scope': {
+                'organization': organization,
+                'userId': user_id
+            },
+            'assessmentCount': assessment_count,
+            'scoredCount': scored_count,
+            'completedCount': int(completed_count or 0),
+            'scores': {
+                'average': rounded(average_score),
+                'min': rounded(min_score),
+                'max': rounded(max_score),
+                'domains': {
+                    domain: rounded(value) for domain, value in zip(summary.DOMAINS, domain_averages)
+                }
+            },
+            'maturityDistribution': {
+                'counts': {str(level): int(count) for level, count in enumerate(maturity_counts)},
+                'distribution': {
+                    str(level): round(int(count) / completed_responses * 100, 1) if completed_responses else 0
+                    for level, count in enumerate(maturity_counts)
+                },
+                'totalResponses': int(completed_responses)
+            },
+            'gaps': {
+                'totalGaps': int(total_gaps),
+                'assessmentsWithGaps': int(assessments_with_gaps or 0),
+                'topAssessments': [
+                    {
+                        'assessmentId': row[0],
+                        'assessmentName': row[1],
+                        'gapCount': row[2],
+                        'overallScore': rounded(row[3])
+                    }
+                    for row in top_gaps
+                ]
+            },
+            'progress': {
+                'averageOverall': rounded(average_progress, 1),
+                'stages': {
+                    stage: rounded(value, 1) for stage, value in zip(summary.STAGES, stage_averages)
+                },
+                'currentStageCounts': {stage: count for stage, count in by_stage}
+            },
+            'riskLevels': {
+                risk_level: {'count': count, 'averageScore': rounded(score)}
+                for risk_level, count, score in by_risk
+            },
+            'generatedAt': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Get portfolio error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while aggregating the portfolio'
+        }), 500
+
 @assessment_bp.route('/controls', methods=['GET'])
 def get_controls():
     """Get ISO 42001 control definitions"""
     try:
-        controls = get_iso42001_controls()
+        try:
+            catalog = get_control_catalog(request.args.get('version'))
+        except CatalogError as e:
+            return jsonify({
+                'error': 'invalid_catalog',
+                'message': str(e)
+            }), 400
         
         # Filter by stage if specified
         stage = request.args.get('stage')
-        if stage:
-            controls = {k: v for k, v in controls.items() if v['stage'] == stage}
+        controls = catalog.to_dict(stage)
         
         return jsonify({
             'controls': controls,
-            'total': len(controls)
+            'declaredTypes': get_declared_type_schema(),
+            'total': len(controls),
+            'catalogVersion': catalog.key
         }), 200
         
     except Exception as e:
@@ -529,3 +1189,51 @@ def get_controls():
             'message': 'An error occurred while fetching controls'
         }), 500
 
+@assessment_bp.route('/validation-schema', methods=['GET'])
+def get_validation_rules():
+    """Get the response validation rules of each control for client-side validation"""
+    try:
+        try:
+            catalog = get_control_catalog(request.args.get('version'))
+        except CatalogError as e:
+            return jsonify({
+                'error': 'invalid_catalog',
+                'message': str(e)
+            }), 400
+        
+        # Filter by stage if specified
+        controls = get_validation_schema(catalog, request.args.get('stage'))
+        
+        return jsonify({
+            'controls': controls,
+            'total': len(controls),
+            'catalogVersion': catalog.key
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get validation schema error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while fetching validation rules'
+        }), 500
+
+@assessment_bp.route('/catalogs', methods=['GET'])
+def get_catalogs():
+    """List available control catalog versions"""
+    try:
+        catalogs = list_catalogs()
+        
+        return jsonify({
+            'catalogs': [
+                {'framework': framework, 'versions': versions}
+                for framework, versions in catalogs.items()
+            ],
+            'defaultVersion': make_catalog_key(DEFAULT_FRAMEWORK, DEFAULT_VERSION)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get catalogs error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while fetching catalogs'
+        }), 500
@@ -1,14 +1,29 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import os
 import tempfile
 from datetime import datetime
 from src.models.user import db, User
 from src.models.assessment import Assessment
 from src.utils.certificate_generator import generate_compliance_certificate
+from src.utils.storage import get_storage, send_stored_object
 
 certificate_bp = Blueprint('certificate', __name__)
 
+def certificate_key(certificate_id):
+    """Get the storage key of an issued certificate"""
+    return f"certificates/{certificate_id}.pdf"
+
+def preview_key(assessment_id):
+    """Get the storage key of an assessment's latest certificate preview"""
+    return f"previews/certificates/{assessment_id}.pdf"
+
+def store_certificate(certificate_data, key):
+    """Generate a certificate PDF in a scratch directory and move it into storage"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        certificate_path = generate_compliance_certificate(certificate_data, temp_dir)
+        get_storage().ingest_file(key, certificate_path, 'application/pdf')
+    return key
+
 @certificate_bp.route('/generate/<int:assessment_id>', methods=['POST'])
 @jwt_required()
 def generate_certificate(assessment_id):
@@ -54,12 +69,8 @@ def generate_certificate(assessment_id):
             'assessment_id': assessment.id
         }
         
-        # Create certificates directory if it doesn't exist
-        certificates_dir = os.path.join(os.path.dirname(__file__), '..', 'certificates')
-        os.makedirs(certificates_dir, exist_ok=True)
-        
         # Generate the certificate
-        certificate_path = generate_compliance_certificate(certificate_data, certificates_dir)
+        certificate_path = store_certificate(certificate_data, certificate_key(certificate_data['certificate_id']))
         
         # Update assessment with certificate information
         assessment.certificate_generated = True
@@ -98,12 +109,9 @@ def download_certificate(assessment_id):
             return jsonify({'error': 'Certificate not generated for this assessment'}), 404
         
         # Find the certificate file
-        certificates_dir = os.path.join(os.path.dirname(__file__), '..', 'certificates')
-        
-        # Look for certificate file with the assessment ID
-        certificate_files = [f for f in os.listdir(certificates_dir) if f.startswith(f'ISO42001_Certificate_') and assessment.organization_name.replace(' ', '_') in f]
+        certificate_path = certificate_key(assessment.certificate_id)
         
-        if not certificate_files:
+        if not get_storage().exists(certificate_path):
             # Certificate file not found, regenerate it
             user = User.query.get(current_user_id)
             certificate_data = {
@@ -120,22 +128,12 @@ def download_certificate(assessment_id):
                 'assessment_id': assessment.id
             }
             
-            certificate_path = generate_compliance_certificate(certificate_data, certificates_dir)
-        else:
-            certificate_path = os.path.join(certificates_dir, certificate_files[0])
-        
-        if not os.path.exists(certificate_path):
-            return jsonify({'error': 'Certificate file not found'}), 404
+            store_certificate(certificate_data, certificate_path)
         
         # Generate download filename
         download_filename = f"ISO42001_Certificate_{assessment.organization_name.replace(' ', '_')}_{assessment.certificate_id}.pdf"
         
-        return send_file(
-            certificate_path,
-            as_attachment=True,
-            download_name=download_filename,
-            mimetype='application/pdf'
-        )
+        return send_stored_object(certificate_path, download_filename, 'application/pdf')
         
     except Exception as e:
         return jsonify({'error': f'Failed to download certificate: {str(e)}'}), 500
@@ -264,17 +262,16 @@ def preview_certificate(assessment_id):
             'assessment_id': assessment.id
         }
         
-        # Generate certificate in a temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            certificate_path = generate_compliance_certificate(certificate_data, os.path.dirname(temp_file.name))
-            
-            # Return the preview file
-            return send_file(
-                certificate_path,
-                as_attachment=False,
-                download_name=f"Certificate_Preview_{assessment.organization_name.replace(' ', '_')}.pdf",
-                mimetype='application/pdf'
-            )
+        # Generate the preview, replacing any earlier preview for the assessment
+        certificate_path = store_certificate(certificate_data, preview_key(assessment.id))
+        
+        # Return the preview file
+        return send_stored_object(
+            certificate_path,
+            f"Certificate_Preview_{assessment.organization_name.replace(' ', '_')}.pdf",
+            'application/pdf',
+            as_attachment=False
+        )
         
     except Exception as e:
         return jsonify({'error': f'Failed to generate certificate preview: {str(e)}'}), 500
@@ -1,53 +1,608 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, Response, request, jsonify, current_app, send_file, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
+import json
+import mimetypes
 import os
+import re
+import time
 import uuid
-from datetime import datetime
+import zipfile
+from datetime import datetime, timedelta
 
 from src.models.user import User, db
-from src.models.assessment import Assessment, AssessmentFile
-from src.utils.validation import validate_file_upload
+from src.models.assessment import Assessment, AssessmentFile, UploadSession
+from src.utils.catalog import CatalogError
+from src.utils.evidence_store import add_blob_reference, release_blob_reference
+from src.utils.malware_scan import get_scan_pool
+from src.utils.scoring import get_control_catalog
+from src.utils.search_index import search_evidence, DEFAULT_SEARCH_LIMIT
+from src.utils.storage_quota import (
+    StorageQuotaExceeded, charge_storage, check_storage_quota, organization_key, usage_summary
+)
+from src.utils.storage import get_storage, send_stored_object, StorageObjectNotFound, STREAM_CHUNK_SIZE
+from src.utils.validation import validate_file_upload, MAX_FILE_SIZE
+from src.utils.zip_stream import stream_zip
+from src.utils.uploads import (
+    stream_to_file, discard_partial, allocate_file, write_chunk, hash_file, iter_archive_members,
+    ArchiveError, MultipartError, MultipartReader, UploadTooLarge, PARTIAL_SUFFIX, UPLOAD_SESSION_DIR
+)
 
 file_bp = Blueprint('file', __name__)
 
+# Default size ceiling for resumable uploads (overridden by MAX_RESUMABLE_UPLOAD_SIZE)
+RESUMABLE_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024  # 1GB
+
+# Chunk size suggested to clients of resumable uploads
+RESUMABLE_CHUNK_SIZE = 5 * 1024 * 1024  # 5MB
+
+# How long an unfinished upload session can be resumed
+UPLOAD_SESSION_TTL = timedelta(hours=24)
+
+# Default request size ceiling for bulk uploads (overridden by MAX_BULK_UPLOAD_SIZE);
+# also caps the total extracted size of archives
+BULK_UPLOAD_MAX_SIZE = 256 * 1024 * 1024  # 256MB
+
+# Maximum number of files in one bulk upload, counting archive members
+BULK_UPLOAD_MAX_FILES = 500
+
+# Slack for multipart framing when quota-checking a request by its Content-Length
+REQUEST_OVERHEAD_ALLOWANCE = 1024 * 1024  # 1MB
+
 def get_file_extension(filename):
     """Get file extension from filename"""
     return '.' + filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
-def generate_stored_filename(original_filename):
-    """Generate a unique stored filename"""
-    file_id = str(uuid.uuid4())
-    extension = get_file_extension(original_filename)
-    return f"{file_id}{extension}"
+def get_partial_upload_path():
+    """Get a fresh temporary path for an upload still being written"""
+    session_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], UPLOAD_SESSION_DIR)
+    os.makedirs(session_dir, exist_ok=True)
+    return os.path.join(session_dir, str(uuid.uuid4()) + PARTIAL_SUFFIX)
+
+def is_legacy_file_path(file_path):
+    """Check if a file record holds an absolute local path from before storage keys"""
+    return os.path.isabs(file_path)
+
+def create_file_record(assessment, user_id, original_filename, partial_path, upload,
+                       mime_type, control_id=None, stage=None, description=None):
+    """
+    Store a fully written upload and create its database record
+    
+    Content already stored under the same SHA-256 is not written again;
+    the new record just references the existing blob. The file is charged
+    to the user's and the assessment organization's storage counters first,
+    so StorageQuotaExceeded is raised before any content is stored.
+    
+    Args:
+        assessment: Assessment the file belongs to
+        partial_path: Temporary file holding the upload
+        upload: Result of stream_to_file/hash_file (size and sha256)
+    
+    Returns:
+        New AssessmentFile (added to the session, not committed)
+    """
+    charge_storage(user_id, assessment.organization_name, upload['size'])
+    blob = add_blob_reference(get_storage(), partial_path, upload, mime_type)
+    
+    assessment_file = AssessmentFile(
+        assessment_id=assessment.id,
+        user_id=user_id,
+        original_filename=original_filename,
+        stored_filename=blob.sha256,
+        file_path=blob.storage_key,
+        file_size=upload['size'],
+        file_type=get_file_extension(original_filename),
+        mime_type=mime_type or 'application/octet-stream',
+        control_id=control_id,
+        stage=stage,
+        description=description
+    )
+    assessment_file.blob_sha256 = blob.sha256
+    
+    # Remember the counter charged, so deleting refunds it even after the assessment is renamed
+    assessment_file.organization_key = organization_key(assessment.organization_name)
+    
+    # Content seen before already has a verdict; new content waits for the scan pool
+    assessment_file.scan_status = blob.scan_status
+    if blob.scan_status != 'pending':
+        assessment_file.is_processed = True
+        assessment_file.processed_at = blob.scanned_at
+    
+    db.session.add(assessment_file)
+    return assessment_file
+
+def queue_scan(assessment_file):
+    """Queue a committed file's content for malware scanning if it has no verdict yet"""
+    if assessment_file.scan_status != 'pending' or not assessment_file.blob_sha256:
+        return
+    try:
+        pool = get_scan_pool()
+        pool.submit(assessment_file.blob_sha256)
+        if not pool.workers:
+            # Scanned inline, so the verdict is already committed
+            db.session.refresh(assessment_file)
+    except Exception as e:
+        # The blob stays pending and is picked up by the next requeue
+        current_app.logger.error(f"Queue malware scan error: {str(e)}")
+
+def request_upload_size():
+    """Estimate the uploaded bytes of a multipart request, for early quota checks"""
+    return max(0, (request.content_length or 0) - REQUEST_OVERHEAD_ALLOWANCE)
+
+def request_parts():
+    """
+    Read the request's multipart/form-data body part by part
+    
+    Used instead of request.files so file parts are streamed to their
+    destination rather than spooled first and copied again.
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        raise MultipartError('Expected a multipart/form-data request')
+    return MultipartReader(
+        request.stream, boundary.encode('latin-1'),
+        max_form_memory_size=request.max_form_memory_size,
+        max_parts=request.max_form_parts
+    )
+
+def find_upload_assessment(form, user_id, size):
+    """
+    Get the assessment an upload's form names, checking it has room for size bytes
+    
+    Returns:
+        Tuple of (assessment, None), or (None, error response)
+    """
+    assessment_id = form.get('assessmentId')
+    if not assessment_id:
+        return None, (jsonify({
+            'error': 'missing_assessment_id',
+            'message': 'Assessment ID is required'
+        }), 400)
+    
+    # Verify assessment exists and belongs to user
+    assessment = Assessment.query.filter_by(
+        id=assessment_id,
+        user_id=user_id
+    ).first()
+    
+    if not assessment:
+        return None, (jsonify({
+            'error': 'assessment_not_found',
+            'message': 'Assessment not found or access denied'
+        }), 404)
+    
+    try:
+        check_storage_quota(user_id, assessment.organization_name, size)
+    except StorageQuotaExceeded as e:
+        return None, storage_quota_error(e)
+    return assessment, None
+
+def storage_quota_error(error):
+    """Build the response for an upload that would exceed a storage quota"""
+    return jsonify({
+        'error': 'storage_quota_exceeded',
+        'message': str(error),
+        'details': error.to_dict()
+    }), 413
+
+def file_upload_response(assessment_file):
+    """Build the response body for a newly uploaded file"""
+    return {
+        'fileId': assessment_file.id,
+        'fileName': assessment_file.original_filename,
+        'fileSize': assessment_file.file_size,
+        'fileType': assessment_file.file_type,
+        'uploadDate': assessment_file.uploaded_at.isoformat(),
+        'scanStatus': assessment_file.scan_status,
+        'downloadUrl': f'/api/files/{assessment_file.id}/download'
+    }
 
 @file_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_file():
-    """Upload evidence file for assessment"""
+    """
+    Upload evidence file for assessment
+    
+    The body is parsed as it arrives and the file part is written straight
+    to its partial file. Fields sent ahead of the file let the assessment
+    and quota be checked before any content is read; otherwise they are
+    checked once the body has been read.
+    """
+    partial_path = None
     try:
         current_user_id = get_jwt_identity()
+        max_size = current_app.config.get('MAX_CONTENT_LENGTH') or MAX_FILE_SIZE
+        
+        form = {}
+        assessment = None
+        file_data = None
+        upload = None
+        
+        for part in request_parts():
+            if part.filename is None:
+                form[part.name] = part.read_text(request.max_form_memory_size)
+                continue
+            if part.name != 'file' or file_data is not None:
+                continue
+            
+            if part.filename == '':
+                return jsonify({
+                    'error': 'no_filename',
+                    'message': 'No file selected'
+                }), 400
+            
+            # Validate the file name before reading any content
+            file_data = {
+                'filename': part.filename,
+                'content_type': part.content_type
+            }
+            
+            validation_result = validate_file_upload(file_data)
+            if not validation_result['is_valid']:
+                return jsonify({
+                    'error': 'file_validation_error',
+                    'message': 'File validation failed',
+                    'details': validation_result['errors']
+                }), 400
+            
+            # Turn away uploads that cannot fit before reading the content
+            if 'assessmentId' in form:
+                assessment, error = find_upload_assessment(form, current_user_id, request_upload_size())
+                if error:
+                    return error
+            
+            # Stream to disk in chunks, counting, hashing and sniffing as we go
+            partial_path = get_partial_upload_path()
+            try:
+                upload = stream_to_file(part, partial_path, max_size)
+            except UploadTooLarge as e:
+                return jsonify({
+                    'error': 'file_validation_error',
+                    'message': 'File validation failed',
+                    'details': [str(e)]
+                }), 400
         
         # Check if file is present in request
-        if 'file' not in request.files:
+        if file_data is None:
             return jsonify({
                 'error': 'no_file',
                 'message': 'No file provided in request'
             }), 400
         
-        file = request.files['file']
-        if file.filename == '':
+        if assessment is None:
+            assessment, error = find_upload_assessment(form, current_user_id, upload['size'])
+            if error:
+                discard_partial(partial_path)
+                return error
+        
+        file_data.update(size=upload['size'], header=upload['header'], max_size=max_size)
+        validation_result = validate_file_upload(file_data)
+        if not validation_result['is_valid']:
+            discard_partial(partial_path)
             return jsonify({
-                'error': 'no_filename',
-                'message': 'No file selected'
+                'error': 'file_validation_error',
+                'message': 'File validation failed',
+                'details': validation_result['errors']
             }), 400
         
-        # Get form data
-        assessment_id = request.form.get('assessmentId')
-        control_id = request.form.get('controlId')
-        stage = request.form.get('stage')
-        description = request.form.get('description', '')
+        # Store the content (once per digest) and create the database record
+        try:
+            assessment_file = create_file_record(
+                assessment, current_user_id, secure_filename(file_data['filename']), partial_path,
+                upload, file_data['content_type'], form.get('controlId'), form.get('stage'),
+                form.get('description', '')
+            )
+        except StorageQuotaExceeded as e:
+            db.session.rollback()
+            discard_partial(partial_path)
+            return storage_quota_error(e)
+        db.session.commit()
+        queue_scan(assessment_file)
+        
+        return jsonify(file_upload_response(assessment_file)), 201
+        
+    except MultipartError as e:
+        if partial_path:
+            discard_partial(partial_path)
+        return jsonify({
+            'error': 'invalid_form_data',
+            'message': str(e)
+        }), 400
+        
+    except RequestEntityTooLarge:
+        if partial_path:
+            discard_partial(partial_path)
+        return jsonify({
+            'error': 'file_too_large',
+            'message': 'Upload exceeds the maximum allowed size'
+        }), 413
+        
+    except Exception as e:
+        db.session.rollback()
+        if partial_path:
+            discard_partial(partial_path)
+        current_app.logger.error(f"File upload error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while uploading the file'
+        }), 500
+
+def iter_upload_part_files(part, max_files, max_total_size):
+    """
+    Yield (path, stream, content_type) for every file in one bulk upload part
+    
+    A ZIP archive is written once to a partial file and expanded member by
+    member from there, since its member list and sizes sit at the end of the
+    archive; other files are passed through straight from the body. Paths
+    keep their folders so they can be mapped to controls.
+    """
+    if get_file_extension(part.filename) != '.zip':
+        if max_files <= 0:
+            raise ArchiveError(f"At most {BULK_UPLOAD_MAX_FILES} files can be uploaded at once")
+        yield part.filename, part, part.content_type
+        return
+    
+    archive_path = get_partial_upload_path()
+    try:
+        try:
+            stream_to_file(part, archive_path, max_total_size)
+        except UploadTooLarge:
+            raise ArchiveError(f"Archive {part.filename} is larger than {max_total_size} bytes")
+        with open(archive_path, 'rb') as archive:
+            for name, member in iter_archive_members(archive, max_files, max_total_size):
+                yield name, member, mimetypes.guess_type(name)[0]
+    finally:
+        discard_partial(archive_path)
+
+def control_from_path(path, catalog):
+    """
+    Get the control a file belongs to from the nearest folder named after one
+    
+    Folder names match when they start with a control ID, e.g. 'A.2.2' or
+    'A.2.2 AI policy'.
+    """
+    folders = re.split(r'[\\/]', path)[:-1]
+    for folder in reversed(folders):
+        candidate = re.split(r'[\s_\-]+', folder.strip(), 1)[0]
+        if candidate in catalog:
+            return candidate
+    return None
+
+@file_bp.route('/upload/bulk', methods=['POST'])
+@jwt_required()
+def upload_files_bulk():
+    """
+    Upload several evidence files, or ZIP archives of them, in one request
+    
+    Every file is validated before any record is created, and all records
+    are committed in a single transaction. With mapFolders enabled, files
+    inside folders named after a control are attached to that control.
+    """
+    partial_paths = []
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Bulk requests get a larger body limit than single uploads
+        request.max_content_length = current_app.config.get('MAX_BULK_UPLOAD_SIZE', BULK_UPLOAD_MAX_SIZE)
+        
+        max_size = current_app.config.get('MAX_CONTENT_LENGTH') or MAX_FILE_SIZE
+        max_total_size = request.max_content_length
+        
+        # Stream and validate every file before storing any of them; the
+        # body is read once, with files written to partial files as they arrive
+        form = {}
+        assessment = None
+        received = False
+        accepted = []
+        errors = []
+        total_size = 0
+        
+        try:
+            for part in request_parts():
+                if part.filename is None:
+                    form[part.name] = part.read_text(request.max_form_memory_size)
+                    continue
+                if part.name not in ('files', 'file') or not part.filename:
+                    continue
+                received = True
+                
+                # Turn away uploads that cannot fit before reading the content
+                if assessment is None and 'assessmentId' in form:
+                    assessment, error = find_upload_assessment(form, current_user_id, request_upload_size())
+                    if error:
+                        for partial_path in partial_paths:
+                            discard_partial(partial_path)
+                        return error
+                
+                remaining = BULK_UPLOAD_MAX_FILES - len(accepted) - len(errors)
+                for path, stream, content_type in iter_upload_part_files(part, remaining, max_total_size):
+                    file_data = {
+                        'filename': os.path.basename(path.replace('\\', '/')),
+                        'content_type': content_type
+                    }
+                    
+                    validation_result = validate_file_upload(file_data)
+                    if not validation_result['is_valid']:
+                        errors.append({'fileName': path, 'errors': validation_result['errors']})
+                        continue
+                    
+                    partial_path = get_partial_upload_path()
+                    try:
+                        upload = stream_to_file(stream, partial_path, max_size)
+                    except UploadTooLarge as e:
+                        errors.append({'fileName': path, 'errors': [str(e)]})
+                        continue
+                    partial_paths.append(partial_path)
+                    
+                    total_size += upload['size']
+                    if total_size > max_total_size:
+                        raise ArchiveError(f"Upload expands to more than {max_total_size} bytes")
+                    
+                    file_data.update(size=upload['size'], header=upload['header'], max_size=max_size)
+                    validation_result = validate_file_upload(file_data)
+                    if not validation_result['is_valid']:
+                        errors.append({'fileName': path, 'errors': validation_result['errors']})
+                        continue
+                    
+                    accepted.append((path, file_data, partial_path, upload))
+        except (ArchiveError, zipfile.BadZipFile) as e:
+            for partial_path in partial_paths:
+                discard_partial(partial_path)
+            return jsonify({
+                'error': 'archive_error',
+                'message': str(e)
+            }), 400
+        
+        if not received:
+            return jsonify({
+                'error': 'no_file',
+                'message': 'No files provided in request'
+            }), 400
+        
+        if assessment is None:
+            assessment, error = find_upload_assessment(form, current_user_id, total_size)
+            if error:
+                for partial_path in partial_paths:
+                    discard_partial(partial_path)
+                return error
+        
+        if errors or not accepted:
+            for partial_path in partial_paths:
+                discard_partial(partial_path)
+            return jsonify({
+                'error': 'file_validation_error',
+                'message': 'File validation failed' if errors else 'Archive contains no files',
+                'details': errors
+            }), 400
+        
+        assessment_id = assessment.id
+        default_control_id = form.get('controlId')
+        stage = form.get('stage')
+        description = form.get('description', '')
+        map_folders = form.get('mapFolders', 'true').lower() in ('true', '1', 'yes')
+        catalog = get_control_catalog(assessment.catalog_version) if map_folders else None
+        
+        # Store the content (once per digest) and create every record in one transaction
+        assessment_files = []
+        try:
+            for path, file_data, partial_path, upload in accepted:
+                control_id = (control_from_path(path, catalog) if catalog else None) or default_control_id
+                control_stage = stage
+                if not control_stage and catalog and control_id in catalog:
+                    control_stage = catalog.get(control_id).get('stage')
+                assessment_files.append(create_file_record(
+                    assessment, current_user_id, secure_filename(file_data['filename']), partial_path,
+                    upload, file_data['content_type'], control_id, control_stage, description
+                ))
+        except StorageQuotaExceeded as e:
+            db.session.rollback()
+            for partial_path in partial_paths:
+                discard_partial(partial_path)
+            return storage_quota_error(e)
+        db.session.commit()
+        
+        for assessment_file in assessment_files:
+            queue_scan(assessment_file)
+        
+        return jsonify({
+            'assessmentId': assessment_id,
+            'files': [
+                dict(file_upload_response(assessment_file), controlId=assessment_file.control_id)
+                for assessment_file in assessment_files
+            ],
+            'total': len(assessment_files)
+        }), 201
+        
+    except RequestEntityTooLarge:
+        for partial_path in partial_paths:
+            discard_partial(partial_path)
+        return jsonify({
+            'error': 'file_too_large',
+            'message': 'Upload exceeds the maximum allowed size'
+        }), 413
+        
+    except MultipartError as e:
+        for partial_path in partial_paths:
+            discard_partial(partial_path)
+        return jsonify({
+            'error': 'invalid_form_data',
+            'message': str(e)
+        }), 400
+        
+    except CatalogError as e:
+        for partial_path in partial_paths:
+            discard_partial(partial_path)
+        return jsonify({
+            'error': 'catalog_error',
+            'message': str(e)
+        }), 400
+        
+    except Exception as e:
+        db.session.rollback()
+        for partial_path in partial_paths:
+            discard_partial(partial_path)
+        current_app.logger.error(f"Bulk file upload error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while uploading the files'
+        }), 500
+
+def get_upload_session(session_id, user_id, lock=False):
+    """Get an upload session owned by a user"""
+    query = UploadSession.query.filter_by(id=session_id, user_id=user_id)
+    if lock:
+        query = query.with_for_update()
+    return query.first()
+
+def upload_session_error(upload_session):
+    """Get an error response if an upload session can no longer accept changes"""
+    if not upload_session:
+        return jsonify({
+            'error': 'upload_not_found',
+            'message': 'Upload session not found or access denied'
+        }), 404
+    
+    if upload_session.status != 'active':
+        return jsonify({
+            'error': 'upload_not_active',
+            'message': f'Upload session is {upload_session.status}'
+        }), 409
+    
+    if upload_session.is_expired():
+        discard_partial(upload_session.partial_path)
+        upload_session.status = 'aborted'
+        db.session.commit()
+        return jsonify({
+            'error': 'upload_expired',
+            'message': 'Upload session has expired'
+        }), 410
+    
+    return None
+
+def upload_session_status(upload_session):
+    """Build the response body describing an upload session's progress"""
+    return {
+        'uploadId': upload_session.id,
+        'status': upload_session.status,
+        'fileName': upload_session.original_filename,
+        'totalSize': upload_session.total_size,
+        'receivedBytes': upload_session.received_bytes,
+        'missingRanges': upload_session.get_missing_ranges(),
+        'complete': upload_session.is_complete(),
+        'expiresAt': upload_session.expires_at.isoformat(),
+        'fileId': upload_session.file_id
+    }
+
+@file_bp.route('/uploads', methods=['POST'])
+@jwt_required()
+def create_upload_session():
+    """Start a resumable chunked upload"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json() or {}
         
+        assessment_id = data.get('assessmentId')
         if not assessment_id:
             return jsonify({
                 'error': 'missing_assessment_id',
@@ -66,15 +621,19 @@ def upload_file():
                 'message': 'Assessment not found or access denied'
             }), 404
         
-        # Validate file
-        file_data = {
-            'filename': file.filename,
-            'size': len(file.read()),
-            'content_type': file.content_type
-        }
-        file.seek(0)  # Reset file pointer after reading for size
+        file_size = data.get('fileSize')
+        if isinstance(file_size, bool) or not isinstance(file_size, int) or file_size < 0:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'fileSize must be a non-negative integer'
+            }), 400
         
-        validation_result = validate_file_upload(file_data)
+        max_size = current_app.config.get('MAX_RESUMABLE_UPLOAD_SIZE', RESUMABLE_UPLOAD_MAX_SIZE)
+        validation_result = validate_file_upload({
+            'filename': data.get('fileName', ''),
+            'size': file_size,
+            'max_size': max_size
+        })
         if not validation_result['is_valid']:
             return jsonify({
                 'error': 'file_validation_error',
@@ -82,62 +641,238 @@ def upload_file():
                 'details': validation_result['errors']
             }), 400
         
-        # Generate secure filename and path
-        original_filename = secure_filename(file.filename)
-        stored_filename = generate_stored_filename(original_filename)
-        
-        # Create upload directory if it doesn't exist
-        upload_dir = current_app.config['UPLOAD_FOLDER']
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
-        
-        # Create subdirectory for the assessment
-        assessment_dir = os.path.join(upload_dir, assessment_id)
-        if not os.path.exists(assessment_dir):
-            os.makedirs(assessment_dir)
+        try:
+            check_storage_quota(current_user_id, assessment.organization_name, file_size)
+        except StorageQuotaExceeded as e:
+            return storage_quota_error(e)
         
-        file_path = os.path.join(assessment_dir, stored_filename)
+        partial_path = get_partial_upload_path()
+        allocate_file(partial_path, file_size)
         
-        # Save file
-        file.save(file_path)
-        
-        # Create database record
-        assessment_file = AssessmentFile(
+        upload_session = UploadSession(
             assessment_id=assessment_id,
             user_id=current_user_id,
-            original_filename=original_filename,
-            stored_filename=stored_filename,
-            file_path=file_path,
-            file_size=file_data['size'],
-            file_type=get_file_extension(original_filename),
-            mime_type=file.content_type or 'application/octet-stream',
-            control_id=control_id,
-            stage=stage,
-            description=description
+            original_filename=secure_filename(data['fileName']),
+            total_size=file_size,
+            partial_path=partial_path,
+            expires_at=datetime.utcnow() + UPLOAD_SESSION_TTL,
+            mime_type=data.get('contentType'),
+            control_id=data.get('controlId'),
+            stage=data.get('stage'),
+            description=data.get('description', '')
         )
         
-        # Mark as clean for now (in production, would integrate virus scanning)
-        assessment_file.mark_as_clean()
+        db.session.add(upload_session)
+        db.session.commit()
+        
+        response = upload_session_status(upload_session)
+        response['chunkSize'] = RESUMABLE_CHUNK_SIZE
+        response['uploadUrl'] = f'/api/files/uploads/{upload_session.id}'
         
-        db.session.add(assessment_file)
+        return jsonify(response), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Create upload session error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while starting the upload'
+        }), 500
+
+@file_bp.route('/uploads/<session_id>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(session_id):
+    """
+    Write one chunk of a resumable upload at ?offset=<byte offset>
+    
+    Chunks may arrive in any order and may be retried; overlapping
+    chunks simply overwrite the same bytes.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        
+        upload_session = get_upload_session(session_id, current_user_id, lock=True)
+        error = upload_session_error(upload_session)
+        if error:
+            return error
+        
+        try:
+            offset = int(request.args.get('offset', ''))
+        except ValueError:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'offset query parameter must be an integer'
+            }), 400
+        
+        if not (0 <= offset < upload_session.total_size):
+            return jsonify({
+                'error': 'invalid_offset',
+                'message': f'offset must be between 0 and {upload_session.total_size - 1}'
+            }), 416
+        
+        # Reject chunks that would run past the end before writing any bytes
+        if request.content_length is not None and offset + request.content_length > upload_session.total_size:
+            return jsonify({
+                'error': 'chunk_out_of_range',
+                'message': 'Chunk extends past the declared file size'
+            }), 416
+        
+        try:
+            written = write_chunk(
+                request.stream, upload_session.partial_path, offset, upload_session.total_size - offset
+            )
+        except UploadTooLarge:
+            return jsonify({
+                'error': 'chunk_out_of_range',
+                'message': 'Chunk extends past the declared file size'
+            }), 416
+        
+        if written:
+            upload_session.add_received_range(offset, offset + written)
         db.session.commit()
         
+        return jsonify(upload_session_status(upload_session)), 200
+        
+    except RequestEntityTooLarge:
+        db.session.rollback()
         return jsonify({
-            'fileId': assessment_file.id,
-            'fileName': original_filename,
-            'fileSize': file_data['size'],
-            'fileType': assessment_file.file_type,
-            'uploadDate': assessment_file.uploaded_at.isoformat(),
-            'scanStatus': assessment_file.scan_status,
-            'downloadUrl': f'/api/files/{assessment_file.id}/download'
-        }), 201
+            'error': 'chunk_too_large',
+            'message': 'Chunk exceeds the maximum request size'
+        }), 413
         
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"File upload error: {str(e)}")
+        current_app.logger.error(f"Upload chunk error: {str(e)}")
         return jsonify({
             'error': 'internal_error',
-            'message': 'An error occurred while uploading the file'
+            'message': 'An error occurred while uploading the chunk'
+        }), 500
+
+@file_bp.route('/uploads/<session_id>', methods=['GET'])
+@jwt_required()
+def get_upload_status(session_id):
+    """Get the progress of a resumable upload, including byte ranges still missing"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        upload_session = get_upload_session(session_id, current_user_id)
+        if not upload_session:
+            return jsonify({
+                'error': 'upload_not_found',
+                'message': 'Upload session not found or access denied'
+            }), 404
+        
+        return jsonify(upload_session_status(upload_session)), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get upload status error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while fetching the upload status'
+        }), 500
+
+@file_bp.route('/uploads/<session_id>/commit', methods=['POST'])
+@jwt_required()
+def commit_upload(session_id):
+    """Finish a resumable upload once every byte has arrived and create the file record"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        upload_session = get_upload_session(session_id, current_user_id, lock=True)
+        error = upload_session_error(upload_session)
+        if error:
+            return error
+        
+        if not upload_session.is_complete():
+            return jsonify({
+                'error': 'upload_incomplete',
+                'message': 'Upload is missing byte ranges',
+                'missingRanges': upload_session.get_missing_ranges()
+            }), 409
+        
+        upload = hash_file(upload_session.partial_path)
+        max_size = current_app.config.get('MAX_RESUMABLE_UPLOAD_SIZE', RESUMABLE_UPLOAD_MAX_SIZE)
+        validation_result = validate_file_upload({
+            'filename': upload_session.original_filename,
+            'size': upload['size'],
+            'header': upload['header'],
+            'max_size': max_size
+        })
+        if not validation_result['is_valid']:
+            return jsonify({
+                'error': 'file_validation_error',
+                'message': 'File validation failed',
+                'details': validation_result['errors']
+            }), 400
+        
+        assessment = Assessment.query.get(upload_session.assessment_id)
+        if not assessment:
+            return jsonify({
+                'error': 'assessment_not_found',
+                'message': 'Assessment not found or access denied'
+            }), 404
+        
+        # On a quota error the session stays active, so it can be committed once space is freed
+        try:
+            assessment_file = create_file_record(
+                assessment, current_user_id, upload_session.original_filename,
+                upload_session.partial_path, upload, upload_session.mime_type,
+                upload_session.control_id, upload_session.stage, upload_session.description
+            )
+        except StorageQuotaExceeded as e:
+            db.session.rollback()
+            return storage_quota_error(e)
+        db.session.flush()
+        
+        upload_session.status = 'committed'
+        upload_session.file_id = assessment_file.id
+        db.session.commit()
+        queue_scan(assessment_file)
+        
+        return jsonify(file_upload_response(assessment_file)), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Commit upload error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while completing the upload'
+        }), 500
+
+@file_bp.route('/uploads/<session_id>', methods=['DELETE'])
+@jwt_required()
+def abort_upload(session_id):
+    """Abort a resumable upload and discard the bytes received so far"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        upload_session = get_upload_session(session_id, current_user_id, lock=True)
+        if not upload_session:
+            return jsonify({
+                'error': 'upload_not_found',
+                'message': 'Upload session not found or access denied'
+            }), 404
+        
+        if upload_session.status == 'committed':
+            return jsonify({
+                'error': 'upload_not_active',
+                'message': 'Upload session is committed'
+            }), 409
+        
+        discard_partial(upload_session.partial_path)
+        upload_session.status = 'aborted'
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Upload aborted successfully'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Abort upload error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while aborting the upload'
         }), 500
 
 @file_bp.route('/<file_id>/download', methods=['GET'])
@@ -168,26 +903,46 @@ def download_file(file_id):
                 'message': 'Access denied to this file'
             }), 403
         
-        # Check if file exists on disk
-        if not os.path.exists(file_record.file_path):
-            return jsonify({
-                'error': 'file_not_found_disk',
-                'message': 'File not found on disk'
-            }), 404
-        
-        # Check scan status
+        # Check scan status; only content scanned clean is served
         if file_record.scan_status == 'infected':
             return jsonify({
                 'error': 'file_infected',
                 'message': 'File is infected and cannot be downloaded'
             }), 403
         
-        return send_file(
-            file_record.file_path,
-            as_attachment=True,
-            download_name=file_record.original_filename,
-            mimetype=file_record.mime_type
-        )
+        if file_record.scan_status == 'pending':
+            return jsonify({
+                'error': 'scan_pending',
+                'message': 'File is still being scanned for malware, try again shortly'
+            }), 409
+        
+        if file_record.scan_status != 'clean':
+            return jsonify({
+                'error': 'scan_failed',
+                'message': 'File could not be scanned for malware and cannot be downloaded'
+            }), 409
+        
+        try:
+            if is_legacy_file_path(file_record.file_path):
+                return send_file(
+                    file_record.file_path,
+                    as_attachment=True,
+                    download_name=file_record.original_filename,
+                    mimetype=file_record.mime_type
+                )
+            
+            # The content digest is a strong validator for conditional and range requests
+            return send_stored_object(
+                file_record.file_path,
+                file_record.original_filename,
+                file_record.mime_type,
+                etag=file_record.blob_sha256
+            )
+        except (StorageObjectNotFound, FileNotFoundError):
+            return jsonify({
+                'error': 'file_not_found_disk',
+                'message': 'File not found in storage'
+            }), 404
         
     except Exception as e:
         current_app.logger.error(f"File download error: {str(e)}")
@@ -261,14 +1016,13 @@ def delete_file(file_id):
                 'message': 'Access denied to this file'
             }), 403
         
-        # Delete file from disk
-        if os.path.exists(file_record.file_path):
-            try:
-                os.remove(file_record.file_path)
-            except OSError as e:
-                current_app.logger.warning(f"Could not delete file from disk: {str(e)}")
+        # Drop the record's reference to its content; unreferenced content,
+        # including files stored before content addressing, is left for the
+        # evidence garbage collector
+        if file_record.blob_sha256:
+            release_blob_reference(file_record.blob_sha256)
         
-        # Delete database record
+        # Delete database record; the storage counters charged at upload are refunded on flush
         db.session.delete(file_record)
         db.session.commit()
         
@@ -330,6 +1084,255 @@ def get_assessment_files(assessment_id):
             'message': 'An error occurred while fetching assessment files'
         }), 500
 
+@file_bp.route('/usage', methods=['GET'])
+@jwt_required()
+def get_storage_usage():
+    """Get the user's and their organization's evidence storage usage and quotas"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        user = User.query.get(current_user_id)
+        if not user:
+            return jsonify({
+                'error': 'user_not_found',
+                'message': 'User not found'
+            }), 404
+        
+        summary = usage_summary(user)
+        db.session.commit()
+        
+        return jsonify({
+            'user': summary['user'],
+            'organization': dict(summary['organization'], name=user.organization_name)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Get storage usage error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while fetching storage usage'
+        }), 500
+
+@file_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_files():
+    """
+    Search the extracted text of the user's evidence files
+    
+    Query parameters: q (required), assessmentId, controlId, limit.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({
+                'error': 'missing_query',
+                'message': 'Search query (q) is required'
+            }), 400
+        
+        try:
+            limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            return jsonify({
+                'error': 'validation_error',
+                'message': 'limit must be an integer'
+            }), 400
+        
+        started = time.perf_counter()
+        results = search_evidence(
+            current_user_id, query,
+            assessment_id=request.args.get('assessmentId'),
+            control_id=request.args.get('controlId'),
+            limit=limit
+        )
+        
+        return jsonify({
+            'query': query,
+            'results': results,
+            'total': len(results),
+            'tookMs': round((time.perf_counter() - started) * 1000, 2)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Evidence search error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while searching evidence'
+        }), 500
+
+def iter_local_file(path, chunk_size=STREAM_CHUNK_SIZE):
+    """Read a local file in chunks"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def export_path(file_record, used_paths):
+    """
+    Get a unique archive path for a file, grouped as <stage>/<control_id>/<name>
+    
+    Repeated names within a folder get a ' (n)' suffix.
+    """
+    folder = '/'.join([
+        secure_filename(file_record.stage or '') or 'unassigned',
+        secure_filename(file_record.control_id or '') or 'general'
+    ])
+    name = secure_filename(file_record.original_filename) or file_record.id
+    base, extension = os.path.splitext(name)
+    
+    path = f"{folder}/{name}"
+    counter = 2
+    while path in used_paths:
+        path = f"{folder}/{base} ({counter}){extension}"
+        counter += 1
+    used_paths.add(path)
+    return path
+
+@file_bp.route('/assessment/<assessment_id>/export', methods=['GET'])
+@jwt_required()
+def export_assessment_files(assessment_id):
+    """
+    Download every evidence file of an assessment as one ZIP
+    
+    The archive is streamed as it is built, one chunk at a time, with a
+    manifest.json listing each file's path, metadata and SHA-256. Files not
+    scanned clean, or missing from storage, are left out and listed in the
+    manifest instead.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Verify assessment exists and belongs to user
+        assessment = Assessment.query.filter_by(
+            id=assessment_id,
+            user_id=current_user_id
+        ).first()
+        
+        if not assessment:
+            return jsonify({
+                'error': 'assessment_not_found',
+                'message': 'Assessment not found or access denied'
+            }), 404
+        
+        # Same filters as the file listing
+        control_id = request.args.get('control_id')
+        stage = request.args.get('stage')
+        
+        query = AssessmentFile.query.filter_by(assessment_id=assessment_id)
+        
+        if control_id:
+            query = query.filter_by(control_id=control_id)
+        
+        if stage:
+            query = query.filter_by(stage=stage)
+        
+        files = query.order_by(
+            AssessmentFile.stage, AssessmentFile.control_id, AssessmentFile.uploaded_at
+        ).all()
+        
+        storage = get_storage()
+        generated_at = datetime.utcnow()
+        manifest = {
+            'assessment': {
+                'id': assessment.id,
+                'name': assessment.assessment_name,
+                'organization': assessment.organization_name,
+                'catalog_version': assessment.catalog_version
+            },
+            'generated_at': generated_at.isoformat(),
+            'files': [],
+            'excluded': []
+        }
+        
+        # Decide what goes in the archive before streaming starts
+        used_paths = {'manifest.json'}
+        exported = []
+        for file_record in files:
+            if file_record.scan_status != 'clean':
+                manifest['excluded'].append({
+                    'file_id': file_record.id,
+                    'original_filename': file_record.original_filename,
+                    'reason': f'scan_{file_record.scan_status}'
+                })
+                continue
+            
+            legacy = is_legacy_file_path(file_record.file_path)
+            if not (os.path.exists(file_record.file_path) if legacy else storage.exists(file_record.file_path)):
+                manifest['excluded'].append({
+                    'file_id': file_record.id,
+                    'original_filename': file_record.original_filename,
+                    'reason': 'missing'
+                })
+                continue
+            
+            exported.append({
+                'path': export_path(file_record, used_paths),
+                'key': file_record.file_path,
+                'legacy': legacy,
+                'size': file_record.file_size,
+                'date_time': file_record.uploaded_at,
+                'record': {
+                    'file_id': file_record.id,
+                    'original_filename': file_record.original_filename,
+                    'control_id': file_record.control_id,
+                    'stage': file_record.stage,
+                    'mime_type': file_record.mime_type,
+                    'description': file_record.description,
+                    'uploaded_at': file_record.uploaded_at.isoformat(),
+                    'recorded_sha256': file_record.blob_sha256
+                }
+            })
+        
+        def entries():
+            for item in exported:
+                if item['legacy']:
+                    item['chunks'] = lambda path=item['key']: iter_local_file(path)
+                else:
+                    item['chunks'] = lambda key=item['key']: storage.iter_chunks(key)
+                yield item
+                
+                record = item['record']
+                record.update(
+                    path=item['path'],
+                    size=item['written'],
+                    sha256=item['sha256'],
+                    verified=record['recorded_sha256'] in (None, item['sha256'])
+                )
+                manifest['files'].append(record)
+            
+            # Written last so it carries the digests of the bytes actually streamed
+            yield {
+                'path': 'manifest.json',
+                'chunks': [json.dumps(manifest, indent=2).encode('utf-8')],
+                'date_time': generated_at
+            }
+        
+        def generate():
+            try:
+                yield from stream_zip(entries())
+            except Exception as e:
+                # Headers are already sent; the client sees a truncated archive
+                current_app.logger.error(f"Evidence export error: {str(e)}")
+                raise
+        
+        download_name = secure_filename(f"{assessment.assessment_name}-evidence.zip") or 'evidence.zip'
+        response = Response(stream_with_context(generate()), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+        
+    except Exception as e:
+        current_app.logger.error(f"Export assessment files error: {str(e)}")
+        return jsonify({
+            'error': 'internal_error',
+            'message': 'An error occurred while exporting assessment files'
+        }), 500
+
 @file_bp.route('/<file_id>/metadata', methods=['PUT'])
 @jwt_required()
 def update_file_metadata(file_id):
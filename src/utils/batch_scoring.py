@@ -0,0 +1,654 @@
+"""
+Vectorized Batch Scoring Engine
+Scores many ISO 42001 assessments at once using NumPy array operations
+"""
+
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+import numpy as np
+
+from src.utils.catalog import ControlCatalog
+from src.utils.scoring import get_control_catalog, DOMAIN_WEIGHTS, MATURITY_SCORES
+
+# Domain order used for the domain axis of every batch array
+DOMAIN_ORDER = list(DOMAIN_WEIGHTS.keys())
+DOMAIN_INDEX = {domain: index for index, domain in enumerate(DOMAIN_ORDER)}
+
+# Risk adjustment factors, mirroring apply_risk_adjustments
+RISK_FACTORS = {
+    'low': 1.0,
+    'medium': 0.95,
+    'high': 0.90
+}
+
+# Lookup table from maturity level to base score (levels outside 0-5 score 0)
+_MATURITY_LOOKUP = np.array([MATURITY_SCORES[level] for level in range(6)], dtype=np.float64)
+
+
+class ResponseBatch:
+    """
+    Column-oriented store of assessment responses for many assessments
+
+    Every response is one row; `assessment_index` says which assessment the row
+    belongs to. Missing values (None in the ORM) are stored as NaN. All
+    assessments in a batch are scored against the same control catalog.
+    """
+
+    def __init__(self, assessment_index, maturity, evidence_completeness, response_quality,
+                 control_weight, domain_index, risk_levels: List[str],
+                 control_ids: Optional[List[str]] = None, calculated_score=None,
+                 catalog: Optional[ControlCatalog] = None):
+        self.assessment_index = np.asarray(assessment_index, dtype=np.int64)
+        self.maturity = np.asarray(maturity, dtype=np.float64)
+        self.evidence_completeness = np.asarray(evidence_completeness, dtype=np.float64)
+        self.response_quality = np.asarray(response_quality, dtype=np.float64)
+        self.control_weight = np.asarray(control_weight, dtype=np.float64)
+        self.domain_index = np.asarray(domain_index, dtype=np.int64)
+        self.risk_levels = list(risk_levels)
+        self.control_ids = control_ids
+        self.n_assessments = len(self.risk_levels)
+        self.catalog = catalog if catalog is not None else get_control_catalog()
+
+        if calculated_score is None:
+            calculated_score = calculate_compliance_scores(
+                self.maturity, self.evidence_completeness, self.response_quality
+            )
+        self.calculated_score = np.asarray(calculated_score, dtype=np.float64)
+
+    @classmethod
+    def from_responses(cls, assessments: Iterable[Tuple[List[Any], str]],
+                       catalog: Optional[ControlCatalog] = None) -> 'ResponseBatch':
+        """
+        Pack AssessmentResponse objects into a batch
+
+        Args:
+            assessments: Iterable of (responses, risk_level) pairs
+            catalog: Control catalog the assessments are scored against (default catalog if None)
+
+        Returns:
+            ResponseBatch holding every response of every assessment
+        """
+        if catalog is None:
+            catalog = get_control_catalog()
+
+        assessment_index = []
+        maturity = []
+        evidence = []
+        quality = []
+        weights = []
+        domains = []
+        scores = []
+        control_ids = []
+        risk_levels = []
+
+        for index, (responses, risk_level) in enumerate(assessments):
+            risk_levels.append(risk_level)
+            for response in responses:
+                assessment_index.append(index)
+                maturity.append(_to_float(response.maturity_level))
+                evidence.append(_to_float(response.evidence_completeness))
+                quality.append(_to_float(response.response_quality))
+                scores.append(_to_float(response.calculated_score))
+                weights.append(catalog.weight_for(response.control_id, response.domain))
+                domains.append(DOMAIN_INDEX.get(response.domain, len(DOMAIN_ORDER)))
+                control_ids.append(response.control_id)
+
+        return cls(
+            assessment_index=assessment_index,
+            maturity=maturity,
+            evidence_completeness=evidence,
+            response_quality=quality,
+            control_weight=weights,
+            domain_index=domains,
+            risk_levels=risk_levels,
+            control_ids=control_ids,
+            calculated_score=scores,
+            catalog=catalog
+        )
+
+
+def _to_float(value) -> float:
+    """Convert an optional ORM value to float, mapping None to NaN"""
+    return np.nan if value is None else float(value)
+
+
+def _to_optional(value: float):
+    """Convert a NaN-encoded float back to None"""
+    return None if value != value else value
+
+
+def calculate_compliance_scores(maturity, evidence_completeness, response_quality) -> np.ndarray:
+    """
+    Vectorized equivalent of scoring.calculate_compliance_score
+
+    Args:
+        maturity: Maturity levels (NaN where not answered)
+        evidence_completeness: Evidence completeness factors (NaN defaults to 0.5)
+        response_quality: Response quality factors (NaN defaults to 0.5)
+
+    Returns:
+        Array of control scores, NaN where maturity is missing
+    """
+    maturity = np.asarray(maturity, dtype=np.float64)
+    evidence = np.nan_to_num(np.asarray(evidence_completeness, dtype=np.float64), nan=0.5)
+    quality = np.nan_to_num(np.asarray(response_quality, dtype=np.float64), nan=0.5)
+
+    answered = ~np.isnan(maturity)
+    in_range = answered & np.isin(maturity, np.arange(6))
+    levels = np.where(in_range, maturity, 0).astype(np.int64)
+
+    base_score = np.where(in_range, _MATURITY_LOOKUP[levels], 0.0)
+    base_score = base_score * (1 + (evidence - 0.5) * 0.2)
+    base_score = base_score * (1 + (quality - 0.5) * 0.1)
+    base_score = np.clip(base_score, 0.0, 100.0)
+
+    return np.where(answered, base_score, np.nan)
+
+
+def _bincount(index: np.ndarray, weights: Optional[np.ndarray], size: int) -> np.ndarray:
+    """Sequential grouped sum, accumulating in row order like the scalar loops"""
+    return np.bincount(index, weights=weights, minlength=size)[:size]
+
+
+def calculate_batch_scores(batch: ResponseBatch) -> List[Dict[str, Any]]:
+    """
+    Calculate comprehensive compliance scores for every assessment in a batch
+
+    The result for each assessment is identical to calling
+    scoring.calculate_assessment_scores on that assessment's responses.
+
+    Args:
+        batch: ResponseBatch to score
+
+    Returns:
+        List of scoring result dictionaries, one per assessment in batch order
+    """
+    return _calculate_batch(batch, with_states=False)[0]
+
+
+def calculate_batch_scores_and_states(batch: ResponseBatch) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Calculate scores and running-sum score states for every assessment in a batch
+
+    Each state is what scoring.build_score_state would build from that
+    assessment's responses, read off the same grouped sums as the scores.
+
+    Args:
+        batch: ResponseBatch to score
+
+    Returns:
+        Tuple of (scoring results, score states), each in batch order
+    """
+    return _calculate_batch(batch, with_states=True)
+
+
+def _calculate_batch(batch: ResponseBatch, with_states: bool) -> Tuple[List[Dict[str, Any]], Optional[List[Dict[str, Any]]]]:
+    """Score a batch, also building score states if with_states is set"""
+    n_assessments = batch.n_assessments
+    n_domains = len(DOMAIN_ORDER)
+    catalog = batch.catalog
+    total_controls = catalog.total_controls
+
+    scored = ~np.isnan(batch.calculated_score)
+    answered = ~np.isnan(batch.maturity)
+    has_evidence = ~np.isnan(batch.evidence_completeness)
+
+    # Per-domain aggregates on a flattened (assessment, domain) axis; responses
+    # filed under an unknown domain land in an overflow column that is dropped
+    cells = n_assessments * (n_domains + 1)
+    cell_index = batch.assessment_index * (n_domains + 1) + batch.domain_index
+
+    score_values = np.where(scored, batch.calculated_score, 0.0)
+    weights = np.where(scored, batch.control_weight, 0.0)
+    maturity_values = np.where(answered, batch.maturity, 0.0)
+    scored_answered = scored & answered
+
+    def domain_matrix(values):
+        return _bincount(cell_index, values, cells).reshape(n_assessments, n_domains + 1)[:, :n_domains]
+
+    weighted_sums = domain_matrix(score_values * batch.control_weight)
+    weight_sums = domain_matrix(weights)
+    response_counts = domain_matrix(scored.astype(np.float64))
+    maturity_sums = domain_matrix(np.where(scored_answered, maturity_values, 0.0))
+    maturity_counts = domain_matrix(scored_answered.astype(np.float64))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        domain_raw = np.where(weight_sums > 0, weighted_sums / weight_sums, 0.0)
+        average_maturity = np.where(maturity_counts > 0, maturity_sums / maturity_counts, 0.0)
+
+    controls_per_domain = np.array(
+        [catalog.domain_control_count(domain) for domain in DOMAIN_ORDER],
+        dtype=np.float64
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        completion = np.where(controls_per_domain > 0, response_counts / controls_per_domain, 0.0)
+
+    # Domain scores are rounded before the overall roll-up, exactly as in the
+    # scalar implementation
+    domain_rounded = _round(domain_raw, 2)
+
+    risk_factors = np.array(
+        [RISK_FACTORS.get(level.lower(), 1.0) for level in batch.risk_levels], dtype=np.float64
+    )
+    overall, risk_adjusted = _roll_up_overall(domain_rounded, risk_factors)
+
+    # Assessment-level completeness and evidence quality
+    completed = _bincount(batch.assessment_index, answered.astype(np.float64), n_assessments)
+    totals = _bincount(batch.assessment_index, None, n_assessments)
+    evidence_sums = _bincount(batch.assessment_index, np.where(has_evidence, batch.evidence_completeness, 0.0), n_assessments)
+    evidence_counts = _bincount(batch.assessment_index, has_evidence.astype(np.float64), n_assessments)
+
+    completeness = completed / total_controls if total_controls > 0 else np.zeros(n_assessments)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        evidence_quality = np.where(evidence_counts > 0, evidence_sums / evidence_counts, 0.5)
+
+    confidence = 0.95 * completeness * evidence_quality
+    margin = (1 - confidence) * 20
+
+    # Maturity distribution: counts per level 0-5, plus all answered responses;
+    # levels outside 0-5 land in a seventh column
+    level_index = np.where(answered & np.isin(batch.maturity, np.arange(6)), maturity_values, 6).astype(np.int64)
+    all_level_counts = _bincount(
+        batch.assessment_index[answered] * 7 + level_index[answered], None, n_assessments * 7
+    ).reshape(n_assessments, 7)
+    level_counts = all_level_counts[:, :6]
+
+    control_scores = _collect_control_scores(batch, scored)
+    calculation_metadata = {
+        'domain_weights': DOMAIN_WEIGHTS,
+        'maturity_scores': MATURITY_SCORES,
+        'total_controls': total_controls,
+        'catalog_version': catalog.key
+    }
+
+    # Round whole columns at once, then convert to Python scalars for assembly
+    domain_l = domain_rounded.tolist()
+    average_maturity_l = _round(average_maturity, 2).tolist()
+    completion_l = _round(completion * 100, 1).tolist()
+    response_counts_l = response_counts.astype(np.int64).tolist()
+    base_l = _round(overall, 2).tolist()
+    risk_adjusted_l = risk_adjusted.tolist()
+    overall_l = _round(risk_adjusted, 2).tolist()
+    lower_l = _round(risk_adjusted - margin, 2).tolist()
+    upper_l = _round(risk_adjusted + margin, 2).tolist()
+    margin_l = _round(margin, 2).tolist()
+    confidence_l = _round(confidence, 3).tolist()
+    completeness_l = _round(np.asarray(completeness, dtype=np.float64) * 100, 1).tolist()
+    evidence_quality_l = _round(evidence_quality, 3).tolist()
+    completed_l = completed.astype(np.int64).tolist()
+    totals_l = totals.astype(np.int64).tolist()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = (level_counts / completed[:, np.newaxis]) * 100
+    percentages_l = _round(np.nan_to_num(percentages), 1).tolist()
+    level_counts_l = level_counts.astype(np.int64).tolist()
+    margin_raw_l = margin.tolist()
+
+    results = []
+    for a in range(n_assessments):
+        domain_details = {}
+        for column, domain in enumerate(DOMAIN_ORDER):
+            domain_details[domain] = {
+                'score': domain_l[a][column],
+                'response_count': response_counts_l[a][column],
+                'average_maturity': average_maturity_l[a][column],
+                'completion_rate': completion_l[a][column]
+            }
+
+        # max()/min() against int bounds return the int itself when clamping
+        score = risk_adjusted_l[a]
+        lower_bound = lower_l[a] if score - margin_raw_l[a] > 0 else 0
+        upper_bound = upper_l[a] if score + margin_raw_l[a] < 100 else 100
+
+        results.append({
+            'overall_score': overall_l[a],
+            'base_score': base_l[a],
+            'risk_adjustment': batch.risk_levels[a],
+            'domain_scores': {domain: data['score'] for domain, data in domain_details.items()},
+            'domain_details': domain_details,
+            'control_scores': control_scores[a],
+            'maturity_distribution': _maturity_distribution(
+                percentages_l[a], level_counts_l[a], completed_l[a]
+            ),
+            'confidence_interval': {
+                'score': overall_l[a],
+                'confidence': confidence_l[a],
+                'lower_bound': lower_bound,
+                'upper_bound': upper_bound,
+                'margin_of_error': margin_l[a]
+            },
+            'assessment_completeness': completeness_l[a],
+            'average_evidence_quality': evidence_quality_l[a],
+            'total_responses': totals_l[a],
+            'completed_responses': completed_l[a],
+            'calculation_metadata': calculation_metadata
+        })
+
+    if not with_states:
+        return results, None
+
+    states = _score_states(
+        control_scores,
+        weighted_sums.tolist(), weight_sums.tolist(), response_counts_l,
+        maturity_sums.astype(np.int64).tolist(), maturity_counts.astype(np.int64).tolist(),
+        all_level_counts.astype(np.int64).tolist(), totals_l, completed_l,
+        evidence_sums.tolist(), evidence_counts.astype(np.int64).tolist()
+    )
+    return results, states
+
+
+def _score_states(control_scores, weighted_sums, weight_sums, response_counts, maturity_sums,
+                  maturity_counts, level_counts, totals, completed, evidence_sums,
+                  evidence_counts) -> List[Dict[str, Any]]:
+    """Assemble scoring.create_score_state dictionaries from per-assessment grouped sums"""
+    level_keys = [str(level) for level in range(6)] + ['other']
+
+    states = []
+    for a in range(len(totals)):
+        states.append({
+            'domains': {
+                domain: {
+                    'weighted_score': weighted_sums[a][column],
+                    'weight': weight_sums[a][column],
+                    'response_count': response_counts[a][column],
+                    'maturity_sum': maturity_sums[a][column],
+                    'maturity_count': maturity_counts[a][column]
+                }
+                for column, domain in enumerate(DOMAIN_ORDER)
+            },
+            'maturity_counts': {key: count for key, count in zip(level_keys, level_counts[a]) if count},
+            'total_responses': totals[a],
+            'completed_responses': completed[a],
+            'evidence_sum': evidence_sums[a],
+            'evidence_count': evidence_counts[a],
+            'control_scores': dict(control_scores[a]),
+            'updates': 0
+        })
+
+    return states
+
+
+def _roll_up_overall(domain_rounded: np.ndarray, risk_factors) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Combine rounded domain scores into overall scores
+
+    Args:
+        domain_rounded: (rows, domains) matrix of domain scores rounded to 2 places
+        risk_factors: Risk adjustment factor per row (or a scalar)
+
+    Returns:
+        Tuple of (overall score before risk adjustment, risk-adjusted score)
+    """
+    n_rows = domain_rounded.shape[0]
+    total_weighted = np.zeros(n_rows)
+    total_weight = np.zeros(n_rows)
+    for column, domain in enumerate(DOMAIN_ORDER):
+        included = domain_rounded[:, column] > 0
+        total_weighted = np.where(included, total_weighted + domain_rounded[:, column] * DOMAIN_WEIGHTS[domain], total_weighted)
+        total_weight = np.where(included, total_weight + DOMAIN_WEIGHTS[domain], total_weight)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overall = np.where(total_weight > 0, total_weighted / total_weight, 0.0)
+
+    risk_adjusted = np.clip(overall * risk_factors, 0.0, 100.0)
+    return overall, risk_adjusted
+
+
+def _round(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    Round an array exactly like Python's built-in round()
+
+    np.rint on the scaled value agrees with round() except where float error
+    puts the scaled value on a .5 tie; those few elements fall back to round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** digits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [round(value, digits) for value in values[ties].tolist()]
+
+    return rounded
+
+
+def _collect_control_scores(batch: ResponseBatch, scored: np.ndarray) -> List[Dict[str, Any]]:
+    """Build the per-control score dictionaries for every assessment"""
+    control_scores = [{} for _ in range(batch.n_assessments)]
+    if batch.control_ids is None:
+        return control_scores
+
+    rows = np.flatnonzero(scored).tolist()
+    assessment_index = batch.assessment_index.tolist()
+    scores = batch.calculated_score.tolist()
+    maturity = batch.maturity.tolist()
+    evidence = batch.evidence_completeness.tolist()
+    quality = batch.response_quality.tolist()
+
+    for row in rows:
+        level = _to_optional(maturity[row])
+        control_scores[assessment_index[row]][batch.control_ids[row]] = {
+            'score': scores[row],
+            'maturity_level': int(level) if level is not None else None,
+            'evidence_completeness': _to_optional(evidence[row]),
+            'response_quality': _to_optional(quality[row])
+        }
+
+    return control_scores
+
+
+def _maturity_distribution(percentages: List[float], level_counts: List[int],
+                           total_responses: int) -> Dict[str, Any]:
+    """Assemble the maturity distribution dictionary from per-level counts"""
+    if total_responses == 0:
+        return {
+            'distribution': {str(i): 0 for i in range(6)},
+            'average_maturity': 0.0,
+            'total_responses': 0
+        }
+
+    weighted_sum = sum(level * count for level, count in enumerate(level_counts))
+
+    return {
+        'distribution': {str(level): percentages[level] for level in range(6)},
+        'average_maturity': round(weighted_sum / total_responses, 2),
+        'total_responses': total_responses
+    }
+
+
+def score_assessments(assessments: List[Any], responses: List[Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Score a list of Assessment objects in one batch
+
+    Args:
+        assessments: Assessment objects to score
+        responses: AssessmentResponse objects for those assessments, e.g. from a
+            single query filtered on assessment_id
+
+    Returns:
+        Dictionary mapping assessment ID to its scoring results
+    """
+    return {
+        assessment_id: scores
+        for assessment_id, (scores, _) in _score_assessments(assessments, responses, with_states=False).items()
+    }
+
+
+def score_assessments_with_states(assessments: List[Any],
+                                  responses: List[Any]) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Score a list of Assessment objects in one batch, with their score states
+
+    Args:
+        assessments: Assessment objects to score
+        responses: AssessmentResponse objects for those assessments
+
+    Returns:
+        Dictionary mapping assessment ID to a (scoring results, score state) pair
+    """
+    return _score_assessments(assessments, responses, with_states=True)
+
+
+def _score_assessments(assessments: List[Any], responses: List[Any],
+                       with_states: bool) -> Dict[str, Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Score assessments grouped by catalog version, pairing each result with its state (or None)"""
+    grouped = {assessment.id: [] for assessment in assessments}
+    for response in responses:
+        if response.assessment_id in grouped:
+            grouped[response.assessment_id].append(response)
+
+    # One batch per catalog version, since weights and control counts differ
+    by_catalog = {}
+    for assessment in assessments:
+        by_catalog.setdefault(assessment.catalog_version, []).append(assessment)
+
+    scored = {}
+    for catalog_version, members in by_catalog.items():
+        batch = ResponseBatch.from_responses(
+            ((grouped[assessment.id], assessment.risk_level) for assessment in members),
+            catalog=get_control_catalog(catalog_version)
+        )
+        results, states = _calculate_batch(batch, with_states)
+        if states is None:
+            states = [None] * len(results)
+        scored.update({
+            assessment.id: (scores, state) for assessment, scores, state in zip(members, results, states)
+        })
+
+    return {assessment.id: scored[assessment.id] for assessment in assessments}
+
+
+def simulate_scenarios(responses: List[Any], scenarios: List[List[Dict[str, Any]]], risk_level: str = 'medium',
+                       catalog: Optional[ControlCatalog] = None) -> Dict[str, Any]:
+    """
+    Score hypothetical response changes against an assessment's current responses
+
+    Each scenario is applied as a delta to the current per-domain sums, so the
+    cost grows with the number of changed controls rather than with the
+    number of scenarios times the number of responses. Nothing is written
+    back to the responses.
+
+    Args:
+        responses: Current AssessmentResponse objects of the assessment
+        scenarios: One list of changes per scenario; each change is a dictionary
+            with 'control_id' and any of 'maturity_level',
+            'evidence_completeness' and 'response_quality'. Fields left out
+            keep the current response value. A control changed twice in one
+            scenario takes the fields of the later change.
+        risk_level: Risk level for risk-based adjustments
+        catalog: Control catalog the assessment is scored against (default catalog if None)
+
+    Returns:
+        Dictionary with the 'baseline' scores and per-scenario 'scenarios' results
+    """
+    if catalog is None:
+        catalog = get_control_catalog()
+
+    n_domains = len(DOMAIN_ORDER)
+    n_scenarios = len(scenarios)
+
+    # Current responses, one row per control
+    current = {response.control_id: response for response in responses}
+    base = ResponseBatch.from_responses([(list(current.values()), risk_level)], catalog=catalog)
+    scored = ~np.isnan(base.calculated_score)
+    base_cells = base.domain_index
+    base_weighted = _bincount(base_cells, np.where(scored, base.calculated_score * base.control_weight, 0.0), n_domains + 1)
+    base_weight = _bincount(base_cells, np.where(scored, base.control_weight, 0.0), n_domains + 1)
+    base_count = _bincount(base_cells, scored.astype(np.float64), n_domains + 1)
+
+    # Flatten every (scenario, control) change into parallel columns
+    scenario_index = []
+    domain_index = []
+    weights = []
+    old_score = []
+    new_maturity = []
+    new_evidence = []
+    new_quality = []
+
+    for index, changes in enumerate(scenarios):
+        merged = {}
+        for change in changes:
+            control_id = change.get('control_id')
+            if control_id not in catalog:
+                raise ValueError(f"Scenario {index}: invalid control ID: {control_id}")
+            merged.setdefault(control_id, {}).update(
+                {field: value for field, value in change.items() if field != 'control_id'}
+            )
+
+        for control_id, fields in merged.items():
+            response = current.get(control_id)
+            if response is not None:
+                domain = response.domain
+                previous = (response.maturity_level, response.evidence_completeness,
+                            response.response_quality, response.calculated_score)
+            else:
+                domain = catalog.get(control_id)['domain']
+                previous = (None, None, None, None)
+
+            scenario_index.append(index)
+            domain_index.append(DOMAIN_INDEX.get(domain, n_domains))
+            weights.append(catalog.weight_for(control_id, domain))
+            old_score.append(_to_float(previous[3]))
+            new_maturity.append(_to_float(fields.get('maturity_level', previous[0])))
+            new_evidence.append(_to_float(fields.get('evidence_completeness', previous[1])))
+            new_quality.append(_to_float(fields.get('response_quality', previous[2])))
+
+    scenario_index = np.asarray(scenario_index, dtype=np.int64)
+    domain_index = np.asarray(domain_index, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    old_score = np.asarray(old_score, dtype=np.float64)
+    new_score = calculate_compliance_scores(new_maturity, new_evidence, new_quality)
+
+    old_scored = ~np.isnan(old_score)
+    new_scored = ~np.isnan(new_score)
+
+    # Per-scenario domain deltas on a flattened (scenario, domain) axis
+    cells = n_scenarios * (n_domains + 1)
+    cell_index = scenario_index * (n_domains + 1) + domain_index
+
+    def delta_matrix(values):
+        return _bincount(cell_index, values, cells).reshape(n_scenarios, n_domains + 1)
+
+    weighted_delta = delta_matrix(
+        np.where(new_scored, new_score * weights, 0.0) - np.where(old_scored, old_score * weights, 0.0)
+    )
+    weight_delta = delta_matrix(np.where(new_scored, weights, 0.0) - np.where(old_scored, weights, 0.0))
+    count_delta = delta_matrix(new_scored.astype(np.float64) - old_scored.astype(np.float64))
+
+    # Row 0 is the unchanged baseline, rows 1..n are the scenarios
+    weighted_sums = np.vstack([base_weighted, base_weighted + weighted_delta])[:, :n_domains]
+    weight_sums = np.vstack([base_weight, base_weight + weight_delta])[:, :n_domains]
+    response_counts = np.vstack([base_count, base_count + count_delta])[:, :n_domains]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        domain_raw = np.where((response_counts > 0) & (weight_sums > 0), weighted_sums / weight_sums, 0.0)
+
+    domain_rounded = _round(domain_raw, 2)
+    overall, risk_adjusted = _roll_up_overall(domain_rounded, RISK_FACTORS.get(risk_level.lower(), 1.0))
+
+    domain_l = domain_rounded.tolist()
+    base_l = _round(overall, 2).tolist()
+    overall_rounded = _round(risk_adjusted, 2)
+    overall_l = overall_rounded.tolist()
+    delta_l = _round(overall_rounded - overall_rounded[0], 2).tolist()
+    changed_l = np.bincount(scenario_index, minlength=n_scenarios).tolist() if n_scenarios else []
+
+    def result(row):
+        return {
+            'overall_score': overall_l[row],
+            'base_score': base_l[row],
+            'domain_scores': dict(zip(DOMAIN_ORDER, domain_l[row]))
+        }
+
+    scenario_results = []
+    for index in range(n_scenarios):
+        scenario_result = result(index + 1)
+        scenario_result['score_delta'] = delta_l[index + 1]
+        scenario_result['changed_controls'] = changed_l[index]
+        scenario_results.append(scenario_result)
+
+    return {
+        'baseline': result(0),
+        'scenarios': scenario_results,
+        'risk_adjustment': risk_level,
+        'catalog_version': catalog.key
+    }
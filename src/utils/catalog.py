@@ -0,0 +1,317 @@
+"""
+Compiled Control Catalog
+Loads versioned control catalogs from data files and precomputes lookup indexes
+for O(1) domain and stage queries
+"""
+
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple
+
+# Directory holding <framework>/<version>.json catalog files
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'catalogs')
+
+DEFAULT_FRAMEWORK = 'iso42001'
+DEFAULT_VERSION = '2023.1'
+
+# Stages a control can be assessed in
+ASSESSMENT_STAGES = (
+    'requirements_gathering',
+    'gap_assessment',
+    'policy_review',
+    'implementation_status',
+    'internal_audit'
+)
+
+# Answer types a catalog question may declare
+QUESTION_TYPES = ('text', 'multiple_choice', 'rating', 'boolean')
+
+
+class CatalogError(ValueError):
+    """Raised when a catalog cannot be found or fails validation"""
+
+
+class ControlCatalog:
+    """Read-only control definitions with domain, stage and weight indexes built once"""
+
+    __slots__ = (
+        'framework', 'version', 'name', 'controls', 'control_index', 'domain_controls',
+        'stage_controls', 'domain_total_weights', 'total_controls'
+    )
+
+    def __init__(self, controls: Dict[str, Dict[str, Any]], framework: str = DEFAULT_FRAMEWORK,
+                 version: str = DEFAULT_VERSION, name: Optional[str] = None):
+        self.framework = framework
+        self.version = version
+        self.name = name or framework
+
+        frozen = {control_id: _freeze(control_info) for control_id, control_info in controls.items()}
+
+        control_index = {}
+        domain_controls = {}
+        stage_controls = {}
+        domain_total_weights = {}
+
+        for control_id, control_info in frozen.items():
+            domain = control_info['domain']
+            stage = control_info['stage']
+            weight = control_info.get('weight', 1)
+
+            # control_id -> (domain, stage, weight)
+            control_index[control_id] = (domain, stage, weight)
+            domain_controls.setdefault(domain, {})[control_id] = control_info
+            stage_controls.setdefault(stage, {})[control_id] = control_info
+            domain_total_weights[domain] = domain_total_weights.get(domain, 0) + weight
+
+        self.controls = MappingProxyType(frozen)
+        self.control_index = MappingProxyType(control_index)
+        self.domain_controls = MappingProxyType(
+            {domain: MappingProxyType(members) for domain, members in domain_controls.items()}
+        )
+        self.stage_controls = MappingProxyType(
+            {stage: MappingProxyType(members) for stage, members in stage_controls.items()}
+        )
+        self.domain_total_weights = MappingProxyType(domain_total_weights)
+        self.total_controls = len(frozen)
+
+    @property
+    def key(self) -> str:
+        """Catalog identifier stored on assessments, e.g. 'iso42001:2023.1'"""
+        return make_catalog_key(self.framework, self.version)
+
+    def get(self, control_id: str, default=None):
+        """Get a control definition by ID"""
+        return self.controls.get(control_id, default)
+
+    def controls_in_domain(self, domain: str):
+        """Get the controls belonging to a domain"""
+        return self.domain_controls.get(domain, _EMPTY)
+
+    def controls_in_stage(self, stage: str):
+        """Get the controls assessed in a stage"""
+        return self.stage_controls.get(stage, _EMPTY)
+
+    def domain_control_count(self, domain: str) -> int:
+        """Get the number of controls in a domain"""
+        return len(self.domain_controls.get(domain, _EMPTY))
+
+    def stage_control_count(self, stage: str) -> int:
+        """Get the number of controls in a stage"""
+        return len(self.stage_controls.get(stage, _EMPTY))
+
+    def weight_for(self, control_id: str, domain: str) -> int:
+        """
+        Get the scoring weight of a control filed under a domain
+
+        Controls only carry their catalog weight within their own domain;
+        anything else (unknown control or mismatched domain) weighs 1.
+        """
+        entry = self.control_index.get(control_id)
+        if entry is None or entry[0] != domain:
+            return 1
+        return entry[2]
+
+    def to_dict(self, stage: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Get control definitions as plain JSON-serializable dictionaries"""
+        controls = self.controls_in_stage(stage) if stage else self.controls
+        return {control_id: _thaw(control_info) for control_id, control_info in controls.items()}
+
+    def __contains__(self, control_id: str) -> bool:
+        return control_id in self.controls
+
+    def __len__(self) -> int:
+        return self.total_controls
+
+
+_EMPTY = MappingProxyType({})
+
+
+def _freeze(value):
+    """Recursively convert dicts and lists to read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    """Inverse of _freeze, for JSON serialization"""
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def make_catalog_key(framework: str, version: str) -> str:
+    """Build a catalog key from framework and version"""
+    return f"{framework}:{version}"
+
+
+def parse_catalog_key(catalog_key: Optional[str]) -> Tuple[str, str]:
+    """
+    Split a catalog key into framework and version
+
+    Args:
+        catalog_key: Key such as 'iso42001:2023.1'; None selects the default catalog
+
+    Returns:
+        Tuple of (framework, version)
+    """
+    if not catalog_key:
+        return DEFAULT_FRAMEWORK, DEFAULT_VERSION
+
+    framework, separator, version = catalog_key.partition(':')
+    if not separator or not framework or not version:
+        raise CatalogError(f"Invalid catalog key: {catalog_key}")
+
+    return framework, version
+
+
+def list_catalogs() -> Dict[str, List[str]]:
+    """
+    List available catalog versions per framework without loading them
+
+    Returns:
+        Dictionary mapping framework name to sorted version list
+    """
+    catalogs = {}
+    if not os.path.isdir(CATALOG_DIR):
+        return catalogs
+
+    for framework in sorted(os.listdir(CATALOG_DIR)):
+        framework_dir = os.path.join(CATALOG_DIR, framework)
+        if not os.path.isdir(framework_dir):
+            continue
+        versions = sorted(f[:-5] for f in os.listdir(framework_dir) if f.endswith('.json'))
+        if versions:
+            catalogs[framework] = versions
+
+    return catalogs
+
+
+def validate_catalog_data(data: Dict[str, Any], valid_domains: Optional[Tuple[str, ...]] = None) -> List[str]:
+    """
+    Validate raw catalog data loaded from a catalog file
+
+    Args:
+        data: Parsed catalog file contents
+        valid_domains: Domains controls may belong to (None skips the check)
+
+    Returns:
+        List of validation error messages (empty when valid)
+    """
+    errors = []
+
+    controls = data.get('controls')
+    if not isinstance(controls, dict) or not controls:
+        return ["Catalog must define a non-empty 'controls' object"]
+
+    for control_id, control_info in controls.items():
+        if not isinstance(control_info, dict):
+            errors.append(f"Control {control_id} must be an object")
+            continue
+
+        for field in ('name', 'description', 'stage', 'domain'):
+            if not isinstance(control_info.get(field), str) or not control_info.get(field):
+                errors.append(f"Control {control_id} is missing '{field}'")
+
+        if control_info.get('stage') not in ASSESSMENT_STAGES:
+            errors.append(f"Control {control_id} has unknown stage '{control_info.get('stage')}'")
+
+        if valid_domains is not None and control_info.get('domain') not in valid_domains:
+            errors.append(f"Control {control_id} has unknown domain '{control_info.get('domain')}'")
+
+        weight = control_info.get('weight', 1)
+        if not isinstance(weight, int) or isinstance(weight, bool) or weight <= 0:
+            errors.append(f"Control {control_id} weight must be a positive integer")
+
+        for field in ('questions', 'evidence_required'):
+            if not isinstance(control_info.get(field, []), list):
+                errors.append(f"Control {control_id} '{field}' must be a list")
+
+        questions = control_info.get('questions', [])
+        if isinstance(questions, list):
+            for index, question in enumerate(questions):
+                errors.extend(
+                    f"Control {control_id} question {index + 1} {error}"
+                    for error in _validate_question(question)
+                )
+
+    return errors
+
+
+def _validate_question(question) -> List[str]:
+    """Validate a catalog question, given as plain text or a typed object"""
+    if isinstance(question, str):
+        return []
+    if not isinstance(question, dict):
+        return ["must be a string or an object"]
+
+    errors = []
+    if not isinstance(question.get('question'), str) or not question.get('question'):
+        errors.append("is missing 'question'")
+
+    question_type = question.get('type', 'text')
+    if question_type not in QUESTION_TYPES:
+        errors.append(f"has unknown type '{question_type}'")
+    elif question_type == 'multiple_choice':
+        options = question.get('options')
+        if not isinstance(options, list) or not options:
+            errors.append("must define a non-empty 'options' list")
+    elif question_type == 'rating':
+        bounds = [question.get(field, default) for field, default in (('min_rating', 1), ('max_rating', 5))]
+        if any(isinstance(bound, bool) or not isinstance(bound, (int, float)) for bound in bounds):
+            errors.append("rating range must be numeric")
+        elif bounds[0] > bounds[1]:
+            errors.append("min_rating must not exceed max_rating")
+
+    return errors
+
+
+@lru_cache(maxsize=None)
+def load_catalog(framework: str = DEFAULT_FRAMEWORK, version: str = DEFAULT_VERSION,
+                 valid_domains: Optional[Tuple[str, ...]] = None) -> ControlCatalog:
+    """
+    Load, validate and compile a catalog version, caching the result
+
+    Catalog files are only read the first time a version is requested.
+
+    Args:
+        framework: Framework name, e.g. 'iso42001'
+        version: Catalog version, e.g. '2023.1'
+        valid_domains: Domains controls may belong to (None skips the check)
+
+    Returns:
+        Compiled ControlCatalog
+    """
+    # Framework and version become path components, so keep them to safe names
+    for part in (framework, version):
+        if not part or os.path.basename(part) != part or part.startswith('.'):
+            raise CatalogError(f"Invalid catalog identifier: {part}")
+
+    path = os.path.join(CATALOG_DIR, framework, f"{version}.json")
+    if not os.path.exists(path):
+        raise CatalogError(f"Catalog not found: {make_catalog_key(framework, version)}")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise CatalogError(f"Catalog {make_catalog_key(framework, version)} is not valid JSON: {e}")
+
+    errors = validate_catalog_data(data, valid_domains)
+    if errors:
+        raise CatalogError(
+            f"Catalog {make_catalog_key(framework, version)} failed validation: " + '; '.join(errors)
+        )
+
+    return ControlCatalog(
+        data['controls'],
+        framework=framework,
+        version=version,
+        name=data.get('name')
+    )
@@ -10,18 +10,58 @@ from typing import Dict, Any, Optional
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import inch, mm
 from reportlab.lib.colors import Color, HexColor
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.platypus import Paragraph
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
-from reportlab.graphics.shapes import Drawing, Rect, String
+from reportlab.graphics.shapes import Drawing, Rect, String, Circle, Line
 from reportlab.graphics import renderPDF
+from xml.sax.saxutils import escape
 import qrcode
 from PIL import Image as PILImage
 import base64
 
+# Name of the form XObject holding the static layer of a certificate
+TEMPLATE_FORM = 'CertificateTemplate'
+
+# Fixed layout of the landscape A4 page, in points from the bottom edge
+HEADER_Y = 530
+TITLE_Y = 470
+SUBTITLE_Y = 444
+RULE_Y = 428
+INTRO_Y = 406
+ORGANIZATION_BOX = (396, 38)  # (top, height)
+BODY_BOX = (356, 86)
+TABLE_X = 90
+TABLE_TOP = 262
+TABLE_ROW_HEIGHT = 17
+TABLE_COLUMN_WIDTHS = (150, 230)
+SIGNATURE_X = 640
+SIGNATURE_LINE_Y = 248
+DATE_LINE_Y = 182
+FOOTER_Y = 122
+CONTACT_Y = 78
+
+DETAIL_LABELS = ['Certificate ID:', 'Assessment Date:', 'Compliance Score:', 'Risk Level:', 'Industry:', 'Valid Until:']
+
+FOOTER_TEXT = (
+    "This certificate is issued based on a comprehensive assessment of the organization's "
+    "AI management system against ISO 42001:2023 requirements. The certificate is valid "
+    "for one year from the date of issue and may be verified using the certificate ID above."
+)
+
 class CertificateGenerator:
-    """Professional ISO 42001 compliance certificate generator"""
+    """
+    Professional ISO 42001 compliance certificate generator
+    
+    Everything that is the same on every certificate (borders, headings,
+    the details table frame, signature block and footer) is laid out once,
+    when the generator is created, and rendered to PDF operators. Each
+    certificate replays those operators into a form XObject and stamps its
+    variable fields on top, so no layout work is repeated per certificate.
+    """
     
     def __init__(self):
         self.page_width, self.page_height = landscape(A4)
@@ -38,41 +78,23 @@ class CertificateGenerator:
         
         # Fonts and styles
         self.setup_styles()
+        
+        # Static layer shared by every certificate
+        self.template = self._build_template()
+        self._record_template()
     
     def setup_styles(self):
         """Setup custom paragraph styles"""
         self.styles = getSampleStyleSheet()
         
-        # Certificate title style
-        self.title_style = ParagraphStyle(
-            'CertificateTitle',
-            parent=self.styles['Heading1'],
-            fontSize=36,
-            textColor=self.primary_color,
-            alignment=TA_CENTER,
-            spaceAfter=20,
-            fontName='Helvetica-Bold'
-        )
-        
-        # Subtitle style
-        self.subtitle_style = ParagraphStyle(
-            'CertificateSubtitle',
-            parent=self.styles['Heading2'],
-            fontSize=18,
-            textColor=self.secondary_color,
-            alignment=TA_CENTER,
-            spaceAfter=30,
-            fontName='Helvetica'
-        )
-        
         # Organization name style
         self.org_style = ParagraphStyle(
             'OrganizationName',
             parent=self.styles['Heading1'],
             fontSize=28,
+            leading=32,
             textColor=self.text_color,
             alignment=TA_CENTER,
-            spaceAfter=10,
             fontName='Helvetica-Bold'
         )
         
@@ -81,31 +103,23 @@ class CertificateGenerator:
             'CertificateBody',
             parent=self.styles['Normal'],
             fontSize=14,
+            leading=17,
             textColor=self.text_color,
             alignment=TA_CENTER,
-            spaceAfter=20,
-            fontName='Helvetica'
-        )
-        
-        # Details style
-        self.details_style = ParagraphStyle(
-            'CertificateDetails',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            textColor=self.text_color,
-            alignment=TA_LEFT,
             fontName='Helvetica'
         )
         
-        # Signature style
-        self.signature_style = ParagraphStyle(
-            'SignatureStyle',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            textColor=self.text_color,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
+        # Smaller variants tried in turn when long names do not fit their box
+        self.org_styles = self._scaled_styles(self.org_style, (28, 24, 20, 16, 13))
+        self.body_styles = self._scaled_styles(self.body_style, (14, 13, 12, 11, 10))
+    
+    @staticmethod
+    def _scaled_styles(style, sizes):
+        return [
+            ParagraphStyle(f'{style.name}{size}', parent=style, fontSize=size,
+                           leading=size * style.leading / style.fontSize)
+            for size in sizes
+        ]
     
     def generate_certificate(self, assessment_data: Dict[str, Any], output_path: str) -> str:
         """
@@ -118,263 +132,175 @@ class CertificateGenerator:
         Returns:
             Path to the generated certificate file
         """
-        
-        # Create the PDF document
-        doc = SimpleDocTemplate(
-            output_path,
-            pagesize=landscape(A4),
-            rightMargin=self.margin,
-            leftMargin=self.margin,
-            topMargin=self.margin,
-            bottomMargin=self.margin
+        pdf = canvas.Canvas(output_path, pagesize=landscape(A4))
+        pdf.setTitle('ISO 42001 Compliance Certificate')
+        
+        # Static layer, stored once in the file as a form XObject
+        pdf.beginForm(TEMPLATE_FORM)
+        self._replay_template(pdf)
+        pdf.endForm()
+        pdf.doForm(TEMPLATE_FORM)
+        
+        # Variable fields
+        self._draw_fitted(
+            pdf, f"<b>{escape(assessment_data['organization_name'] or '')}</b>", self.org_styles, ORGANIZATION_BOX
         )
         
-        # Build the certificate content
-        story = []
-        
-        # Add header with logo and decorative elements
-        story.extend(self._create_header())
-        
-        # Add certificate title
-        story.append(Paragraph("CERTIFICATE OF COMPLIANCE", self.title_style))
-        story.append(Paragraph("ISO 42001:2023 - Artificial Intelligence Management Systems", self.subtitle_style))
-        
-        # Add decorative line
-        story.append(Spacer(1, 20))
-        story.extend(self._create_decorative_line())
-        story.append(Spacer(1, 30))
-        
-        # Add main certificate text
-        story.append(Paragraph("This is to certify that", self.body_style))
-        story.append(Spacer(1, 10))
-        
-        # Organization name (highlighted)
-        story.append(Paragraph(f"<b>{assessment_data['organization_name']}</b>", self.org_style))
-        story.append(Spacer(1, 20))
-        
-        # Certificate body text
         certificate_text = f"""
         has successfully demonstrated compliance with the requirements of ISO 42001:2023 
-        for their AI Management System: <b>{assessment_data['ai_system_name']}</b>
+        for their AI Management System: <b>{escape(assessment_data['ai_system_name'] or '')}</b>
         <br/><br/>
         This certification confirms that the organization has implemented effective 
         artificial intelligence governance, risk management, and operational controls 
         in accordance with international standards.
         """
-        story.append(Paragraph(certificate_text, self.body_style))
-        story.append(Spacer(1, 30))
+        self._draw_fitted(pdf, certificate_text, self.body_styles, BODY_BOX)
         
-        # Add assessment details table
-        story.extend(self._create_details_table(assessment_data))
-        story.append(Spacer(1, 30))
+        self._draw_details(pdf, assessment_data)
         
-        # Add signature section
-        story.extend(self._create_signature_section(assessment_data))
+        pdf.setFont('Helvetica-Bold', 12)
+        pdf.setFillColor(self.text_color)
+        pdf.drawCentredString(SIGNATURE_X, DATE_LINE_Y - 14, f"Date: {datetime.now().strftime('%B %d, %Y')}")
         
-        # Add footer with QR code and certificate ID
-        story.extend(self._create_footer(assessment_data))
-        
-        # Build the PDF
-        doc.build(story, onFirstPage=self._add_background, onLaterPages=self._add_background)
+        pdf.showPage()
+        pdf.save()
         
         return output_path
     
-    def _create_header(self):
-        """Create certificate header with logo and decorative elements"""
-        elements = []
-        
-        # Add some spacing for the header
-        elements.append(Spacer(1, 20))
-        
-        # Header text
-        header_text = "VULNURIS SECURITY SOLUTIONS LLP"
-        header_style = ParagraphStyle(
-            'HeaderStyle',
-            parent=self.styles['Normal'],
-            fontSize=16,
-            textColor=self.primary_color,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-        elements.append(Paragraph(header_text, header_style))
-        elements.append(Spacer(1, 10))
-        
-        # Subtitle
-        subtitle_text = "Authorized ISO 42001 Compliance Assessment Provider"
-        subtitle_style = ParagraphStyle(
-            'HeaderSubtitle',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            textColor=self.secondary_color,
-            alignment=TA_CENTER,
-            fontName='Helvetica'
-        )
-        elements.append(Paragraph(subtitle_text, subtitle_style))
-        elements.append(Spacer(1, 30))
-        
-        return elements
+    def _build_template(self) -> Drawing:
+        """Lay out the static layer of the certificate"""
+        drawing = Drawing(self.page_width, self.page_height)
+        center = self.page_width / 2
+        
+        # Borders
+        drawing.add(Rect(20, 20, self.page_width - 40, self.page_height - 40,
+                         strokeColor=self.primary_color, strokeWidth=3, fillColor=None))
+        drawing.add(Rect(30, 30, self.page_width - 60, self.page_height - 60,
+                         strokeColor=self.accent_color, strokeWidth=1, fillColor=None))
+        
+        # Corner decorations
+        for x in (50, self.page_width - 50):
+            for y in (50, self.page_height - 50):
+                drawing.add(Circle(x, y, 5, fillColor=self.accent_color, strokeColor=self.accent_color))
+        
+        # Header, title and decorative rule
+        self._add_text(drawing, center, HEADER_Y, "VULNURIS SECURITY SOLUTIONS LLP", 'Helvetica-Bold', 16,
+                       self.primary_color)
+        self._add_text(drawing, center, HEADER_Y - 18, "Authorized ISO 42001 Compliance Assessment Provider",
+                       'Helvetica', 12, self.secondary_color)
+        self._add_text(drawing, center, TITLE_Y, "CERTIFICATE OF COMPLIANCE", 'Helvetica-Bold', 36,
+                       self.primary_color)
+        self._add_text(drawing, center, SUBTITLE_Y, "ISO 42001:2023 - Artificial Intelligence Management Systems",
+                       'Helvetica', 18, self.secondary_color)
+        drawing.add(Rect(self.margin, RULE_Y, self.content_width, 4,
+                         fillColor=self.accent_color, strokeColor=None))
+        self._add_text(drawing, center, INTRO_Y, "This is to certify that", 'Helvetica', 14, self.text_color)
+        
+        self._add_details_frame(drawing)
+        
+        # Signature block
+        for y in (SIGNATURE_LINE_Y, DATE_LINE_Y):
+            drawing.add(Line(SIGNATURE_X - 110, y, SIGNATURE_X + 110, y, strokeColor=self.text_color, strokeWidth=0.5))
+        self._add_text(drawing, SIGNATURE_X, SIGNATURE_LINE_Y - 14, "Mandar Waghmare", 'Helvetica-Bold', 12,
+                       self.text_color)
+        self._add_text(drawing, SIGNATURE_X, SIGNATURE_LINE_Y - 27, "Authorized Signatory", 'Helvetica', 10,
+                       self.text_color)
+        self._add_text(drawing, SIGNATURE_X, SIGNATURE_LINE_Y - 39, "Qryti", 'Helvetica', 10, self.text_color)
+        self._add_text(drawing, SIGNATURE_X, DATE_LINE_Y - 27, "Certificate Issue Date", 'Helvetica', 10,
+                       self.text_color)
+        
+        # Footer
+        for index, line in enumerate(simpleSplit(FOOTER_TEXT, 'Helvetica', 10, self.content_width - 100)):
+            self._add_text(drawing, center, FOOTER_Y - index * 12, line, 'Helvetica', 10, self.text_color)
+        self._add_text(drawing, center, CONTACT_Y, "Qryti | ISO 42001 Compliance Assessment | www.qryti.com",
+                       'Helvetica', 9, self.secondary_color)
+        
+        return drawing
     
-    def _create_decorative_line(self):
-        """Create decorative line separator"""
-        elements = []
-        
-        # Create a simple decorative line using a table
-        line_data = [[''] * 50]  # Empty cells to create a line effect
-        line_table = Table(line_data, colWidths=[self.content_width/50] * 50)
-        line_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), self.accent_color),
-            ('GRID', (0, 0), (-1, -1), 2, self.accent_color),
-        ]))
-        
-        elements.append(line_table)
-        return elements
+    def _record_template(self):
+        """Render the static layer once, keeping its PDF operators and the font resources they name"""
+        scratch = canvas.Canvas(io.BytesIO(), pagesize=landscape(A4))
+        renderPDF.draw(self.template, scratch, 0, 0)
+        
+        # reportlab (pinned) keeps a page's operators in _code and names fonts /F1, /F2, ... in
+        # the order a document first uses them
+        self.template_operators = '\n'.join(scratch._code)
+        self.template_fonts = sorted(scratch._doc.fontMapping.items(), key=lambda item: int(item[1][2:]))
     
-    def _create_details_table(self, assessment_data: Dict[str, Any]):
-        """Create assessment details table"""
-        elements = []
-        
-        # Prepare table data
-        table_data = [
-            ['Assessment Details', ''],
-            ['Certificate ID:', assessment_data.get('certificate_id', 'CERT-' + datetime.now().strftime('%Y%m%d-%H%M%S'))],
-            ['Assessment Date:', assessment_data.get('completion_date', datetime.now().strftime('%B %d, %Y'))],
-            ['Compliance Score:', f"{assessment_data.get('final_score', 0):.1f}%"],
-            ['Risk Level:', assessment_data.get('risk_level', 'Medium').title()],
-            ['Industry:', assessment_data.get('industry', 'Technology').title()],
-            ['Valid Until:', (datetime.now() + timedelta(days=365)).strftime('%B %d, %Y')],
-        ]
-        
-        # Create table
-        details_table = Table(table_data, colWidths=[3*inch, 4*inch])
-        details_table.setStyle(TableStyle([
-            # Header row
-            ('BACKGROUND', (0, 0), (-1, 0), self.primary_color),
-            ('TEXTCOLOR', (0, 0), (-1, 0), HexColor('#ffffff')),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('SPAN', (0, 0), (-1, 0)),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            
-            # Data rows
-            ('BACKGROUND', (0, 1), (0, -1), self.light_gray),
-            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 1), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 12),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            
-            # Borders
-            ('GRID', (0, 0), (-1, -1), 1, self.primary_color),
-            ('LINEBELOW', (0, 0), (-1, 0), 2, self.primary_color),
-        ]))
-        
-        elements.append(details_table)
-        return elements
+    def _replay_template(self, pdf):
+        """Emit the static layer into a fresh canvas"""
+        # Registering the fonts in recording order gives them the names the operators use
+        for font_name, internal_name in self.template_fonts:
+            if pdf._doc.getInternalFontName(font_name) != internal_name:
+                renderPDF.draw(self.template, pdf, 0, 0)
+                return
+        pdf.addLiteral(self.template_operators)
     
-    def _create_signature_section(self, assessment_data: Dict[str, Any]):
-        """Create signature section"""
-        elements = []
-        
-        # Signature table
-        signature_data = [
-            ['', '', ''],
-            ['_' * 30, '', '_' * 30],
-            ['Mandar Waghmare', '', f"Date: {datetime.now().strftime('%B %d, %Y')}"],
-            ['Authorized Signatory', '', 'Certificate Issue Date'],
-            ['Qryti', '', ''],
-        ]
-        
-        signature_table = Table(signature_data, colWidths=[3*inch, 1*inch, 3*inch])
-        signature_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 2), (0, 2), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 2), (2, 2), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 2), (0, 2), 12),
-            ('FONTSIZE', (2, 2), (2, 2), 12),
-        ]))
-        
-        elements.append(signature_table)
-        return elements
+    def _add_details_frame(self, drawing: Drawing):
+        """Add the assessment details table without its values"""
+        label_width, value_width = TABLE_COLUMN_WIDTHS
+        width = label_width + value_width
+        rows = len(DETAIL_LABELS) + 1
+        bottom = TABLE_TOP - rows * TABLE_ROW_HEIGHT
+        
+        # Header row and label column
+        drawing.add(Rect(TABLE_X, TABLE_TOP - TABLE_ROW_HEIGHT, width, TABLE_ROW_HEIGHT,
+                         fillColor=self.primary_color, strokeColor=None))
+        drawing.add(Rect(TABLE_X, bottom, label_width, TABLE_TOP - TABLE_ROW_HEIGHT - bottom,
+                         fillColor=self.light_gray, strokeColor=None))
+        self._add_text(drawing, TABLE_X + width / 2, TABLE_TOP - TABLE_ROW_HEIGHT + 4, "Assessment Details",
+                       'Helvetica-Bold', 14, HexColor('#ffffff'))
+        
+        for index, label in enumerate(DETAIL_LABELS, start=1):
+            baseline = TABLE_TOP - (index + 1) * TABLE_ROW_HEIGHT + 5
+            drawing.add(String(TABLE_X + 6, baseline, label, fontName='Helvetica-Bold', fontSize=12,
+                               fillColor=self.text_color))
+        
+        # Grid
+        for index in range(rows + 1):
+            y = TABLE_TOP - index * TABLE_ROW_HEIGHT
+            drawing.add(Line(TABLE_X, y, TABLE_X + width, y, strokeColor=self.primary_color,
+                             strokeWidth=2 if index == 1 else 1))
+        for x in (TABLE_X, TABLE_X + label_width, TABLE_X + width):
+            top = TABLE_TOP if x != TABLE_X + label_width else TABLE_TOP - TABLE_ROW_HEIGHT
+            drawing.add(Line(x, top, x, bottom, strokeColor=self.primary_color, strokeWidth=1))
     
-    def _create_footer(self, assessment_data: Dict[str, Any]):
-        """Create footer with QR code and additional information"""
-        elements = []
-        
-        elements.append(Spacer(1, 20))
-        
-        # Footer text
-        footer_text = """
-        This certificate is issued based on a comprehensive assessment of the organization's 
-        AI management system against ISO 42001:2023 requirements. The certificate is valid 
-        for one year from the date of issue and may be verified using the certificate ID above.
-        """
-        
-        footer_style = ParagraphStyle(
-            'FooterStyle',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=self.text_color,
-            alignment=TA_CENTER,
-            fontName='Helvetica'
-        )
-        
-        elements.append(Paragraph(footer_text, footer_style))
-        elements.append(Spacer(1, 10))
-        
-        # Contact information
-        contact_text = "Qryti | ISO 42001 Compliance Assessment | www.qryti.com"
-        contact_style = ParagraphStyle(
-            'ContactStyle',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            textColor=self.secondary_color,
-            alignment=TA_CENTER,
-            fontName='Helvetica'
-        )
-        
-        elements.append(Paragraph(contact_text, contact_style))
-        
-        return elements
+    @staticmethod
+    def _add_text(drawing: Drawing, x: float, y: float, text: str, font_name: str, font_size: float, color):
+        drawing.add(String(x, y, text, fontName=font_name, fontSize=font_size, fillColor=color,
+                           textAnchor='middle'))
     
-    def _add_background(self, canvas, doc):
-        """Add background elements to the certificate"""
-        canvas.saveState()
-        
-        # Add border
-        canvas.setStrokeColor(self.primary_color)
-        canvas.setLineWidth(3)
-        canvas.rect(20, 20, self.page_width - 40, self.page_height - 40)
-        
-        # Add inner border
-        canvas.setStrokeColor(self.accent_color)
-        canvas.setLineWidth(1)
-        canvas.rect(30, 30, self.page_width - 60, self.page_height - 60)
-        
-        # Add corner decorations
-        self._add_corner_decorations(canvas)
-        
-        canvas.restoreState()
+    def _draw_fitted(self, pdf, text: str, styles, box):
+        """Draw a paragraph centred in a (top, height) box, using the first style it fits in"""
+        top, height = box
+        width = self.content_width
+        for style in styles:
+            paragraph = Paragraph(text, style)
+            _, paragraph_height = paragraph.wrap(width, height)
+            if paragraph_height <= height:
+                break
+        paragraph.drawOn(pdf, self.margin, top - min(paragraph_height, height))
     
-    def _add_corner_decorations(self, canvas):
-        """Add decorative elements to corners"""
-        corner_size = 30
-        
-        # Top-left corner
-        canvas.setFillColor(self.accent_color)
-        canvas.circle(50, self.page_height - 50, 5, fill=1)
-        
-        # Top-right corner
-        canvas.circle(self.page_width - 50, self.page_height - 50, 5, fill=1)
-        
-        # Bottom-left corner
-        canvas.circle(50, 50, 5, fill=1)
+    def _draw_details(self, pdf, assessment_data: Dict[str, Any]):
+        """Fill in the values of the assessment details table"""
+        values = [
+            assessment_data.get('certificate_id', 'CERT-' + datetime.now().strftime('%Y%m%d-%H%M%S')),
+            assessment_data.get('completion_date', datetime.now().strftime('%B %d, %Y')),
+            f"{assessment_data.get('final_score', 0):.1f}%",
+            assessment_data.get('risk_level', 'Medium').title(),
+            assessment_data.get('industry', 'Technology').title(),
+            (datetime.now() + timedelta(days=365)).strftime('%B %d, %Y'),
+        ]
         
-        # Bottom-right corner
-        canvas.circle(self.page_width - 50, 50, 5, fill=1)
+        label_width, value_width = TABLE_COLUMN_WIDTHS
+        max_width = value_width - 12
+        pdf.setFillColor(self.text_color)
+        for index, value in enumerate(values, start=1):
+            value = str(value)
+            # Shrink values that would overflow their cell
+            font_size = min(12, 12 * max_width / max(stringWidth(value, 'Helvetica', 12), 1))
+            pdf.setFont('Helvetica', max(font_size, 7))
+            pdf.drawString(TABLE_X + label_width + 6, TABLE_TOP - (index + 1) * TABLE_ROW_HEIGHT + 5, value)
     
     def generate_qr_code(self, data: str, size: int = 100) -> str:
         """Generate QR code for certificate verification"""
@@ -397,6 +323,16 @@ class CertificateGenerator:
         
         return qr_base64
 
+# Shared generator, so styles and the static layer are built once per process
+_generator = None
+
+def get_certificate_generator() -> CertificateGenerator:
+    """Get the shared certificate generator, creating it on first use"""
+    global _generator
+    if _generator is None:
+        _generator = CertificateGenerator()
+    return _generator
+
 def generate_compliance_certificate(assessment_data: Dict[str, Any], output_dir: str = None) -> str:
     """
     Generate a compliance certificate for a successful assessment
@@ -422,8 +358,7 @@ def generate_compliance_certificate(assessment_data: Dict[str, Any], output_dir:
     output_path = os.path.join(output_dir, filename)
     
     # Generate the certificate
-    generator = CertificateGenerator()
-    certificate_path = generator.generate_certificate(assessment_data, output_path)
+    certificate_path = get_certificate_generator().generate_certificate(assessment_data, output_path)
     
     return certificate_path
 
@@ -0,0 +1,125 @@
+"""
+Content-Addressable Evidence Store
+Stores each distinct evidence file once under its SHA-256 digest and tracks how
+many AssessmentFile rows reference it
+"""
+
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db
+from src.models.assessment import EvidenceBlob
+from src.utils.search_index import remove_blob_text
+from src.utils.storage import StorageBackend
+from src.utils.uploads import discard_partial
+
+# Key prefix of content-addressed blobs
+BLOB_PREFIX = 'blobs'
+
+# Directory levels of two hex digits between the prefix and the blob (overridden by BLOB_FANOUT_DEPTH)
+DEFAULT_FANOUT_DEPTH = 2
+MAX_FANOUT_DEPTH = 4
+
+
+def fanout_depth() -> int:
+    """Get the configured blob fanout depth"""
+    depth = int(current_app.config.get('BLOB_FANOUT_DEPTH', DEFAULT_FANOUT_DEPTH))
+    if not 0 <= depth <= MAX_FANOUT_DEPTH:
+        raise ValueError(f"BLOB_FANOUT_DEPTH must be between 0 and {MAX_FANOUT_DEPTH}")
+    return depth
+
+
+def blob_key(sha256: str, depth: Optional[int] = None) -> str:
+    """
+    Get the storage key of a blob, fanned out by digest prefix
+
+    e.g. blobs/ab/cd/abcd1234... at depth 2 (the configured depth by default)
+    """
+    if depth is None:
+        depth = fanout_depth()
+    levels = [sha256[2 * level:2 * level + 2] for level in range(depth)]
+    return '/'.join([BLOB_PREFIX, *levels, sha256])
+
+
+def add_blob_reference(storage: StorageBackend, partial_path: str, upload: Dict[str, Any],
+                       content_type: Optional[str] = None, keep_source: bool = False) -> EvidenceBlob:
+    """
+    Store an uploaded file as a blob, or reference the existing copy of its content
+
+    When a blob with the same digest exists the partial file is discarded and
+    only the reference count changes; otherwise the partial file is moved into
+    storage. The caller commits the session.
+
+    Args:
+        storage: Storage backend holding blob content
+        partial_path: Fully written temporary file holding the upload
+        upload: Result of stream_to_file/hash_file (size and sha256)
+        content_type: MIME type recorded with newly stored content
+        keep_source: Copy rather than consume the file (for files still being served)
+
+    Returns:
+        Referenced EvidenceBlob
+    """
+    sha256 = upload['sha256']
+    blob = EvidenceBlob.query.filter_by(sha256=sha256).with_for_update().first()
+
+    if blob and storage.exists(blob.storage_key):
+        if not keep_source:
+            discard_partial(partial_path)
+    else:
+        if blob:
+            # Row survived but its content went missing; restore it
+            blob.storage_key = blob_key(sha256)
+        else:
+            # Insert the row before writing the content: while the digest
+            # has a row, even an uncommitted one, the garbage collector
+            # cannot delete an object stored under it
+            blob = _insert_blob(sha256, upload['size'], blob_key(sha256))
+
+        if keep_source:
+            with open(partial_path, 'rb') as f:
+                storage.put_stream(blob.storage_key, f, content_type)
+        else:
+            storage.ingest_file(blob.storage_key, partial_path, content_type)
+
+    blob.ref_count += 1
+    blob.last_referenced_at = datetime.utcnow()
+    return blob
+
+
+def _insert_blob(sha256: str, file_size: int, key: str) -> EvidenceBlob:
+    """Insert a blob row, or lock the row a concurrent first upload of the same content inserted"""
+    try:
+        with db.session.begin_nested():
+            blob = EvidenceBlob(sha256=sha256, file_size=file_size, storage_key=key)
+            db.session.add(blob)
+    except IntegrityError:
+        # Both uploads stored identical content under the same key
+        blob = EvidenceBlob.query.filter_by(sha256=sha256).with_for_update().one()
+    return blob
+
+
+def release_blob_reference(sha256: str) -> None:
+    """
+    Drop one reference to a blob, deleting its row and extracted text when none remain
+
+    The content itself is never deleted here: an upload of the same content
+    may be storing it again concurrently. The evidence garbage collector
+    removes it once it has been unreferenced for its grace period.
+
+    Args:
+        sha256: Digest of the blob
+    """
+    blob = EvidenceBlob.query.filter_by(sha256=sha256).with_for_update().first()
+    if not blob:
+        return
+
+    blob.ref_count -= 1
+    if blob.ref_count > 0:
+        return
+
+    remove_blob_text(sha256)
+    db.session.delete(blob)
@@ -0,0 +1,253 @@
+"""
+Cross-Framework Control Mapping
+Maps ISO 42001 control results onto other frameworks' requirements (EU AI Act,
+NIST AI RMF) using precomputed sparse mapping matrices
+"""
+
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from src.utils.catalog import ControlCatalog, CatalogError, CATALOG_DIR
+from src.utils.scoring import get_control_catalog
+
+# Requirement status thresholds on the 0-100 coverage score
+MET_THRESHOLD = 80
+PARTIAL_THRESHOLD = 50
+
+
+class FrameworkMapping:
+    """
+    Sparse control-to-requirement mapping for every target framework of a catalog
+
+    The mapping is held in COO form (requirement, control, weight), sorted by
+    requirement and grouped by framework, so per-requirement and
+    per-framework sums are single np.add.reduceat calls.
+    """
+
+    def __init__(self, catalog: ControlCatalog, frameworks: Dict[str, Dict[str, Any]]):
+        self.catalog = catalog
+        self.control_ids = list(catalog.controls)
+        self.control_position = {control_id: index for index, control_id in enumerate(self.control_ids)}
+
+        self.framework_ids = []
+        self.framework_names = []
+        self.framework_starts = []  # first requirement index of each framework
+        self.requirement_ids = []
+        self.requirement_names = []
+        self.requirement_controls = []
+        self.requirement_starts = []  # first mapping entry of each requirement
+
+        rows = []
+        cols = []
+        weights = []
+
+        for framework_id, framework in frameworks.items():
+            self.framework_ids.append(framework_id)
+            self.framework_names.append(framework.get('name', framework_id))
+            self.framework_starts.append(len(self.requirement_ids))
+
+            for requirement_id, requirement in framework['requirements'].items():
+                row = len(self.requirement_ids)
+                self.requirement_ids.append(requirement_id)
+                self.requirement_names.append(requirement.get('name', requirement_id))
+                self.requirement_controls.append(list(requirement['controls']))
+                self.requirement_starts.append(len(rows))
+
+                for control_id, weight in requirement['controls'].items():
+                    rows.append(row)
+                    cols.append(self.control_position[control_id])
+                    weights.append(float(weight))
+
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.cols = np.asarray(cols, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.requirement_starts = np.asarray(self.requirement_starts, dtype=np.int64)
+        self.framework_starts = np.asarray(self.framework_starts, dtype=np.int64)
+
+        # Per-requirement mapped weight is fixed, so compute it once
+        self.requirement_weights = (
+            np.add.reduceat(self.weights, self.requirement_starts) if len(self.weights) else np.zeros(0)
+        )
+        self.requirement_framework = np.repeat(
+            np.arange(len(self.framework_ids)),
+            np.diff(np.append(self.framework_starts, len(self.requirement_ids)))
+        )
+
+    @property
+    def n_requirements(self) -> int:
+        return len(self.requirement_ids)
+
+    def control_matrix(self, responses_by_assessment: List[List[Any]]):
+        """
+        Pack responses into dense (assessment, control) score and answered matrices
+
+        Args:
+            responses_by_assessment: One list of AssessmentResponse objects per assessment
+
+        Returns:
+            Tuple of (scores, answered) arrays; unanswered controls score 0
+        """
+        scores = np.zeros((len(responses_by_assessment), len(self.control_ids)))
+        answered = np.zeros_like(scores)
+
+        for row, responses in enumerate(responses_by_assessment):
+            for response in responses:
+                column = self.control_position.get(response.control_id)
+                if column is None or response.calculated_score is None:
+                    continue
+                scores[row, column] = response.calculated_score
+                answered[row, column] = 1.0
+
+        return scores, answered
+
+    def requirement_coverage(self, scores: np.ndarray, answered: np.ndarray):
+        """
+        Project control matrices onto every requirement of every framework at once
+
+        Args:
+            scores: (assessments, controls) control scores
+            answered: (assessments, controls) 1 where a control has a score
+
+        Returns:
+            Tuple of (requirement scores, answered weight fraction), each of
+            shape (assessments, requirements)
+        """
+        if not self.n_requirements:
+            empty = np.zeros((scores.shape[0], 0))
+            return empty, empty
+
+        weighted_scores = np.add.reduceat(scores[:, self.cols] * self.weights, self.requirement_starts, axis=1)
+        answered_weights = np.add.reduceat(answered[:, self.cols] * self.weights, self.requirement_starts, axis=1)
+
+        return weighted_scores / self.requirement_weights, answered_weights / self.requirement_weights
+
+    def framework_scores(self, requirement_scores: np.ndarray) -> np.ndarray:
+        """Average requirement scores within each framework, shape (assessments, frameworks)"""
+        if not self.n_requirements:
+            return np.zeros((requirement_scores.shape[0], len(self.framework_ids)))
+
+        totals = np.add.reduceat(requirement_scores, self.framework_starts, axis=1)
+        counts = np.diff(np.append(self.framework_starts, self.n_requirements))
+        return totals / counts
+
+
+def _requirement_status(score: float) -> str:
+    """Classify a requirement coverage score"""
+    if score >= MET_THRESHOLD:
+        return 'met'
+    if score >= PARTIAL_THRESHOLD:
+        return 'partial'
+    return 'gap'
+
+
+@lru_cache(maxsize=None)
+def load_framework_mapping(catalog_version: Optional[str] = None) -> FrameworkMapping:
+    """
+    Load and compile the framework mappings for a catalog version, caching the result
+
+    Mappings live in src/catalogs/<framework>/mappings/<version>.json. A catalog
+    without a mapping file maps to no frameworks.
+
+    Args:
+        catalog_version: Catalog key such as 'iso42001:2023.1' (None for the default)
+
+    Returns:
+        Compiled FrameworkMapping
+    """
+    catalog = get_control_catalog(catalog_version)
+    path = os.path.join(CATALOG_DIR, catalog.framework, 'mappings', f"{catalog.version}.json")
+
+    if not os.path.exists(path):
+        return FrameworkMapping(catalog, {})
+
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise CatalogError(f"Framework mapping for {catalog.key} is not valid JSON: {e}")
+
+    errors = []
+    frameworks = data.get('frameworks', {})
+    for framework_id, framework in frameworks.items():
+        requirements = framework.get('requirements')
+        if not isinstance(requirements, dict) or not requirements:
+            errors.append(f"Framework {framework_id} must define requirements")
+            continue
+        for requirement_id, requirement in requirements.items():
+            controls = requirement.get('controls') if isinstance(requirement, dict) else None
+            if not isinstance(controls, dict) or not controls:
+                errors.append(f"{framework_id} {requirement_id} must map at least one control")
+                continue
+            for control_id, weight in controls.items():
+                if control_id not in catalog:
+                    errors.append(f"{framework_id} {requirement_id} maps unknown control {control_id}")
+                if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+                    errors.append(f"{framework_id} {requirement_id} weight for {control_id} must be positive")
+
+    if errors:
+        raise CatalogError(f"Framework mapping for {catalog.key} failed validation: " + '; '.join(errors))
+
+    return FrameworkMapping(catalog, frameworks)
+
+
+def calculate_framework_coverage(responses_by_assessment: List[List[Any]],
+                                 catalog_version: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Calculate coverage of every mapped framework for one or more assessments
+
+    Control scores are read once per response; all frameworks are then
+    derived from the same control matrix without rescoring.
+
+    Args:
+        responses_by_assessment: One list of AssessmentResponse objects per assessment,
+            all scored against the same catalog version
+        catalog_version: Catalog key the assessments were scored against
+
+    Returns:
+        One dictionary per assessment mapping framework ID to its coverage
+    """
+    mapping = load_framework_mapping(catalog_version)
+    scores, answered = mapping.control_matrix(responses_by_assessment)
+    requirement_scores, answered_fraction = mapping.requirement_coverage(scores, answered)
+    framework_scores = mapping.framework_scores(requirement_scores)
+
+    requirement_scores_l = np.round(requirement_scores, 2).tolist()
+    answered_l = np.round(answered_fraction * 100, 1).tolist()
+    framework_scores_l = np.round(framework_scores, 2).tolist()
+    framework_of = mapping.requirement_framework.tolist()
+
+    results = []
+    for row in range(len(responses_by_assessment)):
+        coverage = {
+            framework_id: {
+                'name': mapping.framework_names[index],
+                'score': framework_scores_l[row][index],
+                'requirements_met': 0,
+                'requirements_partial': 0,
+                'requirements_gap': 0,
+                'requirements': []
+            }
+            for index, framework_id in enumerate(mapping.framework_ids)
+        }
+
+        for requirement in range(mapping.n_requirements):
+            framework = coverage[mapping.framework_ids[framework_of[requirement]]]
+            score = requirement_scores_l[row][requirement]
+            status = _requirement_status(score)
+            framework[f'requirements_{status}'] += 1
+            framework['requirements'].append({
+                'requirement_id': mapping.requirement_ids[requirement],
+                'name': mapping.requirement_names[requirement],
+                'score': score,
+                'assessed_weight': answered_l[row][requirement],
+                'status': status,
+                'controls': mapping.requirement_controls[requirement]
+            })
+
+        results.append(coverage)
+
+    return results
@@ -0,0 +1,345 @@
+"""
+Evidence Malware Scanning
+Scans stored evidence blobs in a bounded background worker pool, with pluggable
+scanners (clamd INSTREAM or an EICAR-only stub), retries and quarantine; clean
+blobs then have their text extracted for search
+"""
+
+import socket
+import struct
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, Optional
+
+from flask import current_app
+
+from src.models.user import db
+from src.models.assessment import AssessmentFile, EvidenceBlob, EvidenceText
+from src.utils.search_index import index_blob
+from src.utils.storage import StorageBackend, StorageError, get_storage
+
+# Key prefix infected content is moved under
+QUARANTINE_PREFIX = 'quarantine'
+
+# Standard antivirus test string, detected by every scanner
+EICAR_SIGNATURE = rb'X5O!P%@AP[4\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*'
+
+ScanResult = namedtuple('ScanResult', ['status', 'signature'])
+
+
+class ScannerError(Exception):
+    """Raised when a scan could not be completed (the scan is retried)"""
+
+
+class ScannerNotConfigured(ScannerError):
+    """Raised when no malware scanner has been configured (the scan is not retried)"""
+
+
+class Scanner:
+    """Interface for malware scanners"""
+
+    name = 'base'
+
+    def scan(self, chunks: Iterable[bytes]) -> ScanResult:
+        """
+        Scan content supplied as a stream of chunks
+
+        Returns:
+            ScanResult with status 'clean' or 'infected' and the matched signature
+        """
+        raise NotImplementedError
+
+
+class StubScanner(Scanner):
+    """Scanner that only detects the EICAR test string, for development and tests"""
+
+    name = 'stub'
+
+    def scan(self, chunks: Iterable[bytes]) -> ScanResult:
+        # Keep the tail of the previous chunk so matches spanning chunks are found
+        overlap = len(EICAR_SIGNATURE) - 1
+        tail = b''
+        for chunk in chunks:
+            window = tail + chunk
+            if EICAR_SIGNATURE in window:
+                return ScanResult('infected', 'Eicar-Test-Signature')
+            tail = window[-overlap:]
+        return ScanResult('clean', None)
+
+
+class UnconfiguredScanner(Scanner):
+    """
+    Placeholder used when MALWARE_SCANNER is unset
+
+    Every scan ends in 'error', so nothing is served as scanned until a real
+    scanner (or the stub, deliberately) is configured.
+    """
+
+    name = 'unconfigured'
+
+    def scan(self, chunks: Iterable[bytes]) -> ScanResult:
+        raise ScannerNotConfigured("No malware scanner configured (set MALWARE_SCANNER)")
+
+
+class ClamdScanner(Scanner):
+    """Scanner backed by a clamd daemon, streaming content with the INSTREAM command"""
+
+    name = 'clamd'
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 3310, unix_socket: Optional[str] = None,
+                 timeout: float = 60.0):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.timeout = timeout
+
+    def _connect(self) -> socket.socket:
+        if self.unix_socket:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.unix_socket
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (self.host, self.port)
+        sock.settimeout(self.timeout)
+        sock.connect(address)
+        return sock
+
+    def scan(self, chunks: Iterable[bytes]) -> ScanResult:
+        try:
+            with self._connect() as sock:
+                sock.sendall(b'zINSTREAM\0')
+                for chunk in chunks:
+                    if chunk:
+                        sock.sendall(struct.pack('!L', len(chunk)) + chunk)
+                sock.sendall(struct.pack('!L', 0))
+
+                reply = b''
+                while not reply.endswith(b'\0'):
+                    data = sock.recv(4096)
+                    if not data:
+                        break
+                    reply += data
+        except OSError as e:
+            raise ScannerError(f"clamd unavailable: {e}")
+
+        # e.g. "stream: OK" or "stream: Win.Test.EICAR_HDB-1 FOUND"
+        reply = reply.rstrip(b'\0').decode('utf-8', 'replace').strip()
+        _, _, verdict = reply.partition(': ')
+        if verdict == 'OK':
+            return ScanResult('clean', None)
+        if verdict.endswith(' FOUND'):
+            return ScanResult('infected', verdict[:-len(' FOUND')])
+        raise ScannerError(f"Unexpected clamd reply: {reply}")
+
+
+def create_scanner(config) -> Scanner:
+    """
+    Create the scanner selected by MALWARE_SCANNER ('clamd' or 'stub')
+
+    There is no default: when unset, every scan records 'error' rather than
+    passing uploads that were never really scanned. 'stub' detects only the
+    EICAR test file and is meant for development and tests.
+    """
+    scanner = (config.get('MALWARE_SCANNER') or '').lower()
+
+    if not scanner:
+        return UnconfiguredScanner()
+    if scanner == 'stub':
+        return StubScanner()
+    if scanner == 'clamd':
+        return ClamdScanner(
+            host=config.get('CLAMD_HOST', '127.0.0.1'),
+            port=int(config.get('CLAMD_PORT', 3310)),
+            unix_socket=config.get('CLAMD_SOCKET'),
+            timeout=float(config.get('CLAMD_TIMEOUT', 60))
+        )
+
+    raise ValueError(f"Unknown malware scanner: {scanner}")
+
+
+def record_scan_result(blob: EvidenceBlob, status: str, signature: Optional[str] = None) -> None:
+    """
+    Record a blob's scan outcome on the blob and every file referencing it
+
+    The caller commits the session.
+    """
+    now = datetime.utcnow()
+    blob.scan_status = status
+    blob.scan_signature = signature
+    blob.scanned_at = now
+
+    AssessmentFile.query.filter_by(blob_sha256=blob.sha256).update({
+        'scan_status': status,
+        'is_processed': True,
+        'processed_at': now
+    }, synchronize_session=False)
+
+
+def quarantine_blob(storage: StorageBackend, blob: EvidenceBlob) -> None:
+    """Move a blob's content under the quarantine prefix so it is never served from its normal key"""
+    quarantine_key = f"{QUARANTINE_PREFIX}/{blob.sha256}"
+    if blob.storage_key == quarantine_key:
+        return
+
+    path = storage.local_path(blob.storage_key)
+    if path is not None:
+        storage.ingest_file(quarantine_key, path)
+    else:
+        storage.copy(blob.storage_key, quarantine_key)
+        storage.delete(blob.storage_key)
+    blob.storage_key = quarantine_key
+
+
+class ScanPool:
+    """
+    Bounded background pool scanning pending evidence blobs
+
+    At most `workers` scans run at once and at most `max_pending` blobs wait
+    for a worker; blobs turned away stay 'pending' and are picked up again by
+    requeue_pending(). Failed scans are retried with exponential backoff and
+    marked 'error' after `max_attempts`. Clean blobs are then text-indexed
+    by the same worker. With zero workers scans run inline, for environments
+    without background threads (e.g. Lambda).
+    """
+
+    def __init__(self, app, scanner: Scanner, workers: int = 2, max_pending: int = 100,
+                 max_attempts: int = 3, retry_delay: float = 5.0):
+        self.app = app
+        self.scanner = scanner
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan') if workers else None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, sha256: str) -> bool:
+        """
+        Queue a blob for scanning
+
+        Returns:
+            True if the blob was queued (or scanned inline), False if it is
+            already queued or the queue is full
+        """
+        with self._lock:
+            if sha256 in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            self._pending.add(sha256)
+
+        if self._executor is None:
+            self._run(sha256, 1)
+        else:
+            self._executor.submit(self._run, sha256, 1)
+        return True
+
+    def requeue_pending(self) -> int:
+        """Queue every blob still waiting for a scan or text extraction; returns the number queued"""
+        with self.app.app_context():
+            pending = [sha for (sha,) in db.session.query(EvidenceBlob.sha256)
+                       .filter(EvidenceBlob.scan_status.in_(['pending', 'error'])).all()]
+            unindexed = [sha for (sha,) in db.session.query(EvidenceBlob.sha256)
+                         .outerjoin(EvidenceText, EvidenceText.sha256 == EvidenceBlob.sha256)
+                         .filter(EvidenceBlob.scan_status == 'clean', EvidenceText.id.is_(None)).all()]
+        return sum(self.submit(sha256) for sha256 in pending + unindexed)
+
+    def stats(self):
+        """Get pool configuration and queue depth"""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'scanner': self.scanner.name,
+            'workers': self.workers,
+            'pending': pending,
+            'max_pending': self.max_pending
+        }
+
+    def _run(self, sha256: str, attempt: int) -> None:
+        with self.app.app_context():
+            try:
+                finished = self._scan(sha256, attempt)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Malware scan error for blob {sha256}: {str(e)}")
+                finished = True
+            finally:
+                db.session.remove()
+
+        if finished:
+            with self._lock:
+                self._pending.discard(sha256)
+        else:
+            # Retry later without holding a worker during the backoff
+            delay = self.retry_delay * (2 ** (attempt - 1))
+            timer = threading.Timer(delay, self._retry, (sha256, attempt + 1))
+            timer.daemon = True
+            timer.start()
+
+    def _retry(self, sha256: str, attempt: int) -> None:
+        if self._executor is None:
+            self._run(sha256, attempt)
+        else:
+            self._executor.submit(self._run, sha256, attempt)
+
+    def _scan(self, sha256: str, attempt: int) -> bool:
+        """Scan one blob; returns False if the scan should be retried"""
+        blob = EvidenceBlob.query.filter_by(sha256=sha256).first()
+        if blob is None or blob.scan_status == 'infected':
+            return True
+
+        storage = get_storage()
+        if blob.scan_status == 'clean':
+            self._index(storage, blob)
+            return True
+
+        blob.scan_attempts = (blob.scan_attempts or 0) + 1
+
+        try:
+            result = self.scanner.scan(storage.iter_chunks(blob.storage_key))
+        except (ScannerError, StorageError) as e:
+            current_app.logger.warning(f"Malware scan attempt {attempt} failed for blob {sha256}: {str(e)}")
+            if attempt >= self.max_attempts or isinstance(e, ScannerNotConfigured):
+                record_scan_result(blob, 'error', str(e)[:200])
+                db.session.commit()
+                return True
+            db.session.commit()
+            return False
+
+        if result.status == 'infected':
+            quarantine_blob(storage, blob)
+            current_app.logger.warning(f"Blob {sha256} quarantined: {result.signature}")
+
+        record_scan_result(blob, result.status, result.signature)
+        db.session.commit()
+
+        if result.status == 'clean':
+            self._index(storage, blob)
+        return True
+
+    def _index(self, storage: StorageBackend, blob: EvidenceBlob) -> None:
+        """Extract and index a clean blob's text; failures never affect the scan verdict"""
+        try:
+            index_blob(storage, blob)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Evidence text indexing error for blob {blob.sha256}: {str(e)}")
+
+
+def get_scan_pool() -> ScanPool:
+    """Get the current application's scan pool, creating it on first use"""
+    pool = current_app.extensions.get('scan_pool')
+    if pool is None:
+        config = current_app.config
+        pool = ScanPool(
+            current_app._get_current_object(),
+            create_scanner(config),
+            workers=int(config.get('SCAN_WORKERS', 2)),
+            max_pending=int(config.get('SCAN_QUEUE_SIZE', 100)),
+            max_attempts=int(config.get('SCAN_MAX_ATTEMPTS', 3)),
+            retry_delay=float(config.get('SCAN_RETRY_DELAY', 5))
+        )
+        current_app.extensions['scan_pool'] = pool
+    return pool
@@ -21,9 +21,12 @@ def generate_compliance_report(assessment, responses: List[Any], user, report_ty
         Dictionary containing the complete report
     """
     
+    from src.utils.scoring import get_control_catalog
+    
     # Get assessment scores
     scores = assessment.get_scores() or {}
     progress = assessment.get_progress()
+    catalog = get_control_catalog(assessment.catalog_version)
     
     # Base report structure
     report = {
@@ -33,6 +36,7 @@ def generate_compliance_report(assessment, responses: List[Any], user, report_ty
             'assessment_id': assessment.id,
             'organization': assessment.organization_name,
             'ai_system': assessment.ai_system_description,
+            'catalog_version': catalog.key,
             'assessment_period': {
                 'start_date': assessment.created_at.isoformat(),
                 'end_date': assessment.completed_at.isoformat() if assessment.completed_at else None,
@@ -41,17 +45,17 @@ def generate_compliance_report(assessment, responses: List[Any], user, report_ty
         },
         'executive_summary': generate_executive_summary(assessment, scores, responses),
         'compliance_overview': generate_compliance_overview(scores, progress),
-        'domain_analysis': generate_domain_analysis(responses, scores),
-        'recommendations': generate_recommendations(assessment, responses, scores),
+        'domain_analysis': generate_domain_analysis(responses, scores, catalog),
+        'recommendations': generate_recommendations(assessment, responses, scores, catalog),
         'appendices': {
             'methodology': get_methodology_description(),
-            'control_definitions': get_control_definitions_summary()
+            'control_definitions': get_control_definitions_summary(catalog)
         }
     }
     
     # Add detailed sections based on report type
     if report_type in ['detailed', 'technical']:
-        report['detailed_findings'] = generate_detailed_findings(responses)
+        report['detailed_findings'] = generate_detailed_findings(responses, catalog)
         report['evidence_summary'] = generate_evidence_summary(responses)
         
     if report_type == 'technical':
@@ -153,23 +157,28 @@ def generate_compliance_overview(scores: Dict[str, Any], progress: Dict[str, Any
         }
     }
 
-def generate_domain_analysis(responses: List[Any], scores: Dict[str, Any]) -> Dict[str, Any]:
+def generate_domain_analysis(responses: List[Any], scores: Dict[str, Any], catalog=None) -> Dict[str, Any]:
     """Generate detailed domain analysis"""
     
-    from src.utils.scoring import get_iso42001_controls, DOMAIN_WEIGHTS
+    from src.utils.scoring import get_control_catalog, DOMAIN_WEIGHTS
     
-    controls = get_iso42001_controls()
+    if catalog is None:
+        catalog = get_control_catalog()
     domain_details = scores.get('domain_details', {})
     
     domain_analysis = {}
     
+    # Group responses by domain in a single pass
+    responses_by_domain = {}
+    for response in responses:
+        responses_by_domain.setdefault(response.domain, []).append(response)
+    
     for domain, weight in DOMAIN_WEIGHTS.items():
-        domain_responses = [r for r in responses if r.domain == domain]
-        domain_controls = [c for c in controls.values() if c['domain'] == domain]
+        domain_responses = responses_by_domain.get(domain, [])
         
         # Calculate domain statistics
         completed_controls = len([r for r in domain_responses if r.maturity_level is not None])
-        total_controls = len(domain_controls)
+        total_controls = catalog.domain_control_count(domain)
         
         # Get domain score details
         domain_score_data = domain_details.get(domain, {})
@@ -178,7 +187,7 @@ def generate_domain_analysis(responses: List[Any], scores: Dict[str, Any]) -> Di
         control_scores = []
         for response in domain_responses:
             if response.calculated_score is not None:
-                control_info = controls.get(response.control_id, {})
+                control_info = catalog.get(response.control_id, {})
                 control_scores.append({
                     'control_id': response.control_id,
                     'control_name': control_info.get('name', 'Unknown'),
@@ -206,7 +215,7 @@ def generate_domain_analysis(responses: List[Any], scores: Dict[str, Any]) -> Di
     
     return domain_analysis
 
-def generate_recommendations(assessment, responses: List[Any], scores: Dict[str, Any]) -> Dict[str, Any]:
+def generate_recommendations(assessment, responses: List[Any], scores: Dict[str, Any], catalog=None) -> Dict[str, Any]:
     """Generate actionable recommendations"""
     
     recommendations = {
@@ -266,11 +275,12 @@ def generate_recommendations(assessment, responses: List[Any], scores: Dict[str,
     low_scoring_responses = [r for r in responses if r.calculated_score is not None and r.calculated_score < 60]
     low_scoring_responses.sort(key=lambda x: x.calculated_score)
     
-    from src.utils.scoring import get_iso42001_controls
-    controls = get_iso42001_controls()
+    if catalog is None:
+        from src.utils.scoring import get_control_catalog
+        catalog = get_control_catalog(assessment.catalog_version)
     
     for response in low_scoring_responses[:5]:  # Top 5 priority controls
-        control_info = controls.get(response.control_id, {})
+        control_info = catalog.get(response.control_id, {})
         recommendations['priority_controls'].append({
             'control_id': response.control_id,
             'control_name': control_info.get('name', 'Unknown'),
@@ -283,17 +293,18 @@ def generate_recommendations(assessment, responses: List[Any], scores: Dict[str,
     
     return recommendations
 
-def generate_detailed_findings(responses: List[Any]) -> Dict[str, Any]:
+def generate_detailed_findings(responses: List[Any], catalog=None) -> Dict[str, Any]:
     """Generate detailed findings for each control"""
     
-    from src.utils.scoring import get_iso42001_controls
-    controls = get_iso42001_controls()
+    if catalog is None:
+        from src.utils.scoring import get_control_catalog
+        catalog = get_control_catalog()
     
     findings = {}
     
     for response in responses:
         if response.maturity_level is not None:
-            control_info = controls.get(response.control_id, {})
+            control_info = catalog.get(response.control_id, {})
             
             # Determine finding status
             if response.calculated_score >= 80:
@@ -423,19 +434,20 @@ def get_methodology_description() -> Dict[str, Any]:
         }
     }
 
-def get_control_definitions_summary() -> Dict[str, Any]:
+def get_control_definitions_summary(catalog=None) -> Dict[str, Any]:
     """Get summary of control definitions"""
     
-    from src.utils.scoring import get_iso42001_controls
-    controls = get_iso42001_controls()
+    if catalog is None:
+        from src.utils.scoring import get_control_catalog
+        catalog = get_control_catalog()
     
     summary = {}
-    for control_id, control_info in controls.items():
+    for control_id, control_info in catalog.controls.items():
         summary[control_id] = {
             'name': control_info['name'],
             'domain': control_info['domain'],
             'stage': control_info['stage'],
-            'weight': control_info['weight'],
+            'weight': control_info.get('weight', 1),
             'description': control_info['description']
         }
     
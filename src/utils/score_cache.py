@@ -0,0 +1,125 @@
+"""
+Score Result Cache
+Bounded LRU cache of assessment scores keyed by a digest of everything the
+scores are derived from
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Any, Optional
+
+from src.utils.scoring import DOMAIN_WEIGHTS, MATURITY_SCORES
+
+# Maximum number of cached score results per process
+SCORE_CACHE_SIZE = int(os.getenv('SCORE_CACHE_SIZE', 1024))
+
+
+def score_cache_key(responses: List[Any], risk_level: str, catalog_version: str) -> str:
+    """
+    Build a content digest for an assessment's scoring inputs
+
+    The digest covers every response field the scoring algorithm reads (in
+    the order given, since that fixes the float summation order), the risk
+    level and the scoring configuration, so equal keys always mean equal scores.
+
+    Args:
+        responses: List of AssessmentResponse objects
+        risk_level: Assessment risk level
+        catalog_version: Key of the control catalog the assessment is scored against
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.blake2b(digest_size=20)
+
+    config = json.dumps([DOMAIN_WEIGHTS, MATURITY_SCORES, catalog_version, risk_level], sort_keys=True)
+    digest.update(config.encode('utf-8'))
+
+    for response in responses:
+        digest.update(repr((
+            response.control_id,
+            response.domain,
+            response.maturity_level,
+            response.evidence_completeness,
+            response.response_quality,
+            response.calculated_score
+        )).encode('utf-8'))
+
+    return digest.hexdigest()
+
+
+class ScoreCache:
+    """Thread-safe LRU mapping of score digests to scoring results"""
+
+    def __init__(self, max_entries: int = SCORE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (assessment_id, scores)
+        self._keys_by_assessment = {}  # assessment_id -> set of keys
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get cached scores for a digest, marking the entry as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, scores: Dict[str, Any], assessment_id: str) -> None:
+        """Store scores for a digest, evicting the least recently used entries"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (assessment_id, scores)
+            self._keys_by_assessment.setdefault(assessment_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                evicted_key, (evicted_assessment, _) = self._entries.popitem(last=False)
+                self._forget(evicted_assessment, evicted_key)
+
+    def invalidate(self, assessment_id: str) -> None:
+        """Drop every cached result for an assessment"""
+        with self._lock:
+            for key in self._keys_by_assessment.pop(assessment_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_assessment.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0
+            }
+
+    def _forget(self, assessment_id: str, key: str) -> None:
+        keys = self._keys_by_assessment.get(assessment_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_assessment[assessment_id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache used by the assessment routes
+score_cache = ScoreCache()
@@ -7,191 +7,7 @@ import json
 from typing import Dict, List, Any, Optional
 from collections import defaultdict
 
-# ISO 42001 Control Definitions with Assessment Stage Mapping
-ISO42001_CONTROLS = {
-    'A.2.2': {
-        'name': 'AI Policy',
-        'description': 'The organization shall document a policy for the development or use of AI systems.',
-        'stage': 'policy_review',
-        'domain': 'governance',
-        'weight': 3,
-        'questions': [
-            'Is there a documented AI policy for development or use?',
-            'Has management formally approved the policy?',
-            'Does the policy define AI development and usage guidelines?'
-        ],
-        'evidence_required': ['AI Policy Document', 'Management Approval Records', 'Policy Review Logs']
-    },
-    'A.2.3': {
-        'name': 'Alignment with other organizational policies',
-        'description': 'The organization shall determine where other policies can be affected by or apply to AI objectives.',
-        'stage': 'policy_review',
-        'domain': 'governance',
-        'weight': 2,
-        'questions': [
-            'Has the organization identified policies that may be impacted by AI objectives?',
-            'Is there a process to assess policy interdependencies related to AI?',
-            'Have affected policies been reviewed and updated to align with AI objectives?'
-        ],
-        'evidence_required': ['Policy Impact Assessment', 'Updated Policies', 'Review Records']
-    },
-    'A.2.4': {
-        'name': 'Review of the AI policy',
-        'description': 'The AI policy shall be reviewed at planned intervals to ensure continuing suitability.',
-        'stage': 'policy_review',
-        'domain': 'governance',
-        'weight': 2,
-        'questions': [
-            'Is the AI policy reviewed at planned intervals?',
-            'Are additional reviews conducted when significant changes occur?',
-            'Is there a documented process for policy review and updates?'
-        ],
-        'evidence_required': ['Review Schedule', 'Review Records', 'Process Documentation']
-    },
-    'A.3.2': {
-        'name': 'AI roles and responsibilities',
-        'description': 'Roles and responsibilities for AI shall be defined and allocated according to organizational needs.',
-        'stage': 'requirements_gathering',
-        'domain': 'governance',
-        'weight': 3,
-        'questions': [
-            'Have roles and responsibilities for AI been formally defined?',
-            'Are AI-related responsibilities aligned with organizational needs?',
-            'Has management approved and communicated AI roles and responsibilities?'
-        ],
-        'evidence_required': ['Role Documentation', 'Approval Records', 'Communication Logs']
-    },
-    'A.3.3': {
-        'name': 'Reporting of concerns',
-        'description': 'The organization shall define a process to report concerns about AI systems throughout their lifecycle.',
-        'stage': 'policy_review',
-        'domain': 'governance',
-        'weight': 2,
-        'questions': [
-            'Is there a documented process for reporting AI-related concerns?',
-            'Are reporting channels established and communicated?',
-            'Are concerns tracked, reviewed, and resolved with documented actions?'
-        ],
-        'evidence_required': ['Reporting Procedure', 'Channel Documentation', 'Concern Records']
-    },
-    'A.4.2': {
-        'name': 'Resource documentation',
-        'description': 'The organization shall identify and document relevant resources required for AI activities.',
-        'stage': 'requirements_gathering',
-        'domain': 'resources',
-        'weight': 2,
-        'questions': [
-            'Has the organization identified required resources for each AI lifecycle stage?',
-            'Are human, technical, and financial resources explicitly defined?',
-            'Has management formally approved the resource allocation for AI activities?'
-        ],
-        'evidence_required': ['Resource Requirements', 'Review Records', 'Approval Documentation']
-    },
-    'A.4.3': {
-        'name': 'Data Resources',
-        'description': 'The organization shall document information about data resources utilized for AI systems.',
-        'stage': 'requirements_gathering',
-        'domain': 'resources',
-        'weight': 2,
-        'questions': [
-            'Has the organization documented the data resources used for AI systems?',
-            'Does the documentation include data sources, types, and ownership?',
-            'Are data resource records periodically reviewed and updated?'
-        ],
-        'evidence_required': ['Data Resource Inventory', 'Source Documentation', 'Review Records']
-    },
-    'A.5.2': {
-        'name': 'AI system impact assessment process',
-        'description': 'The organization shall establish a process to assess potential consequences of AI systems.',
-        'stage': 'gap_assessment',
-        'domain': 'impact_assessment',
-        'weight': 5,
-        'questions': [
-            'Has the organization established a documented AI impact assessment process?',
-            'Does the assessment cover all lifecycle stages of the AI system?',
-            'Are ethical, legal, and social impacts considered in the assessment?'
-        ],
-        'evidence_required': ['Assessment Process', 'Assessment Records', 'Review Logs']
-    },
-    'A.5.4': {
-        'name': 'Assessing AI system impact on individuals',
-        'description': 'The organization shall assess and document potential impacts on individuals or groups.',
-        'stage': 'gap_assessment',
-        'domain': 'impact_assessment',
-        'weight': 4,
-        'questions': [
-            'Has the organization conducted impact assessments on individuals or groups?',
-            'Is the impact assessment documented and aligned with the AI system lifecycle?',
-            'Are ethical, legal, and societal risks considered in the assessment?'
-        ],
-        'evidence_required': ['Impact Assessment Reports', 'Review Records', 'Risk Assessments']
-    },
-    'A.5.5': {
-        'name': 'Assessing societal impacts of AI systems',
-        'description': 'The organization shall assess and document potential societal impacts of AI systems.',
-        'stage': 'gap_assessment',
-        'domain': 'impact_assessment',
-        'weight': 4,
-        'questions': [
-            'Has the organization conducted societal impact assessments?',
-            'Are mitigation measures defined for identified negative societal impacts?',
-            'Has management reviewed and approved the societal impact assessment?'
-        ],
-        'evidence_required': ['Societal Impact Reports', 'Mitigation Plans', 'Approval Records']
-    },
-    'A.6.1.2': {
-        'name': 'Objectives for responsible development of AI system',
-        'description': 'The organization shall identify objectives to guide responsible AI development.',
-        'stage': 'requirements_gathering',
-        'domain': 'development',
-        'weight': 3,
-        'questions': [
-            'Has the organization identified objectives for responsible AI development?',
-            'Are these objectives aligned with ethical, legal, and business requirements?',
-            'Have measures been integrated into the AI development lifecycle?'
-        ],
-        'evidence_required': ['Development Objectives', 'Lifecycle Process', 'Review Records']
-    },
-    'A.6.2.4': {
-        'name': 'AI system verification and validation',
-        'description': 'The organization shall define verification and validation measures for AI systems.',
-        'stage': 'implementation_status',
-        'domain': 'development',
-        'weight': 4,
-        'questions': [
-            'Has the organization defined V&V measures for AI systems?',
-            'Are specific criteria for applying V&V measures clearly outlined?',
-            'Has management approved and implemented the V&V framework?'
-        ],
-        'evidence_required': ['V&V Documentation', 'Criteria Definition', 'Approval Records']
-    },
-    'A.6.2.6': {
-        'name': 'AI system operation and monitoring',
-        'description': 'The organization shall define necessary elements for ongoing AI system operation.',
-        'stage': 'implementation_status',
-        'domain': 'operations',
-        'weight': 4,
-        'questions': [
-            'Has the organization defined essential elements for AI system operation?',
-            'Does the documentation specify system functionality and monitoring requirements?',
-            'Are operational procedures regularly reviewed and updated?'
-        ],
-        'evidence_required': ['Operational Documentation', 'Monitoring Logs', 'Review Records']
-    },
-    'A.10.3': {
-        'name': 'Suppliers',
-        'description': 'The organization shall ensure supplier services align with responsible AI principles.',
-        'stage': 'internal_audit',
-        'domain': 'stakeholders',
-        'weight': 3,
-        'questions': [
-            'Has the organization established a supplier AI compliance assessment process?',
-            'Are AI-related supplier agreements reviewed for ethical AI use?',
-            'Is there a mechanism to regularly monitor supplier compliance?'
-        ],
-        'evidence_required': ['Supplier Process', 'Assessment Records', 'Monitoring Reports']
-    }
-}
+from src.utils.catalog import ControlCatalog, load_catalog, parse_catalog_key
 
 # Domain weights for overall score calculation
 DOMAIN_WEIGHTS = {
@@ -214,9 +30,37 @@ MATURITY_SCORES = {
     5: 100   # Optimized and Continuously Improved
 }
 
+# Incremental updates applied to a score state before it is rebuilt from the
+# stored responses, bounding floating-point drift in the running sums
+SCORE_STATE_REBUILD_INTERVAL = 500
+
+# Slack allowed when range-checking float sums
+_STATE_TOLERANCE = 1e-6
+
+def get_control_catalog(catalog_version: Optional[str] = None) -> ControlCatalog:
+    """
+    Get a compiled control catalog
+
+    Catalogs are read from src/catalogs on first use and cached per version.
+
+    Args:
+        catalog_version: Catalog key such as 'iso42001:2023.1' (None for the default)
+
+    Returns:
+        Compiled ControlCatalog
+    """
+    framework, version = parse_catalog_key(catalog_version)
+    return load_catalog(framework, version, tuple(DOMAIN_WEIGHTS))
+
 def get_iso42001_controls() -> Dict[str, Dict[str, Any]]:
     """Get the complete ISO 42001 control definitions"""
-    return ISO42001_CONTROLS
+    return get_control_catalog().controls
+
+def __getattr__(name):
+    # Kept for callers importing the old module-level dict; loaded on first access
+    if name == 'ISO42001_CONTROLS':
+        return get_control_catalog().controls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def calculate_compliance_score(maturity_level: int, evidence_completeness: float, response_quality: float) -> float:
     """
@@ -245,13 +89,15 @@ def calculate_compliance_score(maturity_level: int, evidence_completeness: float
     
     return max(0.0, min(100.0, base_score))
 
-def calculate_domain_score(responses: List[Any], domain: str) -> Dict[str, Any]:
+def calculate_domain_score(responses: List[Any], domain: str,
+                           catalog: Optional[ControlCatalog] = None) -> Dict[str, Any]:
     """
     Calculate aggregated score for a specific domain
     
     Args:
         responses: List of AssessmentResponse objects
         domain: Domain name
+        catalog: Control catalog the responses were given against (default catalog if None)
     
     Returns:
         Dictionary with domain score and statistics
@@ -267,15 +113,16 @@ def calculate_domain_score(responses: List[Any], domain: str) -> Dict[str, Any]:
         }
     
     # Get domain controls
-    domain_controls = {k: v for k, v in ISO42001_CONTROLS.items() if v['domain'] == domain}
+    if catalog is None:
+        catalog = get_control_catalog()
+    domain_controls = catalog.controls_in_domain(domain)
     
     # Calculate weighted score
     total_weighted_score = 0.0
     total_weight = 0.0
     
     for response in domain_responses:
-        control_info = domain_controls.get(response.control_id, {})
-        weight = control_info.get('weight', 1)
+        weight = catalog.weight_for(response.control_id, domain)
         
         total_weighted_score += response.calculated_score * weight
         total_weight += weight
@@ -389,83 +236,304 @@ def calculate_maturity_distribution(responses: List[Any]) -> Dict[str, Any]:
         'total_responses': total_responses
     }
 
-def calculate_assessment_scores(responses: List[Any], risk_level: str = 'medium') -> Dict[str, Any]:
+def create_score_state() -> Dict[str, Any]:
     """
-    Calculate comprehensive compliance scores for an assessment
-    
+    Create an empty running-sum score state
+
+    The state holds everything calculate_assessment_scores derives from the
+    responses, so scores can be refreshed without reloading them.
+
+    Returns:
+        Dictionary with per-domain and assessment-level running sums
+    """
+    return {
+        'domains': {
+            domain: {
+                'weighted_score': 0.0,
+                'weight': 0.0,
+                'response_count': 0,
+                'maturity_sum': 0,
+                'maturity_count': 0
+            }
+            for domain in DOMAIN_WEIGHTS
+        },
+        'maturity_counts': {},
+        'total_responses': 0,
+        'completed_responses': 0,
+        'evidence_sum': 0.0,
+        'evidence_count': 0,
+        'control_scores': {},
+        'updates': 0
+    }
+
+def snapshot_response(response) -> Dict[str, Any]:
+    """
+    Capture the scoring-relevant fields of a response
+
+    Args:
+        response: AssessmentResponse object
+
+    Returns:
+        Dictionary with the fields that contribute to the score state
+    """
+    return {
+        'control_id': response.control_id,
+        'domain': response.domain,
+        'maturity_level': response.maturity_level,
+        'evidence_completeness': response.evidence_completeness,
+        'response_quality': response.response_quality,
+        'calculated_score': response.calculated_score
+    }
+
+def _accumulate_response(state: Dict[str, Any], snapshot: Dict[str, Any], sign: int,
+                         catalog: ControlCatalog) -> None:
+    """Add (sign=1) or remove (sign=-1) one response's contribution to a score state"""
+    maturity_level = snapshot['maturity_level']
+    evidence = snapshot['evidence_completeness']
+    score = snapshot['calculated_score']
+
+    state['total_responses'] += sign
+
+    domain_state = state['domains'].get(snapshot['domain'])
+    if domain_state is not None and score is not None:
+        weight = catalog.weight_for(snapshot['control_id'], snapshot['domain'])
+
+        domain_state['weighted_score'] += sign * score * weight
+        domain_state['weight'] += sign * weight
+        domain_state['response_count'] += sign
+        if maturity_level is not None:
+            domain_state['maturity_sum'] += sign * maturity_level
+            domain_state['maturity_count'] += sign
+
+    if maturity_level is not None:
+        level_key = str(int(maturity_level)) if maturity_level in MATURITY_SCORES else 'other'
+        state['maturity_counts'][level_key] = state['maturity_counts'].get(level_key, 0) + sign
+        state['completed_responses'] += sign
+
+    if evidence is not None:
+        state['evidence_sum'] += sign * evidence
+        state['evidence_count'] += sign
+
+    if sign < 0:
+        state['control_scores'].pop(snapshot['control_id'], None)
+    elif score is not None:
+        state['control_scores'][snapshot['control_id']] = {
+            'score': score,
+            'maturity_level': maturity_level,
+            'evidence_completeness': evidence,
+            'response_quality': snapshot['response_quality']
+        }
+
+def apply_response_change(state: Dict[str, Any], before: Optional[Dict[str, Any]],
+                          after: Optional[Dict[str, Any]],
+                          catalog: Optional[ControlCatalog] = None) -> Dict[str, Any]:
+    """
+    Update a score state in O(1) when a single response changes
+
+    Args:
+        state: Score state to update in place
+        before: Snapshot of the response before the change (None if new)
+        after: Snapshot of the response after the change (None if deleted)
+        catalog: Control catalog the assessment is scored against (default catalog if None)
+
+    Returns:
+        The updated score state
+    """
+    if catalog is None:
+        catalog = get_control_catalog()
+    if before is not None:
+        _accumulate_response(state, before, -1, catalog)
+    if after is not None:
+        _accumulate_response(state, after, 1, catalog)
+    state['updates'] = state.get('updates', 0) + 1
+    return state
+
+def score_state_needs_rebuild(state: Dict[str, Any]) -> bool:
+    """
+    Check whether a score state should be rebuilt from the stored responses
+
+    A state is rebuilt after SCORE_STATE_REBUILD_INTERVAL incremental updates,
+    or as soon as any running sum leaves the range its responses allow.
+
+    Args:
+        state: Score state from build_score_state or apply_response_change
+
+    Returns:
+        True if the state has drifted or is due for a rebuild
+    """
+    if state.get('updates', 0) >= SCORE_STATE_REBUILD_INTERVAL:
+        return True
+
+    tolerance = _STATE_TOLERANCE
+    if not 0 <= state['completed_responses'] <= state['total_responses']:
+        return True
+    if any(count < 0 for count in state['maturity_counts'].values()):
+        return True
+    if not -tolerance <= state['evidence_sum'] <= state['evidence_count'] + tolerance:
+        return True
+
+    for domain_state in state['domains'].values():
+        weight = domain_state['weight']
+        if domain_state['response_count'] < 0 or domain_state['maturity_count'] < 0:
+            return True
+        if weight < -tolerance or (domain_state['response_count'] == 0 and abs(weight) > tolerance):
+            return True
+        if not -tolerance <= domain_state['weighted_score'] <= 100 * weight + tolerance:
+            return True
+        if not 0 <= domain_state['maturity_sum'] <= 5 * domain_state['maturity_count']:
+            return True
+    return False
+
+def build_score_state(responses: List[Any], catalog: Optional[ControlCatalog] = None) -> Dict[str, Any]:
+    """
+    Build a score state from a full list of responses
+
     Args:
         responses: List of AssessmentResponse objects
+        catalog: Control catalog the assessment is scored against (default catalog if None)
+
+    Returns:
+        Score state holding the running sums for all responses
+    """
+    if catalog is None:
+        catalog = get_control_catalog()
+    state = create_score_state()
+    for response in responses:
+        _accumulate_response(state, snapshot_response(response), 1, catalog)
+    return state
+
+def calculate_scores_from_state(state: Dict[str, Any], risk_level: str = 'medium',
+                                catalog: Optional[ControlCatalog] = None) -> Dict[str, Any]:
+    """
+    Calculate comprehensive compliance scores from a score state
+
+    Args:
+        state: Score state from build_score_state or apply_response_change
         risk_level: Risk level for risk-based adjustments
-    
+        catalog: Control catalog the assessment is scored against (default catalog if None)
+
     Returns:
         Dictionary with comprehensive scoring results
     """
+    if catalog is None:
+        catalog = get_control_catalog()
+
     # Calculate domain scores
     domain_scores = {}
     for domain in DOMAIN_WEIGHTS.keys():
-        domain_scores[domain] = calculate_domain_score(responses, domain)
-    
+        domain_state = state['domains'][domain]
+        response_count = domain_state['response_count']
+
+        if response_count <= 0:
+            domain_scores[domain] = {
+                'score': 0.0,
+                'response_count': 0,
+                'average_maturity': 0.0,
+                'completion_rate': 0.0
+            }
+            continue
+
+        total_weight = domain_state['weight']
+        domain_score = domain_state['weighted_score'] / total_weight if total_weight > 0 else 0.0
+
+        maturity_count = domain_state['maturity_count']
+        average_maturity = domain_state['maturity_sum'] / maturity_count if maturity_count else 0.0
+
+        domain_control_count = catalog.domain_control_count(domain)
+        completion_rate = response_count / domain_control_count if domain_control_count else 0.0
+
+        domain_scores[domain] = {
+            'score': round(domain_score, 2),
+            'response_count': response_count,
+            'average_maturity': round(average_maturity, 2),
+            'completion_rate': round(completion_rate * 100, 1)
+        }
+
     # Calculate overall score using domain weights
     total_weighted_score = 0.0
     total_weight = 0.0
-    
+
     for domain, weight in DOMAIN_WEIGHTS.items():
         domain_data = domain_scores.get(domain, {'score': 0.0})
         if domain_data['score'] > 0:  # Only include domains with responses
             total_weighted_score += domain_data['score'] * weight
             total_weight += weight
-    
+
     overall_score = total_weighted_score / total_weight if total_weight > 0 else 0.0
-    
+
     # Apply risk adjustments
     risk_adjusted_score = apply_risk_adjustments(overall_score, risk_level)
-    
-    # Calculate control-level scores
-    control_scores = {}
-    for response in responses:
-        if response.calculated_score is not None:
-            control_scores[response.control_id] = {
-                'score': response.calculated_score,
-                'maturity_level': response.maturity_level,
-                'evidence_completeness': response.evidence_completeness,
-                'response_quality': response.response_quality
-            }
-    
+
     # Calculate assessment completeness and evidence quality
-    total_controls = len(ISO42001_CONTROLS)
-    completed_responses = len([r for r in responses if r.maturity_level is not None])
+    total_controls = catalog.total_controls
+    completed_responses = state['completed_responses']
     assessment_completeness = completed_responses / total_controls if total_controls > 0 else 0.0
-    
-    evidence_qualities = [r.evidence_completeness for r in responses if r.evidence_completeness is not None]
-    average_evidence_quality = sum(evidence_qualities) / len(evidence_qualities) if evidence_qualities else 0.5
-    
+
+    evidence_count = state['evidence_count']
+    average_evidence_quality = state['evidence_sum'] / evidence_count if evidence_count > 0 else 0.5
+
     # Calculate confidence interval
     confidence_interval = calculate_confidence_interval(
         risk_adjusted_score,
         assessment_completeness,
         average_evidence_quality
     )
-    
+
     # Calculate maturity distribution
-    maturity_distribution = calculate_maturity_distribution(responses)
-    
+    if completed_responses == 0:
+        maturity_distribution = {
+            'distribution': {str(i): 0 for i in range(6)},
+            'average_maturity': 0.0,
+            'total_responses': 0
+        }
+    else:
+        distribution = {}
+        weighted_sum = 0
+        for level in range(6):
+            count = state['maturity_counts'].get(str(level), 0)
+            distribution[str(level)] = round((count / completed_responses) * 100, 1)
+            weighted_sum += level * count
+
+        maturity_distribution = {
+            'distribution': distribution,
+            'average_maturity': round(weighted_sum / completed_responses, 2),
+            'total_responses': completed_responses
+        }
+
     return {
         'overall_score': round(risk_adjusted_score, 2),
         'base_score': round(overall_score, 2),
         'risk_adjustment': risk_level,
         'domain_scores': {domain: data['score'] for domain, data in domain_scores.items()},
         'domain_details': domain_scores,
-        'control_scores': control_scores,
+        'control_scores': dict(state['control_scores']),
         'maturity_distribution': maturity_distribution,
         'confidence_interval': confidence_interval,
         'assessment_completeness': round(assessment_completeness * 100, 1),
         'average_evidence_quality': round(average_evidence_quality, 3),
-        'total_responses': len(responses),
+        'total_responses': state['total_responses'],
         'completed_responses': completed_responses,
         'calculation_metadata': {
             'domain_weights': DOMAIN_WEIGHTS,
             'maturity_scores': MATURITY_SCORES,
-            'total_controls': total_controls
+            'total_controls': total_controls,
+            'catalog_version': catalog.key
         }
     }
 
+def calculate_assessment_scores(responses: List[Any], risk_level: str = 'medium',
+                                catalog: Optional[ControlCatalog] = None) -> Dict[str, Any]:
+    """
+    Calculate comprehensive compliance scores for an assessment
+    
+    Args:
+        responses: List of AssessmentResponse objects
+        risk_level: Risk level for risk-based adjustments
+        catalog: Control catalog the assessment is scored against (default catalog if None)
+    
+    Returns:
+        Dictionary with comprehensive scoring results
+    """
+    if catalog is None:
+        catalog = get_control_catalog()
+    return calculate_scores_from_state(build_score_state(responses, catalog), risk_level, catalog)
@@ -0,0 +1,334 @@
+"""
+Evidence Full-Text Search
+Indexes extracted evidence text in SQLite FTS5 (external content over
+evidence_texts), falling back to an inverted term table on other databases,
+and runs ranked, user-scoped searches with highlighted snippets
+"""
+
+import html
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+from src.models.assessment import Assessment, AssessmentFile, EvidenceBlob, EvidenceText, EvidenceTerm
+from src.utils.storage import StorageBackend
+from src.utils.text_extraction import extract_text, extractor_for, TextExtractionError
+
+FTS_TABLE = 'evidence_fts'
+
+# Terms are word characters; very short and very long tokens are not indexed
+_TERM = re.compile(r'\w+', re.UNICODE)
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 100
+
+# Characters of context around a fallback snippet's first hit
+SNIPPET_CONTEXT = 80
+
+# Highlight markers; snippets are HTML-escaped and then wrapped in <mark>
+_HIT_START = '\x02'
+_HIT_END = '\x03'
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def tokenize(value: str) -> List[str]:
+    """Split text into lowercase index terms"""
+    return [
+        term for term in _TERM.findall(value.lower())
+        if MIN_TERM_LENGTH <= len(term) <= MAX_TERM_LENGTH
+    ]
+
+
+def create_search_index() -> str:
+    """
+    Create the FTS5 table on SQLite builds that support it
+
+    Called at startup next to db.create_all(), in its own transaction. Text
+    extracted while the table did not exist is indexed when it is created.
+
+    Returns:
+        The index implementation now in use (see search_backend)
+    """
+    if db.engine.dialect.name == 'sqlite':
+        try:
+            with db.engine.begin() as connection:
+                exists = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': FTS_TABLE}
+                ).first()
+                if not exists:
+                    connection.execute(text(
+                        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                        "content, content='evidence_texts', content_rowid='id', "
+                        "tokenize='porter unicode61 remove_diacritics 2')"
+                    ))
+                    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        except OperationalError as e:
+            current_app.logger.warning(f"SQLite FTS5 unavailable, using term index: {str(e)}")
+
+    current_app.extensions.pop('search_index', None)
+    return search_backend()
+
+
+def search_backend() -> str:
+    """
+    Get the index implementation for the current database
+
+    Only reads the schema; the FTS5 table is created by create_search_index.
+
+    Returns:
+        'fts5' if the FTS5 table exists, otherwise 'terms'
+    """
+    backend = current_app.extensions.get('search_index')
+    if backend is not None:
+        return backend
+
+    backend = 'terms'
+    if db.engine.dialect.name == 'sqlite':
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        if exists:
+            backend = 'fts5'
+
+    current_app.extensions['search_index'] = backend
+    return backend
+
+
+def add_to_index(evidence_text: EvidenceText) -> None:
+    """Index a flushed EvidenceText row (the caller commits)"""
+    if not evidence_text.content:
+        return
+
+    if search_backend() == 'fts5':
+        db.session.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (:id, :content)"),
+            {'id': evidence_text.id, 'content': evidence_text.content}
+        )
+    else:
+        db.session.bulk_insert_mappings(EvidenceTerm, [
+            {'term': term, 'text_id': evidence_text.id, 'frequency': frequency}
+            for term, frequency in Counter(tokenize(evidence_text.content)).items()
+        ])
+
+
+def remove_from_index(evidence_text: EvidenceText) -> None:
+    """Drop an EvidenceText row from the index (the caller deletes the row and commits)"""
+    if not evidence_text.content:
+        return
+
+    if search_backend() == 'fts5':
+        # External-content tables need the indexed content to remove its terms
+        db.session.execute(
+            text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', :id, :content)"),
+            {'id': evidence_text.id, 'content': evidence_text.content}
+        )
+    else:
+        EvidenceTerm.query.filter_by(text_id=evidence_text.id).delete(synchronize_session=False)
+
+
+def remove_blob_text(sha256: str) -> None:
+    """Remove a blob's extracted text and its index entries (the caller commits)"""
+    evidence_text = EvidenceText.query.filter_by(sha256=sha256).first()
+    if evidence_text:
+        remove_from_index(evidence_text)
+        db.session.delete(evidence_text)
+
+
+def index_blob(storage: StorageBackend, blob: EvidenceBlob) -> Optional[EvidenceText]:
+    """
+    Extract and index the text of a clean blob, once per content digest
+
+    The extractor is chosen from the extension of the files referencing the
+    blob. Unsupported types and unreadable documents are recorded too, so
+    they are not retried on every requeue.
+
+    Returns:
+        The blob's EvidenceText (added to the session, not committed), or
+        None if the blob is not clean
+    """
+    if blob.scan_status != 'clean':
+        return None
+
+    evidence_text = EvidenceText.query.filter_by(sha256=blob.sha256).first()
+    if evidence_text:
+        return evidence_text
+
+    file_types = [file_type for (file_type,) in db.session.query(AssessmentFile.file_type)
+                  .filter_by(blob_sha256=blob.sha256).distinct()]
+    file_type = next((value for value in file_types if extractor_for(value)), None)
+
+    if file_type is None:
+        evidence_text = EvidenceText(blob.sha256, 'unsupported')
+    else:
+        try:
+            content, truncated = extract_text(storage, blob.storage_key, file_type)
+            evidence_text = EvidenceText(
+                blob.sha256, 'indexed' if content else 'empty',
+                extractor=extractor_for(file_type), content=content or None, truncated=truncated
+            )
+        except TextExtractionError as e:
+            evidence_text = EvidenceText(blob.sha256, 'failed', extractor=extractor_for(file_type), error=str(e)[:500])
+
+    db.session.add(evidence_text)
+    db.session.flush()
+    add_to_index(evidence_text)
+    return evidence_text
+
+
+def _fts_query(terms: List[str]) -> str:
+    """Quote each term so user input is never parsed as FTS5 query syntax"""
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def _highlight(snippet: str) -> str:
+    """HTML-escape a snippet and turn hit markers into <mark> tags"""
+    return html.escape(snippet).replace(_HIT_START, '<mark>').replace(_HIT_END, '</mark>')
+
+
+def _make_snippet(content: str, terms: List[str]) -> str:
+    """Cut a window of content around the first hit, marking every hit in it"""
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(term) for term in terms) + r')\w*', re.IGNORECASE)
+    match = pattern.search(content)
+    if not match:
+        return content[:2 * SNIPPET_CONTEXT]
+
+    start = max(0, match.start() - SNIPPET_CONTEXT)
+    end = min(len(content), match.end() + SNIPPET_CONTEXT)
+    window = pattern.sub(lambda hit: f'{_HIT_START}{hit.group(0)}{_HIT_END}', content[start:end])
+    return ('…' if start > 0 else '') + window + ('…' if end < len(content) else '')
+
+
+def _search_fts(terms, user_id, assessment_id, control_id, limit):
+    filters = ''
+    params = {'query': _fts_query(terms), 'user_id': user_id, 'limit': limit}
+    if assessment_id:
+        filters += ' AND f.assessment_id = :assessment_id'
+        params['assessment_id'] = assessment_id
+    if control_id:
+        filters += ' AND f.control_id = :control_id'
+        params['control_id'] = control_id
+
+    rows = db.session.execute(text(
+        f"SELECT f.id, f.original_filename, f.assessment_id, a.assessment_name, f.control_id, f.stage, "
+        f"snippet({FTS_TABLE}, 0, :hit_start, :hit_end, '…', 24) AS snippet, bm25({FTS_TABLE}) AS rank "
+        f"FROM {FTS_TABLE} "
+        f"JOIN evidence_texts t ON t.id = {FTS_TABLE}.rowid "
+        f"JOIN assessment_files f ON f.blob_sha256 = t.sha256 "
+        f"JOIN assessments a ON a.id = f.assessment_id "
+        f"WHERE {FTS_TABLE} MATCH :query AND a.user_id = :user_id AND f.scan_status = 'clean'{filters} "
+        f"ORDER BY rank LIMIT :limit"
+    ), dict(params, hit_start=_HIT_START, hit_end=_HIT_END)).all()
+
+    # bm25() is lower-is-better; report a higher-is-better score
+    return [
+        (row.id, row.original_filename, row.assessment_id, row.assessment_name, row.control_id,
+         row.stage, row.snippet, -row.rank)
+        for row in rows
+    ]
+
+
+def _search_terms(terms, user_id, assessment_id, control_id, limit):
+    query = db.session.query(
+        AssessmentFile.id, EvidenceTerm.text_id, EvidenceTerm.term, EvidenceTerm.frequency
+    ).join(EvidenceText, EvidenceText.id == EvidenceTerm.text_id) \
+     .join(AssessmentFile, AssessmentFile.blob_sha256 == EvidenceText.sha256) \
+     .join(Assessment, Assessment.id == AssessmentFile.assessment_id) \
+     .filter(EvidenceTerm.term.in_(terms), Assessment.user_id == user_id, AssessmentFile.scan_status == 'clean')
+    if assessment_id:
+        query = query.filter(AssessmentFile.assessment_id == assessment_id)
+    if control_id:
+        query = query.filter(AssessmentFile.control_id == control_id)
+
+    postings = defaultdict(dict)
+    text_of = {}
+    for file_id, text_id, term, frequency in query.all():
+        postings[file_id][term] = frequency
+        text_of[file_id] = text_id
+
+    # Every term must match; rank by tf-idf over the whole index
+    matches = [file_id for file_id, hits in postings.items() if len(hits) == len(terms)]
+    if not matches:
+        return []
+
+    total_texts = EvidenceText.query.filter_by(status='indexed').count()
+    document_frequency = dict(
+        db.session.query(EvidenceTerm.term, db.func.count(EvidenceTerm.text_id))
+        .filter(EvidenceTerm.term.in_(terms)).group_by(EvidenceTerm.term).all()
+    )
+    idf = {term: math.log(1 + total_texts / document_frequency.get(term, 1)) for term in terms}
+
+    scored = sorted(
+        ((sum((1 + math.log(frequency)) * idf[term] for term, frequency in postings[file_id].items()), file_id)
+         for file_id in matches),
+        reverse=True
+    )[:limit]
+
+    files = {
+        file.id: file for file in
+        AssessmentFile.query.filter(AssessmentFile.id.in_([file_id for _, file_id in scored])).all()
+    }
+    contents = dict(
+        db.session.query(EvidenceText.id, EvidenceText.content)
+        .filter(EvidenceText.id.in_({text_of[file_id] for _, file_id in scored})).all()
+    )
+
+    results = []
+    for score, file_id in scored:
+        file = files[file_id]
+        results.append((
+            file.id, file.original_filename, file.assessment_id, file.assessment.assessment_name,
+            file.control_id, file.stage, _make_snippet(contents[text_of[file_id]], terms), score
+        ))
+    return results
+
+
+def search_evidence(user_id: str, query: str, assessment_id: Optional[str] = None,
+                    control_id: Optional[str] = None, limit: int = DEFAULT_SEARCH_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Search the text of a user's evidence files
+
+    Every query term must appear in a file for it to match. Results are
+    ranked by relevance (BM25 on FTS5, tf-idf on the term index) and carry
+    an HTML-escaped snippet with hits wrapped in <mark>.
+
+    Args:
+        user_id: Only files of this user's assessments are searched
+        query: Free-text query
+        assessment_id: Restrict to one assessment
+        control_id: Restrict to one control
+        limit: Maximum number of hits
+
+    Returns:
+        List of hit dictionaries, best first
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    search = _search_fts if search_backend() == 'fts5' else _search_terms
+    rows = search(terms, user_id, assessment_id, control_id, limit)
+
+    return [
+        {
+            'file_id': file_id,
+            'original_filename': original_filename,
+            'assessment_id': hit_assessment_id,
+            'assessment_name': assessment_name,
+            'control_id': hit_control_id,
+            'stage': stage,
+            'snippet': _highlight(snippet or ''),
+            'score': round(score, 4)
+        }
+        for file_id, original_filename, hit_assessment_id, assessment_name, hit_control_id, stage, snippet, score
+        in rows
+    ]
@@ -0,0 +1,510 @@
+"""
+Object Storage Backends
+Stores evidence files, certificates and previews behind one interface so web
+nodes do not depend on a shared local disk. Objects are addressed by keys
+such as 'blobs/ab/cd/<sha256>', never by absolute paths.
+"""
+
+import io
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, NamedTuple, Optional
+from urllib.parse import quote
+
+from flask import Response, current_app, redirect, request, stream_with_context
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.utils import send_file
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # S3 backend unavailable; local storage still works
+    boto3 = None
+
+    class ClientError(Exception):
+        """Stand-in for botocore's ClientError when botocore is not installed"""
+
+        def __init__(self, error_response, operation_name):
+            super().__init__(f"{operation_name}: {error_response.get('Error', {}).get('Code')}")
+            self.response = error_response
+            self.operation_name = operation_name
+
+# Bytes read per iteration when streaming objects
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Default lifetime of presigned download URLs
+PRESIGN_EXPIRES_IN = 300  # seconds
+
+
+class StorageError(Exception):
+    """Raised when a storage operation fails"""
+
+
+class StorageObjectNotFound(StorageError):
+    """Raised when an object does not exist"""
+
+
+class StoredObject(NamedTuple):
+    """An object found by listing a backend"""
+    key: str
+    size: int
+    modified: datetime  # UTC
+
+
+class StorageBackend:
+    """
+    Interface implemented by every storage backend
+
+    Keys are '/'-separated relative names. Backends that keep objects on a
+    local filesystem expose their paths through local_path() so callers can
+    hand files to the web server directly.
+    """
+
+    name = 'base'
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        """Store an object from bytes"""
+        self.put_stream(key, io.BytesIO(data), content_type)
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
+        """Store an object from a readable binary stream"""
+        raise NotImplementedError
+
+    def ingest_file(self, key: str, path: str, content_type: Optional[str] = None) -> None:
+        """Store an object from a local file, consuming (moving or deleting) the file"""
+        with open(path, 'rb') as f:
+            self.put_stream(key, f, content_type)
+        os.remove(path)
+
+    def copy(self, source_key: str, key: str) -> None:
+        """Copy an object to another key, leaving the source in place"""
+        self.put_stream(key, _ChunkReader(self.iter_chunks(source_key)))
+
+    def get_bytes(self, key: str) -> bytes:
+        """Read a whole object into memory"""
+        return b''.join(self.iter_chunks(key))
+
+    def iter_chunks(self, key: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream an object, or the byte range [start, end), in chunks"""
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        """Get an object's size in bytes"""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        """Check if an object exists"""
+        try:
+            self.size(key)
+            return True
+        except StorageObjectNotFound:
+            return False
+
+    def delete(self, key: str) -> None:
+        """Delete an object; deleting a missing object is not an error"""
+        raise NotImplementedError
+
+    def iter_keys(self, prefix: str = '') -> Iterator[StoredObject]:
+        """
+        List the objects whose keys start with prefix, in ascending key order
+
+        Keys are compared as plain strings, so listings can be merge-joined
+        against other sorted key streams without holding either in memory.
+        """
+        raise NotImplementedError
+
+    def presign(self, key: str, expires_in: int = PRESIGN_EXPIRES_IN, filename: Optional[str] = None,
+                content_type: Optional[str] = None) -> Optional[str]:
+        """Get a time-limited URL serving the object directly, or None if unsupported"""
+        return None
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Get the object's path on this node's filesystem, or None if not stored locally"""
+        return None
+
+
+class _ChunkReader:
+    """Minimal read() adapter over a chunk iterator"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _check_key(key: str) -> str:
+    """Reject keys that could escape the storage root"""
+    parts = key.split('/')
+    if not key or key.startswith('/') or '\\' in key or any(part in ('', '.', '..') for part in parts):
+        raise StorageError(f"Invalid storage key: {key}")
+    return key
+
+
+class LocalStorage(StorageBackend):
+    """Objects stored as files under a root directory"""
+
+    name = 'local'
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *_check_key(key).split('/'))
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write beside the target and rename so readers never see partial
+        # objects; each write gets its own temp file, so concurrent writes of
+        # one key (from any thread or process) cannot clobber each other
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'xb') as f:
+                shutil.copyfileobj(stream, f, STREAM_CHUNK_SIZE)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def ingest_file(self, key: str, path: str, content_type: Optional[str] = None) -> None:
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:
+            # Source on another filesystem: copy, then consume the source
+            super().ingest_file(key, path, content_type)
+
+    def copy(self, source_key: str, key: str) -> None:
+        try:
+            with open(self._path(source_key), 'rb') as f:
+                self.put_stream(key, f)
+        except FileNotFoundError:
+            raise StorageObjectNotFound(source_key)
+
+    def iter_chunks(self, key: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            raise StorageObjectNotFound(key)
+
+        def generate():
+            with f:
+                f.seek(start)
+                remaining = None if end is None else end - start
+                while remaining is None or remaining > 0:
+                    chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    if remaining is not None:
+                        remaining -= len(chunk)
+                    yield chunk
+
+        return generate()
+
+    def size(self, key: str) -> int:
+        try:
+            return os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            raise StorageObjectNotFound(key)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_keys(self, prefix: str = '') -> Iterator[StoredObject]:
+        # List the deepest directory the prefix names, then filter on the rest
+        directory, _, _ = prefix.rpartition('/')
+        start = os.path.join(self.root, *_check_key(directory).split('/')) if directory else self.root
+        base = directory + '/' if directory else ''
+        return (item for item in self._walk(start, base) if item.key.startswith(prefix))
+
+    def _walk(self, path: str, base: str) -> Iterator[StoredObject]:
+        try:
+            entries = list(os.scandir(path))
+        except FileNotFoundError:
+            return
+
+        # A directory's keys all continue with '/', so sort it by name + '/'
+        # to walk in the same order as a sorted list of full keys
+        entries.sort(key=lambda entry: entry.name + '/' if entry.is_dir(follow_symlinks=False) else entry.name)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._walk(entry.path, base + entry.name + '/')
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                yield StoredObject(base + entry.name, stat.st_size, datetime.utcfromtimestamp(stat.st_mtime))
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+
+class S3Storage(StorageBackend):
+    """Objects stored in an S3-compatible bucket"""
+
+    name = 's3'
+
+    def __init__(self, bucket: str, prefix: str = '', client=None, region: Optional[str] = None):
+        if client is None:
+            if boto3 is None:
+                raise StorageError("boto3 is required for the S3 storage backend")
+            client = boto3.client('s3', region_name=region)
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.client = client
+
+    def _key(self, key: str) -> str:
+        return self.prefix + _check_key(key)
+
+    @staticmethod
+    def _is_missing(error: ClientError) -> bool:
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
+        extra_args = {'ContentType': content_type} if content_type else None
+        # upload_fileobj switches to multipart uploads for large streams
+        self.client.upload_fileobj(stream, self.bucket, self._key(key), ExtraArgs=extra_args)
+
+    def copy(self, source_key: str, key: str) -> None:
+        # Server-side copy; the managed transfer switches to multipart for large objects
+        try:
+            self.client.copy({'Bucket': self.bucket, 'Key': self._key(source_key)}, self.bucket, self._key(key))
+        except ClientError as e:
+            if self._is_missing(e):
+                raise StorageObjectNotFound(source_key)
+            raise StorageError(str(e))
+
+    def iter_chunks(self, key: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if start or end is not None:
+            if end is not None and end <= start:
+                return iter(())
+            params['Range'] = f"bytes={start}-{'' if end is None else end - 1}"
+
+        try:
+            body = self.client.get_object(**params)['Body']
+        except ClientError as e:
+            if self._is_missing(e):
+                raise StorageObjectNotFound(key)
+            raise StorageError(str(e))
+
+        def generate():
+            try:
+                while True:
+                    chunk = body.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                body.close()
+
+        return generate()
+
+    def size(self, key: str) -> int:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))['ContentLength']
+        except ClientError as e:
+            if self._is_missing(e):
+                raise StorageObjectNotFound(key)
+            raise StorageError(str(e))
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def iter_keys(self, prefix: str = '') -> Iterator[StoredObject]:
+        # ListObjectsV2 returns keys in ascending UTF-8 binary order, one page at a time
+        params = {'Bucket': self.bucket, 'Prefix': self.prefix + prefix}
+        while True:
+            page = self.client.list_objects_v2(**params)
+            for item in page.get('Contents', []):
+                modified = item['LastModified']
+                if modified.tzinfo is not None:
+                    modified = modified.astimezone(timezone.utc).replace(tzinfo=None)
+                yield StoredObject(item['Key'][len(self.prefix):], item['Size'], modified)
+            if not page.get('IsTruncated'):
+                return
+            params['ContinuationToken'] = page['NextContinuationToken']
+
+    def presign(self, key: str, expires_in: int = PRESIGN_EXPIRES_IN, filename: Optional[str] = None,
+                content_type: Optional[str] = None) -> Optional[str]:
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if filename:
+            params['ResponseContentDisposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+        if content_type:
+            params['ResponseContentType'] = content_type
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+
+
+def create_storage(config: Dict[str, Any]) -> StorageBackend:
+    """
+    Create the storage backend selected by application config
+
+    STORAGE_BACKEND is 'local' (default, rooted at STORAGE_ROOT or
+    UPLOAD_FOLDER) or 's3' (S3_BUCKET, optional S3_PREFIX and AWS_REGION).
+    """
+    backend = (config.get('STORAGE_BACKEND') or 'local').lower()
+
+    if backend == 'local':
+        return LocalStorage(config.get('STORAGE_ROOT') or config['UPLOAD_FOLDER'])
+
+    if backend == 's3':
+        if not config.get('S3_BUCKET'):
+            raise StorageError("S3_BUCKET must be set for the S3 storage backend")
+        return S3Storage(config['S3_BUCKET'], config.get('S3_PREFIX', ''), region=config.get('AWS_REGION'))
+
+    raise StorageError(f"Unknown storage backend: {backend}")
+
+
+def get_storage() -> StorageBackend:
+    """Get the current application's storage backend, creating it on first use"""
+    storage = current_app.extensions.get('storage')
+    if storage is None:
+        storage = create_storage(current_app.config)
+        current_app.extensions['storage'] = storage
+    return storage
+
+
+def _not_modified(etag: Optional[str]) -> bool:
+    """Check if the request's If-None-Match already holds the object's ETag"""
+    return bool(etag) and request.if_none_match.contains(etag)
+
+
+def _requested_range(length: int, etag: Optional[str]):
+    """
+    Get the single byte range requested for an object
+
+    Returns:
+        (start, stop) tuple, None to send the whole object, or False if the
+        range cannot be satisfied
+    """
+    if request.range is None or len(request.range.ranges) != 1:
+        return None
+
+    # If-Range: only honour the range when the client's copy is current
+    if_range = request.if_range
+    if if_range.etag is not None and (not etag or if_range.etag != etag):
+        return None
+    if if_range.date is not None:
+        return None
+
+    byte_range = request.range.range_for_length(length)
+    return byte_range if byte_range is not None else False
+
+
+def _offload_headers(response: Response, download_name: str, as_attachment: bool, etag: Optional[str]):
+    """Add the headers shared by every download response not built by send_file"""
+    response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline', filename=download_name)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def send_stored_object(key: str, download_name: str, mimetype: str, as_attachment: bool = True,
+                       etag: Optional[str] = None, storage: Optional[StorageBackend] = None):
+    """
+    Build a response serving a stored object, keeping the bytes out of Python where possible
+
+    DOWNLOAD_OFFLOAD selects how the bytes are delivered:
+        'none' (default): local objects go through send_file (the WSGI
+            server's file wrapper, i.e. sendfile(2) under gunicorn);
+            other backends are streamed in chunks
+        'x-accel': nginx serves local objects via X-Accel-Redirect to
+            X_ACCEL_PREFIX + key (an internal location aliased to the storage root)
+        'x-sendfile': Apache/lighttpd serve local objects via X-Sendfile
+        'redirect': backends that can presign (S3) answer with a redirect
+            to a short-lived URL
+
+    Range, If-Range and If-None-Match are honoured on every path.
+
+    Args:
+        key: Storage key of the object
+        download_name: File name offered to the client
+        mimetype: Content type of the response
+        as_attachment: Send as a download rather than inline
+        etag: Strong validator for the content, e.g. its SHA-256
+        storage: Backend holding the object (defaults to the app's backend)
+
+    Returns:
+        Flask response
+    """
+    storage = storage or get_storage()
+    mode = (current_app.config.get('DOWNLOAD_OFFLOAD') or 'none').lower()
+
+    if mode == 'redirect':
+        url = storage.presign(key, filename=download_name if as_attachment else None, content_type=mimetype)
+        if url:
+            return redirect(url, code=302)
+
+    path = storage.local_path(key)
+    if path is not None:
+        if mode == 'x-accel':
+            if _not_modified(etag):
+                return _offload_headers(Response(status=304), download_name, as_attachment, etag)
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = (
+                current_app.config.get('X_ACCEL_PREFIX', '/protected/').rstrip('/') + '/' + quote(key)
+            )
+            return _offload_headers(response, download_name, as_attachment, etag)
+
+        try:
+            return send_file(
+                path,
+                request.environ,
+                mimetype=mimetype,
+                as_attachment=as_attachment,
+                download_name=download_name,
+                conditional=True,
+                etag=etag or True,
+                use_x_sendfile=mode == 'x-sendfile' or current_app.config.get('USE_X_SENDFILE', False),
+                response_class=current_app.response_class
+            )
+        except RequestedRangeNotSatisfiable as e:
+            return e.get_response()
+
+    if _not_modified(etag):
+        return _offload_headers(Response(status=304), download_name, as_attachment, etag)
+
+    length = storage.size(key)
+    byte_range = _requested_range(length, etag)
+
+    if byte_range is False:
+        response = Response(status=416)
+        response.headers['Content-Range'] = f"bytes */{length}"
+        return _offload_headers(response, download_name, as_attachment, etag)
+
+    start, stop = byte_range or (0, length)
+    response = Response(
+        stream_with_context(storage.iter_chunks(key, start, stop)),
+        status=206 if byte_range else 200,
+        mimetype=mimetype,
+        direct_passthrough=True
+    )
+    response.content_length = stop - start
+    if byte_range:
+        response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{length}"
+    return _offload_headers(response, download_name, as_attachment, etag)
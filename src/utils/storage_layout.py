@@ -0,0 +1,291 @@
+"""
+Evidence Storage Layout Migration
+Moves files stored before content addressing (flat UPLOAD_FOLDER/<assessment_id>/
+directories) into the hash-fanout blob layout, and re-shards blobs when the
+fanout depth changes, in resumable background batches
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from flask import current_app
+
+from src.models.user import db
+from src.models.assessment import AssessmentFile, EvidenceBlob, StorageMigration
+from src.utils.evidence_store import add_blob_reference, blob_key, fanout_depth, BLOB_PREFIX
+from src.utils.malware_scan import get_scan_pool
+from src.utils.storage import StorageBackend, get_storage
+from src.utils.uploads import hash_file
+
+# Row ID of the evidence layout migration's progress
+LAYOUT_MIGRATION_ID = 'evidence_layout'
+
+DEFAULT_BATCH_SIZE = 100
+
+# Seconds to wait between batches so the migration does not starve requests
+DEFAULT_BATCH_PAUSE = 0.5
+
+
+def get_migration_state(lock: bool = False) -> StorageMigration:
+    """Get the layout migration's progress row, creating it on first use"""
+    query = StorageMigration.query.filter_by(id=LAYOUT_MIGRATION_ID)
+    if lock:
+        query = query.with_for_update()
+    state = query.first()
+    if state is None:
+        state = StorageMigration(LAYOUT_MIGRATION_ID, fanout_depth())
+        db.session.add(state)
+        db.session.flush()
+    return state
+
+
+def migrate_legacy_file(storage: StorageBackend, file_record: AssessmentFile) -> Optional[str]:
+    """
+    Move one pre-content-addressing file into the blob layout
+
+    The file is copied, not moved, so downloads of the old path keep working
+    until the new key is committed. The old copy's verdict carries over to
+    content stored for the first time.
+
+    Returns:
+        Path of the old copy, to delete after commit (None if there was none)
+    """
+    path = file_record.file_path
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Legacy file missing: {path}")
+
+    upload = hash_file(path)
+    blob = add_blob_reference(storage, path, upload, file_record.mime_type, keep_source=True)
+
+    if blob.ref_count == 1 and blob.scan_status == 'pending' and file_record.scan_status != 'pending':
+        blob.scan_status = file_record.scan_status
+        blob.scanned_at = file_record.processed_at
+    elif blob.scan_status in ('clean', 'infected'):
+        file_record.scan_status = blob.scan_status
+
+    file_record.blob_sha256 = blob.sha256
+    file_record.stored_filename = blob.sha256
+    file_record.file_path = blob.storage_key
+    return path
+
+
+def reshard_blob(storage: StorageBackend, blob: EvidenceBlob, depth: int) -> Optional[str]:
+    """
+    Copy a blob to its key at the given fanout depth and repoint its files
+
+    Quarantined blobs are left where they are.
+
+    Returns:
+        The old key, to delete after commit (None if the blob was not moved)
+    """
+    target = blob_key(blob.sha256, depth)
+    if blob.storage_key == target or not blob.storage_key.startswith(BLOB_PREFIX + '/'):
+        return None
+
+    old_key = blob.storage_key
+    storage.copy(old_key, target)
+    blob.storage_key = target
+    AssessmentFile.query.filter_by(blob_sha256=blob.sha256).update(
+        {'file_path': target}, synchronize_session=False
+    )
+    return old_key
+
+
+def _delete_old_copies(storage: StorageBackend, paths: List[str], keys: List[str]) -> None:
+    """Delete superseded copies once their replacements are committed"""
+    for path in paths:
+        try:
+            os.remove(path)
+            # Drop the per-assessment directory once it is empty
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+
+    for key in keys:
+        try:
+            storage.delete(key)
+        except Exception as e:
+            current_app.logger.warning(f"Could not delete migrated object {key}: {str(e)}")
+
+
+def run_migration_batch(batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Migrate the next batch of files or blobs and commit progress
+
+    Legacy files are migrated first (ordered by ID), then every blob is
+    checked against the configured fanout depth (ordered by digest). The
+    cursor is committed with each batch, so an interrupted migration resumes
+    where it stopped. Failures are counted and skipped.
+
+    Returns:
+        Migration progress after the batch
+    """
+    storage = get_storage()
+    state = get_migration_state(lock=True)
+    if state.phase == 'done':
+        return state.to_dict()
+
+    if state.started_at is None:
+        state.started_at = datetime.utcnow()
+    state.status = 'running'
+
+    old_paths = []
+    old_keys = []
+    to_scan = []
+
+    if state.phase == 'files':
+        records = AssessmentFile.query.filter(
+            AssessmentFile.blob_sha256.is_(None), AssessmentFile.id > state.cursor
+        ).order_by(AssessmentFile.id).limit(batch_size).all()
+
+        for file_record in records:
+            state.cursor = file_record.id
+            if not os.path.isabs(file_record.file_path):
+                state.skipped += 1
+                continue
+            try:
+                with db.session.begin_nested():
+                    old_paths.append(migrate_legacy_file(storage, file_record))
+                state.migrated += 1
+                if file_record.blob.scan_status == 'pending':
+                    to_scan.append(file_record.blob_sha256)
+            except Exception as e:
+                state.failed += 1
+                state.last_error = f"File {file_record.id}: {str(e)}"[:500]
+
+        if len(records) < batch_size:
+            state.phase = 'blobs'
+            state.cursor = ''
+
+    else:
+        depth = state.fanout_depth
+        blobs = EvidenceBlob.query.filter(
+            EvidenceBlob.sha256 > state.cursor
+        ).order_by(EvidenceBlob.sha256).limit(batch_size).all()
+
+        for sha256 in [blob.sha256 for blob in blobs]:
+            state.cursor = sha256
+            try:
+                with db.session.begin_nested():
+                    # Lock the blob so concurrent uploads of the same content wait for the move
+                    blob = EvidenceBlob.query.filter_by(sha256=sha256).with_for_update().first()
+                    old_key = reshard_blob(storage, blob, depth) if blob else None
+                if old_key:
+                    old_keys.append(old_key)
+                    state.migrated += 1
+                else:
+                    state.skipped += 1
+            except Exception as e:
+                state.failed += 1
+                state.last_error = f"Blob {sha256}: {str(e)}"[:500]
+
+        if len(blobs) < batch_size:
+            state.phase = 'done'
+            state.status = 'completed'
+            state.completed_at = datetime.utcnow()
+
+    state.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    _delete_old_copies(storage, old_paths, old_keys)
+    for sha256 in to_scan:
+        get_scan_pool().submit(sha256)
+
+    return state.to_dict()
+
+
+class LayoutMigrator:
+    """
+    Runs the layout migration batch by batch on a background thread
+
+    Only one migration thread runs per process; its progress lives in the
+    database, so a restarted process (or another node) can resume it.
+    """
+
+    def __init__(self, app, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = DEFAULT_BATCH_PAUSE):
+        self.app = app
+        self.batch_size = batch_size
+        self.pause = pause
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, batch_size: Optional[int] = None) -> bool:
+        """
+        Start migrating in the background
+
+        Returns:
+            False if a migration thread is already running
+        """
+        with self._lock:
+            if self.running:
+                return False
+            if batch_size:
+                self.batch_size = batch_size
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='layout-migration', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        """Ask the background thread to stop after its current batch"""
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    progress = run_migration_batch(self.batch_size)
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f"Storage layout migration error: {str(e)}")
+                    self._mark_failed(str(e))
+                    return
+                finally:
+                    db.session.remove()
+
+            if progress['phase'] == 'done':
+                return
+            self._stop.wait(self.pause)
+
+        with self.app.app_context():
+            try:
+                state = get_migration_state()
+                if state.status == 'running':
+                    state.status = 'idle'
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def _mark_failed(self, error: str) -> None:
+        with self.app.app_context():
+            try:
+                state = get_migration_state()
+                state.status = 'failed'
+                state.last_error = error[:500]
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+
+def reset_migration() -> StorageMigration:
+    """Restart the migration from the beginning for the configured fanout depth (the caller commits)"""
+    state = get_migration_state(lock=True)
+    state.reset()
+    state.fanout_depth = fanout_depth()
+    return state
+
+
+def get_layout_migrator() -> LayoutMigrator:
+    """Get the current application's layout migrator, creating it on first use"""
+    migrator = current_app.extensions.get('layout_migrator')
+    if migrator is None:
+        migrator = LayoutMigrator(current_app._get_current_object())
+        current_app.extensions['layout_migrator'] = migrator
+    return migrator
@@ -0,0 +1,242 @@
+"""
+Storage Quota Accounting
+Keeps running evidence storage totals per user, per organization and overall,
+updated incrementally on upload and delete, and enforces configurable quotas.
+A file counts towards the organization of the assessment it belongs to, the
+same organization the portfolio groups assessments by.
+"""
+
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import User, db
+from src.models.assessment import Assessment, AssessmentFile, StorageUsage
+
+USAGE_SCOPES = ('user', 'organization', 'global')
+
+GLOBAL_SCOPE_ID = 'all'
+
+# Config key holding each scope's byte quota (0 or unset means unlimited)
+QUOTA_CONFIG_KEYS = {
+    'user': 'USER_STORAGE_QUOTA',
+    'organization': 'ORGANIZATION_STORAGE_QUOTA'
+}
+
+
+class StorageQuotaExceeded(Exception):
+    """Raised when storing more evidence would take a user or organization over quota"""
+
+    def __init__(self, scope: str, limit: int, used: int, requested: int):
+        super().__init__(
+            f"Storing {requested} more bytes would exceed the {scope} storage quota "
+            f"({used} of {limit} bytes used)"
+        )
+        self.scope = scope
+        self.limit = limit
+        self.used = used
+        self.requested = requested
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'scope': self.scope,
+            'limit': self.limit,
+            'used': self.used,
+            'requested': self.requested
+        }
+
+
+def organization_key(organization_name: Optional[str]) -> str:
+    """Normalize an organization name so case and padding variants share one counter"""
+    return (organization_name or '').strip().lower()
+
+
+def usage_keys(user_id: str, organization_name: Optional[str]) -> List[Tuple[str, str]]:
+    """Get the (scope, scope_id) counters a user's file in an organization's assessment counts towards"""
+    return [
+        ('user', user_id),
+        ('organization', organization_key(organization_name)),
+        ('global', GLOBAL_SCOPE_ID)
+    ]
+
+
+def _assessment_organization():
+    """Organization key of a file's assessment, as a correlated subquery"""
+    return select(func.lower(func.trim(Assessment.organization_name))) \
+        .where(Assessment.id == AssessmentFile.assessment_id).scalar_subquery()
+
+
+def _measure(scope: str, scope_id: str) -> Tuple[int, int]:
+    """Count files and bytes for a scope directly from the file table"""
+    query = db.session.query(
+        func.count(AssessmentFile.id), func.coalesce(func.sum(AssessmentFile.file_size), 0)
+    )
+    if scope == 'user':
+        query = query.filter(AssessmentFile.user_id == scope_id)
+    elif scope == 'organization':
+        # Files recorded before the charged organization was stored count
+        # towards their assessment's organization
+        query = query.filter(
+            func.coalesce(AssessmentFile.organization_key, _assessment_organization()) == scope_id
+        )
+    file_count, total_bytes = query.one()
+    return int(file_count), int(total_bytes)
+
+
+def get_usage(scope: str, scope_id: str) -> StorageUsage:
+    """
+    Get a usage counter, seeding it from the file table the first time
+
+    Seeding never sees files pending in the session, so callers record a
+    change before adding the affected row.
+    """
+    usage = StorageUsage.query.get((scope, scope_id))
+    if usage is not None:
+        return usage
+
+    with db.session.no_autoflush:
+        file_count, total_bytes = _measure(scope, scope_id)
+
+    try:
+        with db.session.begin_nested():
+            usage = StorageUsage(scope, scope_id, file_count, total_bytes)
+            db.session.add(usage)
+    except IntegrityError:
+        # Another request seeded it first
+        usage = StorageUsage.query.get((scope, scope_id))
+    return usage
+
+
+def storage_quota(scope: str) -> int:
+    """Get a scope's configured quota in bytes (0 for unlimited)"""
+    key = QUOTA_CONFIG_KEYS.get(scope)
+    return int(current_app.config.get(key) or 0) if key else 0
+
+
+def check_storage_quota(user_id: str, organization_name: Optional[str], size: int) -> None:
+    """
+    Reject an upload up front if it cannot fit in the user's or organization's quota
+
+    Used before reading a request body; charge_storage re-checks atomically
+    when the file is recorded.
+    """
+    for scope, scope_id in usage_keys(user_id, organization_name):
+        limit = storage_quota(scope)
+        if not limit:
+            continue
+        usage = get_usage(scope, scope_id)
+        if usage.total_bytes + size > limit:
+            raise StorageQuotaExceeded(scope, limit, usage.total_bytes, size)
+
+
+def charge_storage(user_id: str, organization_name: Optional[str], size: int, files: int = 1) -> None:
+    """
+    Add (or with negative values, remove) files and bytes on a user's and organization's counters
+
+    Deleted files are taken off their counters by _refund_deleted_file, so
+    callers only charge new files.
+
+    Increments are applied in SQL, so concurrent uploads cannot lose
+    updates. When adding, the new totals are read back inside the same
+    transaction and StorageQuotaExceeded is raised if a quota is exceeded;
+    the caller then rolls back. The caller commits otherwise.
+    """
+    now = datetime.utcnow()
+    usages = [(scope, get_usage(scope, scope_id)) for scope, scope_id in usage_keys(user_id, organization_name)]
+
+    for _, usage in usages:
+        usage.file_count = StorageUsage.file_count + files
+        usage.total_bytes = StorageUsage.total_bytes + size
+        usage.updated_at = now
+    db.session.flush()
+
+    if size <= 0:
+        return
+
+    for scope, usage in usages:
+        limit = storage_quota(scope)
+        if limit and usage.total_bytes > limit:
+            raise StorageQuotaExceeded(scope, limit, usage.total_bytes - size, size)
+
+
+@event.listens_for(AssessmentFile, 'after_delete')
+def _refund_deleted_file(mapper, connection, target: AssessmentFile) -> None:
+    """
+    Take a deleted file off the counters it was charged to
+
+    Runs for every ORM delete of a file, including those cascaded from a
+    deleted assessment or user, inside the deleting flush. Counters not
+    seeded yet are skipped; seeding measures the file table afterwards.
+    """
+    organization = target.organization_key
+    if organization is None:
+        # Files are deleted before a cascading parent, so the assessment is still there
+        organization = connection.execute(
+            select(Assessment.organization_name).where(Assessment.id == target.assessment_id)
+        ).scalar()
+
+    usage = StorageUsage.__table__
+    now = datetime.utcnow()
+    for scope, scope_id in usage_keys(target.user_id, organization):
+        connection.execute(
+            usage.update()
+            .where(usage.c.scope == scope, usage.c.scope_id == scope_id)
+            .values(
+                file_count=usage.c.file_count - 1,
+                total_bytes=usage.c.total_bytes - target.file_size,
+                updated_at=now
+            )
+        )
+
+
+def usage_summary(user: User) -> Dict[str, Any]:
+    """
+    Get a user's and their organization's usage alongside the configured quotas
+
+    The organization counter covers every assessment under the user's
+    organization name, whoever uploaded the files.
+    """
+    summary = {}
+    for scope, scope_id in usage_keys(user.id, user.organization_name)[:2]:
+        usage = get_usage(scope, scope_id)
+        limit = storage_quota(scope)
+        summary[scope] = {
+            'file_count': usage.file_count,
+            'total_bytes': usage.total_bytes,
+            'quota_bytes': limit or None,
+            'used_percent': round(usage.total_bytes / limit * 100, 1) if limit else None
+        }
+    return summary
+
+
+def rebuild_storage_usage() -> int:
+    """
+    Recompute every counter from the file table, replacing drifted values
+
+    Returns:
+        Number of counters written (the caller commits)
+    """
+    StorageUsage.query.delete(synchronize_session=False)
+
+    rows = []
+    user_totals = db.session.query(
+        AssessmentFile.user_id, func.count(AssessmentFile.id), func.sum(AssessmentFile.file_size)
+    ).group_by(AssessmentFile.user_id).all()
+    rows.extend(StorageUsage('user', user_id, count, int(size or 0)) for user_id, count, size in user_totals)
+
+    # Pin files recorded before the charged organization was stored
+    AssessmentFile.query.filter(AssessmentFile.organization_key.is_(None)).update(
+        {AssessmentFile.organization_key: _assessment_organization()}, synchronize_session=False
+    )
+    organization_totals = db.session.query(
+        AssessmentFile.organization_key, func.count(AssessmentFile.id), func.sum(AssessmentFile.file_size)
+    ).group_by(AssessmentFile.organization_key).all()
+    rows.extend(StorageUsage('organization', key, count, int(size or 0)) for key, count, size in organization_totals)
+
+    rows.append(StorageUsage('global', GLOBAL_SCOPE_ID, *_measure('global', GLOBAL_SCOPE_ID)))
+
+    db.session.add_all(rows)
+    return len(rows)
@@ -0,0 +1,186 @@
+"""
+Evidence Text Extraction
+Pulls plain text out of stored evidence (TXT, CSV, DOCX and, when pypdf is
+installed, PDF) for the full-text search index
+"""
+
+import codecs
+import re
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, Tuple
+from xml.etree import ElementTree
+
+from src.utils.storage import StorageBackend
+
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+except ImportError:  # PDF text is not extracted; other formats still are
+    PdfReader = None
+
+    class PdfReadError(Exception):
+        pass
+
+# Extracted text is cut off after this many characters
+MAX_EXTRACTED_CHARS = 2 * 1024 * 1024
+
+# Largest DOCX document part that will be parsed (uncompressed)
+MAX_DOCX_XML_SIZE = 50 * 1024 * 1024  # 50MB
+
+# PDFs with more pages than this only have their leading pages extracted
+MAX_PDF_PAGES = 500
+
+TEXT_EXTENSIONS = frozenset({'.txt', '.csv'})
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_WHITESPACE_RUN = re.compile(r'[ \t\r\f\v]+')
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+
+
+class TextExtractionError(Exception):
+    """Raised when content cannot be parsed as its declared type"""
+
+
+def extractor_for(file_type: str) -> Optional[str]:
+    """
+    Get the extractor used for a file extension
+
+    Returns:
+        'text', 'docx' or 'pdf', or None if the type has no extractable text
+    """
+    file_type = (file_type or '').lower()
+    if file_type in TEXT_EXTENSIONS:
+        return 'text'
+    if file_type == '.docx':
+        return 'docx'
+    if file_type == '.pdf' and PdfReader is not None:
+        return 'pdf'
+    return None
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of spaces and blank lines"""
+    text = _WHITESPACE_RUN.sub(' ', text)
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+def _decode_chunks(chunks: Iterable[bytes], max_chars: int) -> Tuple[str, bool]:
+    """Decode text chunks incrementally, honouring a UTF-8/UTF-16 BOM, up to max_chars"""
+    decoder = None
+    parts = []
+    length = 0
+
+    for chunk in chunks:
+        if decoder is None:
+            encoding = 'utf-16' if chunk[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE) else 'utf-8-sig'
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+        text = decoder.decode(chunk)
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            return ''.join(parts)[:max_chars], True
+
+    if decoder is not None:
+        parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts), False
+
+
+def _docx_text(source, max_chars: int) -> Tuple[str, bool]:
+    """Read the paragraphs of a DOCX main document part"""
+    try:
+        with zipfile.ZipFile(source) as archive:
+            info = archive.getinfo('word/document.xml')
+            if info.file_size > MAX_DOCX_XML_SIZE:
+                raise TextExtractionError('DOCX document part is too large to index')
+
+            parts = []
+            length = 0
+            with archive.open(info) as document:
+                for _, element in ElementTree.iterparse(document, events=('end',)):
+                    tag = element.tag
+                    if tag == WORD_NAMESPACE + 't' and element.text:
+                        parts.append(element.text)
+                        length += len(element.text)
+                    elif tag in (WORD_NAMESPACE + 'tab', WORD_NAMESPACE + 'br'):
+                        parts.append(' ')
+                    elif tag == WORD_NAMESPACE + 'p':
+                        parts.append('\n')
+                        # Paragraph text has been consumed; free it as we go
+                        element.clear()
+
+                    if length >= max_chars:
+                        return ''.join(parts)[:max_chars], True
+
+            return ''.join(parts), False
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise TextExtractionError(f"Not a readable DOCX document: {e}")
+
+
+def _pdf_text(source, max_chars: int) -> Tuple[str, bool]:
+    """Read the text layer of a PDF page by page"""
+    try:
+        reader = PdfReader(source)
+        parts = []
+        length = 0
+        for index, page in enumerate(reader.pages):
+            if index >= MAX_PDF_PAGES:
+                return '\n'.join(parts), True
+            text = page.extract_text() or ''
+            parts.append(text)
+            length += len(text)
+            if length >= max_chars:
+                return '\n'.join(parts)[:max_chars], True
+        return '\n'.join(parts), False
+    except (PdfReadError, ValueError, KeyError) as e:
+        raise TextExtractionError(f"Not a readable PDF document: {e}")
+
+
+@contextmanager
+def _seekable_source(storage: StorageBackend, key: str) -> Iterator:
+    """Open stored content as a seekable file, spooling remote objects to a temp file"""
+    path = storage.local_path(key)
+    if path is not None:
+        with open(path, 'rb') as f:
+            yield f
+        return
+
+    with tempfile.TemporaryFile() as f:
+        for chunk in storage.iter_chunks(key):
+            f.write(chunk)
+        f.seek(0)
+        yield f
+
+
+def extract_text(storage: StorageBackend, key: str, file_type: str,
+                 max_chars: int = MAX_EXTRACTED_CHARS) -> Tuple[Optional[str], bool]:
+    """
+    Extract the text of stored content
+
+    Args:
+        storage: Storage backend holding the content
+        key: Storage key of the content
+        file_type: File extension, e.g. '.pdf'
+        max_chars: Maximum number of characters returned
+
+    Returns:
+        Tuple of (normalized text, truncated); text is None when the type has
+        no extractor
+    """
+    extractor = extractor_for(file_type)
+    if extractor is None:
+        return None, False
+
+    if extractor == 'text':
+        text, truncated = _decode_chunks(storage.iter_chunks(key), max_chars)
+    else:
+        with _seekable_source(storage, key) as source:
+            if extractor == 'docx':
+                text, truncated = _docx_text(source, max_chars)
+            else:
+                text, truncated = _pdf_text(source, max_chars)
+
+    return normalize_text(text), truncated
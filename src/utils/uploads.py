@@ -0,0 +1,347 @@
+"""
+Streaming Upload Utility
+Copies uploaded files to storage in fixed-size chunks while counting, hashing
+and capturing the leading bytes for type sniffing
+"""
+
+import hashlib
+import os
+import posixpath
+import zipfile
+from typing import Dict, Any, BinaryIO, Iterator, Optional, Tuple
+
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData, Preamble
+
+from src.utils.validation import SNIFF_LENGTH, file_size_error
+
+# Bytes read from the upload stream per iteration
+UPLOAD_CHUNK_SIZE = 8 * 1024
+
+# Suffix of files still being written
+PARTIAL_SUFFIX = '.part'
+
+# Directory under UPLOAD_FOLDER holding partially uploaded files
+UPLOAD_SESSION_DIR = '_sessions'
+
+# Archive entries that are never evidence (macOS resource forks, Finder/Explorer metadata)
+IGNORED_ARCHIVE_ENTRIES = ('__MACOSX/', '.DS_Store', 'Thumbs.db', 'desktop.ini')
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload stream exceeds the size limit"""
+
+    def __init__(self, size: int, max_size: int):
+        super().__init__(file_size_error(size, max_size))
+        self.size = size
+        self.max_size = max_size
+
+
+class ArchiveError(ValueError):
+    """Raised when an uploaded archive cannot be read or exceeds its limits"""
+
+
+# Bytes that must follow a multipart boundary before it is passed to the decoder ('--' and CRLF)
+DELIMITER_SUFFIX_LENGTH = 4
+
+
+class MultipartError(ValueError):
+    """Raised when a multipart/form-data body cannot be parsed"""
+
+
+class MultipartPart:
+    """
+    One part of a multipart/form-data body, readable like a file
+
+    Data is pulled from the request stream as the part is read; parts must
+    be read in order, and whatever a caller leaves unread is skipped when
+    the next part is requested.
+    """
+
+    def __init__(self, reader: 'MultipartReader', name: str, filename: Optional[str], headers: Headers):
+        self._reader = reader
+        self.name = name
+        self.filename = filename
+        self.headers = headers
+        self.content_type = headers.get('Content-Type')
+        self._buffer = b''
+        self._done = False
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes of the part's content (all remaining bytes if negative)"""
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            event = self._reader._next_event()
+            if not isinstance(event, Data):
+                raise MultipartError('Form data part ended unexpectedly')
+            self._buffer += event.data
+            self._done = not event.more_data
+
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def read_text(self, max_size: Optional[int] = None) -> str:
+        """Read a form field's whole value as text, capped at max_size bytes"""
+        value = b''
+        while True:
+            chunk = self.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                return value.decode('utf-8', 'replace')
+            value += chunk
+            if max_size is not None and len(value) > max_size:
+                raise RequestEntityTooLarge()
+
+    def skip(self) -> None:
+        """Read past the rest of the part"""
+        while self.read(UPLOAD_CHUNK_SIZE):
+            pass
+
+
+class MultipartReader:
+    """
+    Parse a multipart/form-data body straight from a stream, one part at a time
+
+    Unlike request.files, file parts are never spooled: each is handed out
+    as a MultipartPart to copy wherever it belongs, so the body is read once.
+    """
+
+    def __init__(self, stream: BinaryIO, boundary: bytes, max_form_memory_size: Optional[int] = None,
+                 max_parts: Optional[int] = None, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self._stream = stream
+        self._decoder = MultipartDecoder(boundary, max_form_memory_size, max_parts=max_parts)
+        self._delimiter = b'--' + boundary
+        self.max_form_memory_size = max_form_memory_size
+        self.chunk_size = chunk_size
+
+    def _next_event(self):
+        """Get the next decoder event, feeding it from the stream as needed"""
+        try:
+            while True:
+                event = self._decoder.next_event()
+                if not isinstance(event, NeedData):
+                    return event
+                self._decoder.receive_data(self._read_chunk() or None)
+        except ValueError as e:
+            raise MultipartError(f"Form data could not be parsed: {e}")
+
+    def _read_chunk(self) -> bytes:
+        """
+        Read the next chunk for the decoder, never ending it just after a boundary
+
+        The decoder hands out the line break ahead of a boundary as part data
+        when the bytes that follow the boundary have not arrived yet, so a
+        chunk is extended until they have.
+        """
+        chunk = self._stream.read(self.chunk_size)
+        while chunk:
+            pending = bytes(self._decoder.buffer[-len(self._delimiter):]) + chunk
+            index = pending.rfind(self._delimiter)
+            if index < 0 or len(pending) - index - len(self._delimiter) >= DELIMITER_SUFFIX_LENGTH:
+                break
+            more = self._stream.read(self.chunk_size)
+            if not more:
+                break
+            chunk += more
+        return chunk
+
+    def __iter__(self) -> Iterator[MultipartPart]:
+        part = None
+        while True:
+            if part is not None:
+                part.skip()
+
+            event = self._next_event()
+            if isinstance(event, Preamble):
+                continue
+            if isinstance(event, Epilogue):
+                return
+            if not isinstance(event, (Field, File)):
+                raise MultipartError('Form data part ended unexpectedly')
+
+            filename = event.filename if isinstance(event, File) else None
+            part = MultipartPart(self, event.name, filename, event.headers)
+            yield part
+
+
+def stream_to_file(stream: BinaryIO, path: str, max_size: int,
+                   chunk_size: int = UPLOAD_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Write a stream to a file chunk by chunk
+
+    Only one chunk is held in memory at a time. The copy stops as soon as
+    more than max_size bytes have been read, and the partial file is removed
+    on any failure.
+
+    Args:
+        stream: Readable binary stream (e.g. a MultipartPart)
+        path: Destination file path
+        max_size: Maximum number of bytes accepted
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        Dictionary with size, sha256 hex digest and header (leading bytes)
+    """
+    digest = hashlib.sha256()
+    header = b''
+    size = 0
+
+    try:
+        with open(path, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(size, max_size)
+
+                if len(header) < SNIFF_LENGTH:
+                    header += chunk[:SNIFF_LENGTH - len(header)]
+
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        discard_partial(path)
+        raise
+
+    return {
+        'size': size,
+        'sha256': digest.hexdigest(),
+        'header': header
+    }
+
+
+def discard_partial(path: str) -> None:
+    """Remove a partially written file, ignoring files that are already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def allocate_file(path: str, size: int) -> None:
+    """Create a file of the given size for chunks to be written into at their offsets"""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+
+def write_chunk(stream: BinaryIO, path: str, offset: int, max_length: int,
+                chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """
+    Write a stream into an existing file starting at a byte offset
+
+    Args:
+        stream: Readable binary stream holding the chunk
+        path: Preallocated destination file path
+        offset: Byte offset the chunk starts at
+        max_length: Maximum number of bytes the chunk may contain
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        Number of bytes written
+    """
+    written = 0
+
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+
+            written += len(chunk)
+            if written > max_length:
+                raise UploadTooLarge(offset + written, offset + max_length)
+
+            f.write(chunk)
+
+    return written
+
+
+def hash_file(path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Read a file chunk by chunk for its size, SHA-256 digest and leading bytes
+
+    Returns:
+        Dictionary in the same shape as stream_to_file
+    """
+    digest = hashlib.sha256()
+    header = b''
+    size = 0
+
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if len(header) < SNIFF_LENGTH:
+                header += chunk[:SNIFF_LENGTH - len(header)]
+            digest.update(chunk)
+
+    return {
+        'size': size,
+        'sha256': digest.hexdigest(),
+        'header': header
+    }
+
+
+def is_ignored_archive_entry(name: str) -> bool:
+    """Check if an archive member is OS metadata or a hidden file rather than evidence"""
+    basename = posixpath.basename(name)
+    return (
+        name.startswith(IGNORED_ARCHIVE_ENTRIES[0])
+        or basename in IGNORED_ARCHIVE_ENTRIES
+        or basename.startswith('.')
+    )
+
+
+def iter_archive_members(archive: BinaryIO, max_members: int,
+                         max_total_size: int) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Open each file in a ZIP archive as a decompressing stream
+
+    The archive is read in place (it must be seekable, such as the partial
+    file it was written to), so members are never held in memory or copied twice.
+    Limits are checked against the central directory before anything is
+    extracted; callers still cap each member while streaming, since declared
+    sizes can lie.
+
+    Args:
+        archive: Seekable binary stream holding the ZIP
+        max_members: Maximum number of files in the archive
+        max_total_size: Maximum declared uncompressed size of all files
+
+    Returns:
+        Iterator of (member path, readable stream) pairs
+    """
+    try:
+        zip_file = zipfile.ZipFile(archive)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ArchiveError(f"Archive could not be read: {e}")
+
+    with zip_file:
+        members = [
+            info for info in zip_file.infolist()
+            if not info.is_dir() and not is_ignored_archive_entry(info.filename)
+        ]
+
+        if len(members) > max_members:
+            raise ArchiveError(f"Archive contains {len(members)} files; at most {max_members} are allowed")
+
+        total_size = sum(info.file_size for info in members)
+        if total_size > max_total_size:
+            raise ArchiveError(f"Archive expands to {total_size} bytes; at most {max_total_size} are allowed")
+
+        for info in members:
+            if info.flag_bits & 0x1:
+                raise ArchiveError(f"Archive member {info.filename} is encrypted")
+            try:
+                with zip_file.open(info) as member:
+                    yield info.filename, member
+            except (zipfile.BadZipFile, NotImplementedError) as e:
+                raise ArchiveError(f"Archive member {info.filename} could not be extracted: {e}")
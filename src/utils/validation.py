@@ -3,79 +3,330 @@ Assessment Response Validation Utility
 Validates user responses to ISO 42001 assessment questions
 """
 
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List, Any, Optional
 import re
 
-def validate_assessment_response(response, control_info: Dict[str, Any]) -> Dict[str, Any]:
+from src.utils.catalog import QUESTION_TYPES
+
+# Minimum length before a text answer stops being flagged as very short
+MIN_TEXT_ANSWER_LENGTH = 10
+
+# Accepted answers for boolean questions
+BOOLEAN_ANSWERS = (True, False, 'true', 'false', 'yes', 'no')
+
+# Rating range used when a question does not define one
+DEFAULT_RATING_RANGE = (1, 5)
+
+def _text_rule():
+    """Compile a text question rule"""
+    def validate(answer, number, errors, warnings):
+        if len(str(answer).strip()) < MIN_TEXT_ANSWER_LENGTH:
+            warnings.append(
+                f"Question {number} answer is very short (less than {MIN_TEXT_ANSWER_LENGTH} characters)"
+            )
+    return validate
+
+def _multiple_choice_rule(options):
+    """Compile a multiple choice question rule over a fixed option set"""
+    options = tuple(options)
+    try:
+        option_set = frozenset(options)
+    except TypeError:
+        option_set = None
+    
+    def validate(answer, number, errors, warnings):
+        try:
+            valid = answer in option_set if option_set is not None else answer in options
+        except TypeError:
+            valid = answer in options
+        if not valid:
+            errors.append(f"Question {number} has invalid multiple choice answer")
+    return validate
+
+def _rating_rule(min_rating, max_rating):
+    """Compile a rating question rule over a fixed range"""
+    def validate(answer, number, errors, warnings):
+        try:
+            rating = float(answer)
+            if not (min_rating <= rating <= max_rating):
+                errors.append(f"Question {number} rating must be between {min_rating} and {max_rating}")
+        except (ValueError, TypeError):
+            errors.append(f"Question {number} rating must be a number")
+    return validate
+
+def _boolean_rule():
+    """Compile a yes/no question rule"""
+    accepted = frozenset(BOOLEAN_ANSWERS)
+    
+    def validate(answer, number, errors, warnings):
+        try:
+            valid = answer in accepted
+        except TypeError:
+            valid = False
+        if not valid:
+            errors.append(f"Question {number} must have a yes/no or true/false answer")
+    return validate
+
+def _unchecked_rule(answer, number, errors, warnings):
+    """Rule for question types without answer constraints"""
+
+_TEXT_RULE = _text_rule()
+_BOOLEAN_RULE = _boolean_rule()
+
+def compile_question_rule(question: Dict[str, Any]):
     """
-    Validate an assessment response for completeness and quality
+    Compile a question definition into a validator closure
     
     Args:
-        response: AssessmentResponse object
-        control_info: Control definition from ISO42001_CONTROLS
+        question: Question definition with 'type' and, depending on the type,
+            'options' or 'min_rating'/'max_rating'
     
     Returns:
-        Dictionary with validation results
+        Callable (answer, question_number, errors, warnings) appending messages in place
     """
-    validation_result = {
-        'is_valid': True,
-        'errors': [],
-        'warnings': [],
-        'evidence_completeness': 0.5,
-        'response_quality': 0.5,
-        'completeness_score': 0.0
-    }
+    question_type = question.get('type', 'text')
+    
+    if question_type == 'text':
+        return _TEXT_RULE
+    if question_type == 'multiple_choice':
+        return _multiple_choice_rule(question.get('options', ()))
+    if question_type == 'rating':
+        return _rating_rule(
+            question.get('min_rating', DEFAULT_RATING_RANGE[0]),
+            question.get('max_rating', DEFAULT_RATING_RANGE[1])
+        )
+    if question_type == 'boolean':
+        return _BOOLEAN_RULE
+    return _unchecked_rule
+
+def _rule_schema(question_type: str, question: Mapping) -> Dict[str, Any]:
+    """Describe the checks compile_question_rule applies for a question type"""
+    if question_type == 'text':
+        # Short answers only produce a warning, never an error
+        return {'warn_below_length': MIN_TEXT_ANSWER_LENGTH}
+    if question_type == 'multiple_choice':
+        return {'options': list(question.get('options', ()))}
+    if question_type == 'rating':
+        return {
+            'min_rating': question.get('min_rating', DEFAULT_RATING_RANGE[0]),
+            'max_rating': question.get('max_rating', DEFAULT_RATING_RANGE[1])
+        }
+    if question_type == 'boolean':
+        return {'accepted_answers': list(BOOLEAN_ANSWERS)}
+    return {}
+
+def _question_schema(question) -> Dict[str, Any]:
+    """
+    Describe a catalog question and the rules applied to its answer
+    
+    Plain-string questions have no type of their own ('type' is None): their
+    answers are checked against the type the submitted answer declares, as
+    described by get_declared_type_schema.
+    """
+    if not isinstance(question, Mapping) or 'type' not in question:
+        text = question.get('question', '') if isinstance(question, Mapping) else question
+        return {'question': text, 'type': None}
+    
+    question_type = question['type']
+    schema = {'question': question.get('question', ''), 'type': question_type}
+    schema.update(_rule_schema(question_type, question))
+    return schema
+
+def get_declared_type_schema() -> Dict[str, Dict[str, Any]]:
+    """
+    Describe the rule applied to an answer of an untyped catalog question
     
-    responses_data = response.get_responses()
+    Options and rating bounds are read from the submitted answer itself;
+    the values given here are the defaults used when the answer omits them.
+    Answers declaring no type are checked as 'text', unknown types are not
+    checked.
     
-    # Validate maturity level
-    if response.maturity_level is None:
-        validation_result['errors'].append("Maturity level is required")
-        validation_result['is_valid'] = False
-    elif not (0 <= response.maturity_level <= 5):
-        validation_result['errors'].append("Maturity level must be between 0 and 5")
-        validation_result['is_valid'] = False
+    Returns:
+        Dictionary mapping each declarable question type to its checks
+    """
+    return {question_type: _rule_schema(question_type, {}) for question_type in QUESTION_TYPES}
+
+class ControlValidator:
+    """
+    Validation rules for one control, compiled once from its definition
     
-    # Validate question responses
-    questions = responses_data.get('questions', [])
-    required_questions = control_info.get('questions', [])
+    Catalog questions given as objects carry their own type, options and
+    rating range, which take precedence over what a submitted answer declares.
+    Plain-string questions have no compiled rule (None in question_rules);
+    their answers are checked against the type declared in the response.
+    """
     
-    if not questions:
-        validation_result['errors'].append("No responses provided to assessment questions")
-        validation_result['is_valid'] = False
-    else:
-        # Check response completeness
-        answered_questions = len([q for q in questions if q.get('answer')])
-        total_questions = len(required_questions)
+    __slots__ = ('control_info', 'question_rules', 'total_questions', 'required_evidence', 'schema')
+    
+    def __init__(self, control_info: Dict[str, Any]):
+        self.control_info = control_info
+        questions = control_info.get('questions', [])
+        
+        self.question_rules = tuple(
+            compile_question_rule(question) if isinstance(question, Mapping) and 'type' in question else None
+            for question in questions
+        )
+        self.total_questions = len(questions)
+        self.required_evidence = len(control_info.get('evidence_required', []))
+        self.schema = {
+            'questions': [_question_schema(question) for question in questions],
+            'maturity_level': {'required': True, 'min': 0, 'max': 5},
+            'evidence_required': list(control_info.get('evidence_required', []))
+        }
+    
+    def validate(self, response) -> Dict[str, Any]:
+        """Validate an AssessmentResponse against the compiled rules"""
+        errors = []
+        warnings = []
+        completeness_score = 0.0
+        
+        responses_data = response.get_responses()
         
-        if total_questions > 0:
-            completeness_ratio = answered_questions / total_questions
-            validation_result['completeness_score'] = completeness_ratio
+        # Validate maturity level
+        maturity_level = response.maturity_level
+        if maturity_level is None:
+            errors.append("Maturity level is required")
+        elif not (0 <= maturity_level <= 5):
+            errors.append("Maturity level must be between 0 and 5")
+        
+        # Validate question responses
+        questions = responses_data.get('questions', [])
+        
+        if not questions:
+            errors.append("No responses provided to assessment questions")
+        else:
+            # Check response completeness
+            answered_questions = 0
+            for question_response in questions:
+                if question_response.get('answer'):
+                    answered_questions += 1
             
-            if completeness_ratio < 0.5:
-                validation_result['warnings'].append(
-                    f"Only {answered_questions} of {total_questions} questions answered"
-                )
+            if self.total_questions > 0:
+                completeness_score = answered_questions / self.total_questions
+                
+                if completeness_score < 0.5:
+                    warnings.append(
+                        f"Only {answered_questions} of {self.total_questions} questions answered"
+                    )
+            
+            # Validate individual question responses
+            rules = self.question_rules
+            rule_count = len(rules)
+            for i, question_response in enumerate(questions):
+                rule = rules[i] if i < rule_count else None
+                _check_question(question_response, i + 1, rule, errors, warnings)
         
-        # Validate individual question responses
-        for i, question_response in enumerate(questions):
-            question_validation = validate_question_response(question_response, i)
-            validation_result['errors'].extend(question_validation['errors'])
-            validation_result['warnings'].extend(question_validation['warnings'])
+        return {
+            'is_valid': not errors,
+            'errors': errors,
+            'warnings': warnings,
+            'evidence_completeness': _evidence_ratio(len(response.get_evidence_files()), self.required_evidence),
+            'response_quality': calculate_response_quality(responses_data, self.control_info),
+            'completeness_score': completeness_score
+        }
+
+def _check_question(question_response: Dict[str, Any], number: int, rule, errors: List[str], warnings: List[str]):
+    """Apply a compiled rule (or the rule the response declares) to one answer"""
+    answer = question_response.get('answer', '')
     
-    # Calculate evidence completeness
-    evidence_completeness = calculate_evidence_completeness(response, control_info)
-    validation_result['evidence_completeness'] = evidence_completeness
+    if not answer:
+        warnings.append(f"Question {number} has no answer")
+        return
     
-    # Calculate response quality
-    response_quality = calculate_response_quality(responses_data, control_info)
-    validation_result['response_quality'] = response_quality
+    if rule is None:
+        rule = _response_rule(question_response)
+    rule(answer, number, errors, warnings)
+
+def _response_rule(question_response: Dict[str, Any]):
+    """Get the rule for a question type declared by the submitted response"""
+    question_type = question_response.get('type', 'text')
     
-    # Overall validation
-    if validation_result['errors']:
-        validation_result['is_valid'] = False
+    # Types without per-question parameters share precompiled rules
+    if question_type == 'text':
+        return _TEXT_RULE
+    if question_type == 'boolean':
+        return _BOOLEAN_RULE
+    try:
+        if question_type == 'rating':
+            return _declared_rating_rule(
+                question_response.get('min_rating', DEFAULT_RATING_RANGE[0]),
+                question_response.get('max_rating', DEFAULT_RATING_RANGE[1])
+            )
+        if question_type == 'multiple_choice':
+            return _declared_choice_rule(tuple(question_response.get('options', ())))
+    except TypeError:
+        # Unhashable declarations cannot be cached
+        return compile_question_rule(question_response)
+    return _unchecked_rule
+
+# Answers repeat the same declared ranges and option lists, so their rules
+# are compiled once per distinct declaration rather than once per answer
+@lru_cache(maxsize=256, typed=True)
+def _declared_rating_rule(min_rating, max_rating):
+    """Cached rating rule for a range declared by a submitted answer"""
+    return _rating_rule(min_rating, max_rating)
+
+@lru_cache(maxsize=256)
+def _declared_choice_rule(options):
+    """Cached multiple choice rule for options declared by a submitted answer"""
+    return _multiple_choice_rule(options)
+
+_compiled_validators = {}
+
+def get_control_validator(control_info: Dict[str, Any]) -> ControlValidator:
+    """
+    Get the compiled validator for a control definition
+    
+    Read-only catalog definitions are compiled once and reused; other
+    (mutable) definitions are compiled on every call.
+    
+    Args:
+        control_info: Control definition from the assessment's control catalog
     
-    return validation_result
+    Returns:
+        ControlValidator for the control
+    """
+    if not isinstance(control_info, MappingProxyType):
+        return ControlValidator(control_info)
+    
+    cached = _compiled_validators.get(id(control_info))
+    if cached is None or cached[0] is not control_info:
+        cached = (control_info, ControlValidator(control_info))
+        _compiled_validators[id(control_info)] = cached
+    return cached[1]
+
+def get_validation_schema(catalog, stage: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Export the compiled validation rules of a catalog for client-side validation
+    
+    Args:
+        catalog: ControlCatalog to export
+        stage: Optional stage to limit the export to
+    
+    Returns:
+        Dictionary mapping control ID to its validation schema
+    """
+    controls = catalog.controls_in_stage(stage) if stage else catalog.controls
+    return {
+        control_id: get_control_validator(control_info).schema
+        for control_id, control_info in controls.items()
+    }
+
+def validate_assessment_response(response, control_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate an assessment response for completeness and quality
+    
+    Args:
+        response: AssessmentResponse object
+        control_info: Control definition from the assessment's control catalog
+    
+    Returns:
+        Dictionary with validation results
+    """
+    return get_control_validator(control_info).validate(response)
 
 def validate_question_response(question_response: Dict[str, Any], question_index: int) -> Dict[str, Any]:
     """
@@ -93,47 +344,7 @@ def validate_question_response(question_response: Dict[str, Any], question_index
         'warnings': []
     }
     
-    answer = question_response.get('answer', '')
-    question_type = question_response.get('type', 'text')
-    
-    if not answer:
-        result['warnings'].append(f"Question {question_index + 1} has no answer")
-        return result
-    
-    # Validate based on question type
-    if question_type == 'text':
-        if len(str(answer).strip()) < 10:
-            result['warnings'].append(
-                f"Question {question_index + 1} answer is very short (less than 10 characters)"
-            )
-    
-    elif question_type == 'multiple_choice':
-        valid_options = question_response.get('options', [])
-        if answer not in valid_options:
-            result['errors'].append(
-                f"Question {question_index + 1} has invalid multiple choice answer"
-            )
-    
-    elif question_type == 'rating':
-        try:
-            rating = float(answer)
-            min_rating = question_response.get('min_rating', 1)
-            max_rating = question_response.get('max_rating', 5)
-            
-            if not (min_rating <= rating <= max_rating):
-                result['errors'].append(
-                    f"Question {question_index + 1} rating must be between {min_rating} and {max_rating}"
-                )
-        except (ValueError, TypeError):
-            result['errors'].append(
-                f"Question {question_index + 1} rating must be a number"
-            )
-    
-    elif question_type == 'boolean':
-        if answer not in [True, False, 'true', 'false', 'yes', 'no']:
-            result['errors'].append(
-                f"Question {question_index + 1} must have a yes/no or true/false answer"
-            )
+    _check_question(question_response, question_index + 1, None, result['errors'], result['warnings'])
     
     return result
 
@@ -151,17 +362,21 @@ def calculate_evidence_completeness(response, control_info: Dict[str, Any]) -> f
     evidence_files = response.get_evidence_files()
     required_evidence = control_info.get('evidence_required', [])
     
-    if not required_evidence:
+    return _evidence_ratio(len(evidence_files), len(required_evidence))
+
+def _evidence_ratio(evidence_count: int, required_count: int) -> float:
+    """Evidence completeness from the number of files and required evidence types"""
+    if not required_count:
         return 1.0  # No evidence required
     
-    if not evidence_files:
+    if not evidence_count:
         return 0.0  # No evidence provided
     
     # Basic completeness based on number of files vs required evidence types
-    evidence_ratio = min(len(evidence_files) / len(required_evidence), 1.0)
+    evidence_ratio = min(evidence_count / required_count, 1.0)
     
     # Bonus for having more evidence than minimum required
-    if len(evidence_files) > len(required_evidence):
+    if evidence_count > required_count:
         evidence_ratio = min(evidence_ratio + 0.1, 1.0)
     
     return evidence_ratio
@@ -225,12 +440,80 @@ def calculate_response_quality(responses_data: Dict[str, Any], control_info: Dic
     
     return min(max(quality_score, 0.0), 1.0)
 
+# Allowed evidence file types
+ALLOWED_EXTENSIONS = frozenset({
+    '.pdf', '.doc', '.docx', '.txt', '.rtf',  # Documents
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp',  # Images
+    '.xls', '.xlsx', '.csv',                  # Spreadsheets
+    '.ppt', '.pptx',                          # Presentations
+    '.zip', '.rar'                            # Archives
+})
+
+# Default maximum evidence file size
+MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+
+# Leading bytes inspected when sniffing a file's real type
+SNIFF_LENGTH = 512
+
+_ZIP_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06')
+
+# Byte order marks of UTF-16 text, which legitimately contains NUL bytes
+_UTF16_BOMS = (b'\xff\xfe', b'\xfe\xff')
+_OLE_SIGNATURES = (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',)
+
+# Magic bytes each binary type must start with; None marks plain-text types
+FILE_SIGNATURES = {
+    '.pdf': (b'%PDF-',),
+    '.doc': _OLE_SIGNATURES,
+    '.docx': _ZIP_SIGNATURES,
+    '.rtf': (b'{\\rtf',),
+    '.txt': None,
+    '.jpg': (b'\xff\xd8\xff',),
+    '.jpeg': (b'\xff\xd8\xff',),
+    '.png': (b'\x89PNG\r\n\x1a\n',),
+    '.gif': (b'GIF87a', b'GIF89a'),
+    '.bmp': (b'BM',),
+    '.xls': _OLE_SIGNATURES,
+    '.xlsx': _ZIP_SIGNATURES,
+    '.csv': None,
+    '.ppt': _OLE_SIGNATURES,
+    '.pptx': _ZIP_SIGNATURES,
+    '.zip': _ZIP_SIGNATURES,
+    '.rar': (b'Rar!\x1a\x07',)
+}
+
+def matches_file_signature(header: bytes, extension: str) -> bool:
+    """
+    Check that a file's leading bytes match the type its extension claims
+    
+    Args:
+        header: First bytes of the file (up to SNIFF_LENGTH)
+        extension: Lower-case file extension including the dot
+    
+    Returns:
+        True if the content is consistent with the extension
+    """
+    if extension not in FILE_SIGNATURES:
+        return False
+    
+    signatures = FILE_SIGNATURES[extension]
+    if signatures is None:
+        # Plain text must not contain NUL bytes, unless it is UTF-16
+        if header.startswith(_UTF16_BOMS):
+            return True
+        return b'\x00' not in header[:SNIFF_LENGTH]
+    
+    return header.startswith(signatures)
+
 def validate_file_upload(file_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Validate uploaded evidence file
     
+    Size checks are skipped when 'size' is absent, and content sniffing when
+    'header' is absent, so the name can be checked before the upload is read.
+    
     Args:
-        file_data: File upload data
+        file_data: File upload data (filename, size, header, max_size)
     
     Returns:
         Dictionary with validation results
@@ -241,15 +524,6 @@ def validate_file_upload(file_data: Dict[str, Any]) -> Dict[str, Any]:
         'warnings': []
     }
     
-    # Allowed file types
-    allowed_extensions = {
-        '.pdf', '.doc', '.docx', '.txt', '.rtf',  # Documents
-        '.jpg', '.jpeg', '.png', '.gif', '.bmp',  # Images
-        '.xls', '.xlsx', '.csv',                  # Spreadsheets
-        '.ppt', '.pptx',                          # Presentations
-        '.zip', '.rar'                            # Archives
-    }
-    
     # Check file extension
     filename = file_data.get('filename', '')
     if not filename:
@@ -259,25 +533,30 @@ def validate_file_upload(file_data: Dict[str, Any]) -> Dict[str, Any]:
     
     file_extension = '.' + filename.split('.')[-1].lower() if '.' in filename else ''
     
-    if file_extension not in allowed_extensions:
+    if file_extension not in ALLOWED_EXTENSIONS:
         result['errors'].append(
             f"File type {file_extension} is not allowed. "
-            f"Allowed types: {', '.join(sorted(allowed_extensions))}"
+            f"Allowed types: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
         )
         result['is_valid'] = False
     
-    # Check file size (16MB limit)
-    file_size = file_data.get('size', 0)
-    max_size = 16 * 1024 * 1024  # 16MB
-    
-    if file_size > max_size:
-        result['errors'].append(
-            f"File size ({file_size / 1024 / 1024:.1f}MB) exceeds maximum allowed size (16MB)"
-        )
-        result['is_valid'] = False
+    # Check file size
+    if 'size' in file_data:
+        file_size = file_data['size'] or 0
+        max_size = file_data.get('max_size') or MAX_FILE_SIZE
+        
+        if file_size > max_size:
+            result['errors'].append(file_size_error(file_size, max_size))
+            result['is_valid'] = False
+        
+        if file_size == 0:
+            result['errors'].append("File appears to be empty")
+            result['is_valid'] = False
     
-    if file_size == 0:
-        result['errors'].append("File appears to be empty")
+    # Check content against the claimed type
+    header = file_data.get('header')
+    if header and file_extension in ALLOWED_EXTENSIONS and not matches_file_signature(header, file_extension):
+        result['errors'].append(f"File content does not match its {file_extension} extension")
         result['is_valid'] = False
     
     # Check filename for security
@@ -287,6 +566,13 @@ def validate_file_upload(file_data: Dict[str, Any]) -> Dict[str, Any]:
     
     return result
 
+def file_size_error(file_size: int, max_size: int = MAX_FILE_SIZE) -> str:
+    """Build the error message for a file over the size limit"""
+    return (
+        f"File size ({file_size / 1024 / 1024:.1f}MB) exceeds maximum allowed size "
+        f"({max_size / 1024 / 1024:g}MB)"
+    )
+
 def is_safe_filename(filename: str) -> bool:
     """
     Check if filename is safe (no path traversal, etc.)
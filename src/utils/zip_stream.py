@@ -0,0 +1,114 @@
+"""
+Streaming ZIP Writer
+Builds ZIP archives on the fly as a generator of bytes, holding at most one
+chunk of input in memory and never touching disk
+"""
+
+import hashlib
+import zipfile
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+# Extensions whose content is already compressed, so deflating it again only costs CPU
+STORED_EXTENSIONS = frozenset({
+    '.pdf', '.docx', '.xlsx', '.pptx',   # Office Open XML and PDF are compressed containers
+    '.jpg', '.jpeg', '.png', '.gif',     # Compressed images
+    '.zip', '.rar', '.gz', '.7z'         # Archives
+})
+
+# Files at least this large are stored rather than deflated, keeping export CPU bounded
+STORE_SIZE_THRESHOLD = 8 * 1024 * 1024  # 8MB
+
+
+class _StreamSink:
+    """
+    Write-only, non-seekable file object that hands written bytes to a generator
+
+    zipfile writes local headers with data descriptors when its output cannot
+    seek, so every byte can be yielded as soon as it is written.
+    """
+
+    def __init__(self):
+        self._buffer: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._buffer.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        """Take everything written since the last drain"""
+        data = b''.join(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def compression_for(filename: str, size: Optional[int]) -> int:
+    """Choose ZIP_STORED for compressed formats and large files, ZIP_DEFLATED otherwise"""
+    extension = '.' + filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    if extension in STORED_EXTENSIONS or (size or 0) >= STORE_SIZE_THRESHOLD:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def stream_zip(entries: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Generate a ZIP archive entry by entry
+
+    Each entry is a dictionary with 'path' (name inside the archive), 'chunks'
+    (iterable of bytes, or a callable returning one so the source is only
+    opened when its turn comes), and optionally 'size', 'date_time' and
+    'compression'. After an entry has been written, its 'sha256' and
+    'written' keys are filled in from the bytes that were streamed, so a
+    manifest entry appended later can report them.
+
+    Args:
+        entries: Entries to write, in order (may be a generator)
+
+    Returns:
+        Iterator of archive bytes
+    """
+    sink = _StreamSink()
+
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as archive:
+        for entry in entries:
+            date_time = entry.get('date_time') or datetime.utcnow()
+            info = zipfile.ZipInfo(entry['path'], date_time=date_time.timetuple()[:6])
+            info.compress_type = entry.get('compression', compression_for(entry['path'], entry.get('size')))
+            info.external_attr = 0o644 << 16
+
+            chunks = entry['chunks']
+            if callable(chunks):
+                chunks = chunks()
+
+            digest = hashlib.sha256()
+            written = 0
+
+            # force_zip64 because sizes are not known up front when streaming
+            with archive.open(info, 'w', force_zip64=True) as destination:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    written += len(chunk)
+                    destination.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+            entry['sha256'] = digest.hexdigest()
+            entry['written'] = written
+
+            data = sink.drain()
+            if data:
+                yield data
+
+    # Central directory
+    data = sink.drain()
+    if data:
+        yield data
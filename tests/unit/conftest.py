@@ -0,0 +1,105 @@
+"""
+Shared fixtures for the unit tests
+"""
+
+import io
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, Optional
+from urllib.parse import quote
+
+import pytest
+
+from src.utils.storage import ClientError
+
+
+class FakeS3Client:
+    """
+    In-process stand-in for the boto3 S3 client
+
+    Implements the subset of calls S3Storage makes, with S3's error codes,
+    so the S3 backend can be exercised without network access.
+    """
+
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> {'Body': bytes, 'ContentType': str, 'LastModified': datetime}
+
+    def _get(self, bucket: str, key: str, operation: str) -> Dict[str, Any]:
+        entry = self.objects.get((bucket, key))
+        if entry is None:
+            code = '404' if operation == 'HeadObject' else 'NoSuchKey'
+            raise ClientError({'Error': {'Code': code, 'Message': 'Not Found'}}, operation)
+        return entry
+
+    def put_object(self, Bucket: str, Key: str, Body=b'', ContentType: Optional[str] = None, **kwargs):
+        data = Body.read() if hasattr(Body, 'read') else bytes(Body)
+        self.objects[(Bucket, Key)] = {
+            'Body': data,
+            'ContentType': ContentType or 'binary/octet-stream',
+            'LastModified': datetime.utcnow()
+        }
+        return {}
+
+    def upload_fileobj(self, Fileobj: BinaryIO, Bucket: str, Key: str, ExtraArgs: Optional[Dict[str, Any]] = None,
+                       **kwargs):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj, **(ExtraArgs or {}))
+
+    def copy(self, CopySource: Dict[str, str], Bucket: str, Key: str, **kwargs):
+        entry = self._get(CopySource['Bucket'], CopySource['Key'], 'HeadObject')
+        self.objects[(Bucket, Key)] = dict(entry, LastModified=datetime.utcnow())
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None, **kwargs):
+        entry = self._get(Bucket, Key, 'GetObject')
+        data = entry['Body']
+        if Range:
+            first, _, last = Range[len('bytes='):].partition('-')
+            data = data[int(first):int(last) + 1 if last else None]
+        return {
+            'Body': io.BytesIO(data),
+            'ContentLength': len(data),
+            'ContentType': entry['ContentType']
+        }
+
+    def head_object(self, Bucket: str, Key: str, **kwargs):
+        entry = self._get(Bucket, Key, 'HeadObject')
+        return {
+            'ContentLength': len(entry['Body']),
+            'ContentType': entry['ContentType'],
+            'LastModified': entry['LastModified']
+        }
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs):
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '', ContinuationToken: Optional[str] = None,
+                        MaxKeys: int = 1000, **kwargs):
+        keys = sorted(
+            key for bucket, key in self.objects
+            if bucket == Bucket and key.startswith(Prefix) and (ContinuationToken is None or key > ContinuationToken)
+        )
+        page = keys[:MaxKeys]
+        response = {
+            'Contents': [
+                {
+                    'Key': key,
+                    'Size': len(self.objects[(Bucket, key)]['Body']),
+                    'LastModified': self.objects[(Bucket, key)]['LastModified']
+                }
+                for key in page
+            ],
+            'KeyCount': len(page),
+            'IsTruncated': len(keys) > MaxKeys
+        }
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict[str, Any], ExpiresIn: int = 3600, **kwargs):
+        expires = int((datetime.utcnow() + timedelta(seconds=ExpiresIn)).timestamp())
+        return f"https://{Params['Bucket']}.s3.fake/{quote(Params['Key'])}?X-Amz-Expires={ExpiresIn}&Expires={expires}"
+
+
+@pytest.fixture
+def s3_client():
+    """Empty in-process S3 client"""
+    return FakeS3Client()
@@ -0,0 +1,106 @@
+"""
+Tests that the batch scoring engine matches the scalar scoring path
+"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.batch_scoring import (
+    ResponseBatch, calculate_batch_scores, calculate_batch_scores_and_states, score_assessments_with_states
+)
+from src.utils.scoring import (
+    DOMAIN_WEIGHTS, build_score_state, calculate_assessment_scores, calculate_compliance_score, get_control_catalog
+)
+
+RISK_LEVELS = ['low', 'medium', 'high']
+
+
+def maybe(rng, value, chance=0.2):
+    """Return None instead of value some of the time, as unanswered ORM fields are"""
+    return None if rng.random() < chance else value
+
+
+def random_responses(rng, catalog):
+    """Responses for a random subset of controls, leaving some domains empty"""
+    domains = [domain for domain in DOMAIN_WEIGHTS if rng.random() < 0.7]
+    controls = [
+        (control_id, control['domain']) for control_id, control in catalog.controls.items()
+        if control['domain'] in domains and rng.random() < 0.8
+    ]
+    if rng.random() < 0.3:
+        # Filed under a domain the weights don't know
+        controls.append(('X.1', 'unknown'))
+
+    responses = []
+    for control_id, domain in controls:
+        maturity = maybe(rng, rng.choice([0, 1, 2, 3, 4, 5, 5, 7]))
+        evidence = maybe(rng, rng.random())
+        quality = maybe(rng, rng.random())
+        score = None
+        if maturity is not None:
+            score = calculate_compliance_score(
+                maturity, 0.5 if evidence is None else evidence, 0.5 if quality is None else quality
+            )
+        responses.append(SimpleNamespace(
+            assessment_id=None,
+            control_id=control_id,
+            domain=domain,
+            maturity_level=maturity,
+            evidence_completeness=evidence,
+            response_quality=quality,
+            calculated_score=maybe(rng, score, 0.1)
+        ))
+    return responses
+
+
+@pytest.fixture
+def catalog():
+    return get_control_catalog()
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_batch_matches_scalar_scores(seed, catalog):
+    rng = random.Random(seed)
+    assessments = [(random_responses(rng, catalog), rng.choice(RISK_LEVELS)) for _ in range(8)]
+    assessments.append(([], 'medium'))
+
+    results = calculate_batch_scores(ResponseBatch.from_responses(assessments, catalog=catalog))
+
+    assert results == [
+        calculate_assessment_scores(responses, risk_level, catalog) for responses, risk_level in assessments
+    ]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_batch_states_match_built_states(seed, catalog):
+    rng = random.Random(seed)
+    assessments = [(random_responses(rng, catalog), rng.choice(RISK_LEVELS)) for _ in range(8)]
+    assessments.append(([], 'high'))
+
+    _, states = calculate_batch_scores_and_states(ResponseBatch.from_responses(assessments, catalog=catalog))
+
+    assert states == [build_score_state(responses, catalog) for responses, _ in assessments]
+
+
+def test_score_assessments_with_states(catalog):
+    rng = random.Random(42)
+    assessments = [
+        SimpleNamespace(id=f'assessment-{index}', risk_level=rng.choice(RISK_LEVELS), catalog_version=None)
+        for index in range(5)
+    ]
+    responses = []
+    for assessment in assessments[1:]:
+        for response in random_responses(rng, catalog):
+            response.assessment_id = assessment.id
+            responses.append(response)
+
+    results = score_assessments_with_states(assessments, responses)
+
+    assert list(results) == [assessment.id for assessment in assessments]
+    for assessment in assessments:
+        own = [response for response in responses if response.assessment_id == assessment.id]
+        scores, state = results[assessment.id]
+        assert scores == calculate_assessment_scores(own, assessment.risk_level, catalog)
+        assert state == build_score_state(own, catalog)
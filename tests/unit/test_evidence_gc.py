@@ -0,0 +1,310 @@
+"""
+Tests for the evidence garbage collector's merge join and orphan deletion
+"""
+
+import os
+import time
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from src.models.user import db
+from src.models.assessment import EvidenceBlob
+from src.utils.evidence_gc import GCError, _BlobNamespace, _Collector, _Namespace, merge_join
+from src.utils.evidence_store import add_blob_reference
+from src.utils.storage import LocalStorage, StoredObject
+
+
+SHA_A = 'a' * 64
+SHA_B = 'b' * 64
+SHA_C = 'c' * 64
+
+
+def stored(*keys):
+    return [StoredObject(key, len(key), datetime(2024, 1, 1)) for key in keys]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """App on a database file, so a second connection can hold a transaction open"""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'gc.db'}",
+        SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 0.2}},
+        TESTING=True
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path))
+
+
+def put_old(storage, key, data=b'evidence'):
+    """Store an object last modified well before any grace period"""
+    storage.put_bytes(key, data)
+    old = time.time() - 7 * 24 * 3600
+    os.utime(storage.local_path(key), (old, old))
+
+
+def collector(grace_period=3600, batch_size=100):
+    return _Collector(dry_run=False, batch_size=batch_size, pause=0, grace_period=grace_period, stop_event=None)
+
+
+class TestMergeJoin:
+
+    def test_pairs_matching_keys(self):
+        result = list(merge_join(stored('a', 'b'), [('a', 1), ('b', 2)]))
+
+        assert [(key, obj.key, row) for key, obj, row in result] == [('a', 'a', 1), ('b', 'b', 2)]
+
+    def test_interleaved_keys(self):
+        result = list(merge_join(stored('a', 'c', 'd', 'f'), [('b', 1), ('c', 2), ('e', 3), ('f', 4), ('g', 5)]))
+
+        assert [(key, obj is not None, row) for key, obj, row in result] == [
+            ('a', True, None),
+            ('b', False, 1),
+            ('c', True, 2),
+            ('d', True, None),
+            ('e', False, 3),
+            ('f', True, 4),
+            ('g', False, 5)
+        ]
+
+    def test_empty_sides(self):
+        assert [key for key, _, _ in merge_join(stored('a', 'b'), [])] == ['a', 'b']
+        assert [key for key, _, _ in merge_join([], [('a', 1)])] == ['a']
+        assert list(merge_join([], [])) == []
+
+    def test_orders_by_code_point(self):
+        # '-' sorts before '/', as in storage listings
+        keys = ['blobs/a-b', 'blobs/a/b']
+        result = list(merge_join(stored(*keys), [(key, key) for key in keys]))
+
+        assert [(key, row) for key, _, row in result] == [(key, key) for key in keys]
+
+    def test_unsorted_listing_raises(self):
+        with pytest.raises(GCError, match='Storage listing'):
+            list(merge_join(stored('b', 'a'), [('a', 1), ('b', 2)]))
+
+    def test_unsorted_database_keys_raise(self):
+        with pytest.raises(GCError, match='Database keys'):
+            list(merge_join(stored('a', 'b'), [('b', 2), ('a', 1)]))
+
+    def test_duplicate_keys_raise(self):
+        with pytest.raises(GCError):
+            list(merge_join(stored('a', 'a'), []))
+
+    def test_raises_before_passing_out_of_order_key(self):
+        seen = []
+        with pytest.raises(GCError):
+            for key, _, _ in merge_join(stored('a', 'c', 'b'), []):
+                seen.append(key)
+
+        assert seen == ['a', 'c']
+
+
+class _ListedNamespace(_Namespace):
+    """Namespace over a storage prefix with a fixed set of re-referenced keys"""
+
+    name = 'test'
+
+    def __init__(self, storage, keep=(), fail=()):
+        super().__init__(storage)
+        self.keep = set(keep)
+        self.fail = set(fail)
+        self.checked = []
+
+    def listing(self):
+        return self.storage.iter_keys('blobs/')
+
+    def referenced(self):
+        return iter(())
+
+    def still_referenced(self, keys):
+        self.checked.append(list(keys))
+        return self.keep & set(keys)
+
+    def delete(self, key):
+        if key in self.fail:
+            raise OSError('disk error')
+        return super().delete(key)
+
+
+class TestDeleteBatch:
+
+    def test_skips_keys_referenced_again(self, app, storage):
+        for key in ('blobs/1', 'blobs/2', 'blobs/3'):
+            put_old(storage, key)
+        namespace = _ListedNamespace(storage, keep={'blobs/2'})
+        run = collector()
+
+        run._delete_batch(namespace, list(storage.iter_keys('blobs/')))
+
+        assert namespace.checked == [['blobs/1', 'blobs/2', 'blobs/3']]
+        assert [obj.key for obj in storage.iter_keys()] == ['blobs/2']
+        assert run.report['deleted_objects'] == 2
+        assert run.report['deleted_bytes'] == 2 * len(b'evidence')
+
+    def test_counts_delete_errors(self, app, storage):
+        for key in ('blobs/1', 'blobs/2'):
+            put_old(storage, key)
+        namespace = _ListedNamespace(storage, fail={'blobs/1'})
+        run = collector()
+
+        run._delete_batch(namespace, list(storage.iter_keys('blobs/')))
+
+        assert run.report['delete_errors'] == 1
+        assert run.report['deleted_objects'] == 1
+        assert [obj.key for obj in storage.iter_keys()] == ['blobs/1']
+
+    def test_collect_deletes_in_batches(self, app, storage):
+        for index in range(5):
+            put_old(storage, f'blobs/{index}')
+        namespace = _ListedNamespace(storage)
+        run = collector(batch_size=2)
+
+        run.collect(namespace)
+
+        assert [len(batch) for batch in namespace.checked] == [2, 2, 1]
+        assert list(storage.iter_keys()) == []
+        assert run.report['orphan_objects'] == 5
+
+    def test_collect_keeps_recent_objects(self, app, storage):
+        put_old(storage, 'blobs/old')
+        storage.put_bytes('blobs/new', b'just uploaded')
+        run = collector()
+
+        run.collect(_ListedNamespace(storage))
+
+        assert [obj.key for obj in storage.iter_keys()] == ['blobs/new']
+        assert run.report['recent_objects'] == 1
+
+
+class TestBlobStillReferenced:
+
+    def test_finds_rows_by_digest(self, app, storage):
+        db.session.add(EvidenceBlob(SHA_A, 8, f'blobs/aa/{SHA_A}'))
+        db.session.commit()
+        namespace = _BlobNamespace(storage, 'blobs')
+
+        kept = namespace.still_referenced([f'blobs/aa/{SHA_A}', f'blobs/bb/{SHA_B}'])
+
+        assert kept == {f'blobs/aa/{SHA_A}'}
+
+    def test_ignores_rows_stored_under_another_key(self, app, storage):
+        # A row moved to another layout does not keep its old copy alive
+        db.session.add(EvidenceBlob(SHA_A, 8, f'blobs/aa/aa/{SHA_A}'))
+        db.session.commit()
+        namespace = _BlobNamespace(storage, 'blobs')
+
+        assert namespace.still_referenced([f'blobs/aa/{SHA_A}']) == set()
+
+    def test_blob_referenced_mid_pass_is_kept(self, app, storage):
+        keys = [f'blobs/aa/{SHA_A}', f'blobs/bb/{SHA_B}', f'blobs/cc/{SHA_C}']
+        for key in keys:
+            put_old(storage, key)
+
+        class UploadDuringPass(_BlobNamespace):
+            def listing(self):
+                # The database keys are read before the listing finishes;
+                # an upload then references content the pass saw as orphaned
+                yield from super().listing()
+                db.session.add(EvidenceBlob(SHA_B, 8, keys[1]))
+                db.session.commit()
+
+        run = collector()
+        run.collect(UploadDuringPass(storage, 'blobs'))
+
+        assert [obj.key for obj in storage.iter_keys()] == [keys[1]]
+        assert run.report['orphan_objects'] == 3
+        assert run.report['deleted_objects'] == 2
+
+
+class TestBlobDelete:
+
+    def test_deletes_unreferenced_blob(self, app, storage):
+        key = f'blobs/aa/{SHA_A}'
+        put_old(storage, key)
+
+        assert _BlobNamespace(storage, 'blobs').delete(key)
+        assert not storage.exists(key)
+        assert EvidenceBlob.query.count() == 0
+
+    def test_deletes_copy_left_by_layout_migration(self, app, storage):
+        old_key, new_key = f'blobs/aa/{SHA_A}', f'blobs/aa/aa/{SHA_A}'
+        put_old(storage, old_key)
+        put_old(storage, new_key)
+        db.session.add(EvidenceBlob(SHA_A, 8, new_key))
+        db.session.commit()
+
+        assert _BlobNamespace(storage, 'blobs').delete(old_key)
+        assert [obj.key for obj in storage.iter_keys()] == [new_key]
+
+    def test_keeps_blob_its_row_owns(self, app, storage):
+        key = f'blobs/aa/{SHA_A}'
+        put_old(storage, key)
+        db.session.add(EvidenceBlob(SHA_A, 8, key))
+        db.session.commit()
+
+        assert not _BlobNamespace(storage, 'blobs').delete(key)
+        assert storage.exists(key)
+
+    def test_keeps_blob_an_upload_is_writing(self, file_app, storage):
+        key = f'blobs/aa/{SHA_A}'
+        put_old(storage, key)
+
+        # An upload of the same content has inserted the blob's row but not
+        # committed it; the pass sees the object as an orphan
+        with db.engine.connect() as upload:
+            upload.execute(
+                text("INSERT INTO evidence_blobs (sha256, file_size, storage_key, ref_count, scan_status, "
+                     "scan_attempts, created_at, last_referenced_at) "
+                     "VALUES (:sha256, 8, :key, 1, 'pending', 0, :now, :now)"),
+                {'sha256': SHA_A, 'key': key, 'now': datetime.utcnow()}
+            )
+            run = collector()
+            run.collect(_BlobNamespace(storage, 'blobs'))
+            upload.commit()
+
+        assert storage.exists(key)
+        assert run.report['orphan_objects'] == 1
+        assert run.report['deleted_objects'] == 0
+        assert EvidenceBlob.query.filter_by(sha256=SHA_A).one().storage_key == key
+
+    def test_upload_inserts_row_before_writing(self, app, storage, tmp_path):
+        written = []
+
+        class CheckedStorage(LocalStorage):
+            def ingest_file(self, key, path, content_type=None):
+                written.append(db.session.execute(
+                    text("SELECT storage_key FROM evidence_blobs WHERE sha256 = :sha256"), {'sha256': SHA_A}
+                ).scalar())
+                super().ingest_file(key, path, content_type)
+
+        partial = tmp_path / 'upload.part'
+        partial.write_bytes(b'evidence')
+
+        blob = add_blob_reference(CheckedStorage(storage.root), str(partial), {'sha256': SHA_A, 'size': 8})
+
+        assert written == [blob.storage_key]
+        assert storage.exists(blob.storage_key)
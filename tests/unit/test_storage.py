@@ -0,0 +1,79 @@
+"""
+Tests for the storage backends' object round trip and sorted key listings
+"""
+
+import threading
+from functools import partial
+
+import pytest
+
+from src.utils.storage import LocalStorage, S3Storage, StorageObjectNotFound
+
+
+KEYS = ['a/b', 'a/b/c', 'a/b0', 'a-b', 'ab', 'b']
+
+
+@pytest.fixture(params=['local', 's3'])
+def storage(request, tmp_path, s3_client):
+    if request.param == 'local':
+        return LocalStorage(str(tmp_path))
+    # Small pages so listings have to follow continuation tokens
+    s3_client.list_objects_v2 = partial(s3_client.list_objects_v2, MaxKeys=2)
+    return S3Storage('evidence', prefix='tenant', client=s3_client)
+
+
+def test_round_trip(storage):
+    storage.put_bytes('blobs/ab/abcd', b'evidence content', 'text/plain')
+
+    assert storage.exists('blobs/ab/abcd')
+    assert storage.size('blobs/ab/abcd') == 16
+    assert storage.get_bytes('blobs/ab/abcd') == b'evidence content'
+    assert b''.join(storage.iter_chunks('blobs/ab/abcd', 9)) == b'content'
+
+    storage.delete('blobs/ab/abcd')
+    assert not storage.exists('blobs/ab/abcd')
+    with pytest.raises(StorageObjectNotFound):
+        storage.get_bytes('blobs/ab/abcd')
+
+
+def test_iter_keys_is_sorted(storage):
+    # Local storage cannot hold both 'a/b' and 'a/b/c'
+    keys = [key for key in KEYS if key != 'a/b'] if isinstance(storage, LocalStorage) else KEYS
+    for key in reversed(keys):
+        storage.put_bytes(key, key.encode())
+
+    listed = list(storage.iter_keys())
+
+    assert [item.key for item in listed] == sorted(keys)
+    assert all(item.size == len(item.key) for item in listed)
+
+
+def test_iter_keys_prefix(storage):
+    for key in ['blobs/ab/1', 'blobs/ab/2', 'blobs/cd/3', 'blobsx', 'quarantine/4']:
+        storage.put_bytes(key, b'x')
+
+    assert [item.key for item in storage.iter_keys('blobs/')] == ['blobs/ab/1', 'blobs/ab/2', 'blobs/cd/3']
+    assert [item.key for item in storage.iter_keys('blobs/ab')] == ['blobs/ab/1', 'blobs/ab/2']
+    assert list(storage.iter_keys('missing/')) == []
+
+
+def test_concurrent_writes_of_one_key(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    payloads = [bytes([index]) * 200000 for index in range(8)]
+    errors = []
+
+    def write(data):
+        try:
+            storage.put_bytes('certificates/cert.pdf', data)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(data,)) for data in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert storage.get_bytes('certificates/cert.pdf') in payloads
+    assert [item.key for item in storage.iter_keys()] == ['certificates/cert.pdf']
@@ -0,0 +1,122 @@
+"""
+Tests for storage quota counters kept in step with file deletes
+"""
+
+import pytest
+from flask import Flask
+
+from src.models.user import User, db
+from src.models.assessment import Assessment, AssessmentFile, StorageUsage
+from src.utils.storage_quota import GLOBAL_SCOPE_ID, charge_storage, get_usage
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def make_user(email='owner@example.com'):
+    user = User(email, 'Password1!', 'Ada', 'Owner', 'Acme', 'Technology', 'CISO', country='GB')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def make_assessment(user, organization_name=' Acme '):
+    assessment = Assessment(user.id, 'Chatbot', organization_name, 'Support chatbot', 'Technology', 'high')
+    db.session.add(assessment)
+    db.session.flush()
+    return assessment
+
+
+def upload(assessment, size):
+    """Record a file the way the upload route does: charge, then add the row"""
+    charge_storage(assessment.user_id, assessment.organization_name, size)
+    record = AssessmentFile(
+        assessment.id, assessment.user_id, 'evidence.pdf', 'stored.pdf',
+        'files/stored.pdf', size, 'pdf', 'application/pdf'
+    )
+    record.organization_key = 'acme'
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def counters(user_id):
+    return {
+        scope: (usage.file_count, usage.total_bytes)
+        for scope, usage in (
+            ('user', get_usage('user', user_id)),
+            ('organization', get_usage('organization', 'acme')),
+            ('global', get_usage('global', GLOBAL_SCOPE_ID))
+        )
+    }
+
+
+class TestDeleteRefunds:
+
+    def test_file_delete_refunds_once(self, app):
+        assessment = make_assessment(make_user())
+        upload(assessment, 100)
+        removed = upload(assessment, 40)
+
+        db.session.delete(removed)
+        db.session.commit()
+
+        assert set(counters(assessment.user_id).values()) == {(1, 100)}
+
+    def test_assessment_delete_refunds_cascaded_files(self, app):
+        user = make_user()
+        assessment = make_assessment(user)
+        other = make_assessment(user)
+        upload(assessment, 100)
+        upload(assessment, 50)
+        upload(other, 7)
+
+        db.session.delete(assessment)
+        db.session.commit()
+
+        assert set(counters(user.id).values()) == {(1, 7)}
+
+    def test_user_delete_refunds_cascaded_files(self, app):
+        user = make_user()
+        upload(make_assessment(user), 100)
+        upload(make_assessment(user), 20)
+        other_user = make_user('other@example.com')
+        upload(make_assessment(other_user), 5)
+
+        db.session.delete(user)
+        db.session.commit()
+
+        assert StorageUsage.query.get(('user', user.id)).total_bytes == 0
+        assert get_usage('organization', 'acme').total_bytes == 5
+        assert get_usage('global', GLOBAL_SCOPE_ID).file_count == 1
+
+    def test_unrecorded_organization_uses_the_assessment(self, app):
+        assessment = make_assessment(make_user())
+        record = upload(assessment, 30)
+        record.organization_key = None
+        db.session.commit()
+
+        db.session.delete(record)
+        db.session.commit()
+
+        assert set(counters(assessment.user_id).values()) == {(0, 0)}
+
+    def test_unseeded_counters_are_left_to_seed(self, app):
+        assessment = make_assessment(make_user())
+        record = upload(assessment, 30)
+        StorageUsage.query.delete()
+        db.session.commit()
+
+        db.session.delete(record)
+        db.session.commit()
+
+        assert StorageUsage.query.count() == 0
+        assert set(counters(assessment.user_id).values()) == {(0, 0)}
@@ -0,0 +1,92 @@
+"""
+Tests for reading multipart bodies straight from the request stream
+"""
+
+import io
+
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from src.utils.uploads import MultipartError, MultipartReader, stream_to_file
+
+BOUNDARY = b'boundary'
+
+
+def multipart_body(*parts):
+    """Encode (name, filename, data) parts; filename None makes a plain field"""
+    body = b''
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += b'--' + BOUNDARY + b'\r\nContent-Disposition: ' + disposition.encode() + b'\r\n'
+        if filename is not None:
+            body += b'Content-Type: application/pdf\r\n'
+        body += b'\r\n' + data + b'\r\n'
+    return body + b'--' + BOUNDARY + b'--\r\n'
+
+
+class CountingStream(io.BytesIO):
+    """Stream that records how many bytes have been read from it"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.reads.append(len(data))
+        return data
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 8192])
+def test_reads_fields_and_files_in_order(chunk_size):
+    content = b'%PDF-1.4\n' + bytes(range(256)) * 100
+    body = multipart_body(('file', 'policy.pdf', content), ('assessmentId', None, 'é-1'.encode()))
+
+    seen = []
+    for part in MultipartReader(io.BytesIO(body), BOUNDARY, chunk_size=chunk_size):
+        if part.filename is None:
+            seen.append((part.name, part.read_text()))
+        else:
+            seen.append((part.name, part.filename, part.content_type, part.read()))
+
+    assert seen == [('file', 'policy.pdf', 'application/pdf', content), ('assessmentId', 'é-1')]
+
+
+def test_file_part_streams_to_file(tmp_path):
+    content = b'%PDF-1.4\n' + b'x' * 100000
+    stream = CountingStream(multipart_body(('file', 'policy.pdf', content)))
+
+    part = next(iter(MultipartReader(stream, BOUNDARY, chunk_size=4096)))
+    upload = stream_to_file(part, str(tmp_path / 'upload.part'), max_size=len(content), chunk_size=4096)
+
+    assert (tmp_path / 'upload.part').read_bytes() == content
+    assert upload['size'] == len(content)
+    assert upload['header'].startswith(b'%PDF')
+    assert max(stream.reads) <= 4096
+
+
+def test_unread_parts_are_skipped():
+    body = multipart_body(('skipped', 'a.pdf', b'a' * 50000), ('file', 'b.pdf', b'%PDF'))
+
+    parts = [(part.name, part.read() if part.name == 'file' else None)
+             for part in MultipartReader(io.BytesIO(body), BOUNDARY)]
+
+    assert parts == [('skipped', None), ('file', b'%PDF')]
+
+
+def test_truncated_body_raises():
+    body = multipart_body(('file', 'policy.pdf', b'%PDF' * 1000))[:2000]
+
+    with pytest.raises(MultipartError):
+        for part in MultipartReader(io.BytesIO(body), BOUNDARY):
+            part.read()
+
+
+def test_field_over_memory_limit_raises():
+    body = multipart_body(('description', None, b'd' * 5000))
+
+    with pytest.raises(RequestEntityTooLarge):
+        for part in MultipartReader(io.BytesIO(body), BOUNDARY, chunk_size=1024):
+            part.read_text(max_size=1000)